@@ -0,0 +1,13 @@
+from django.apps import AppConfig
+
+
+class NotificationsAppConfig(AppConfig):
+    name = 'authors.apps.ah_notifications'
+    label = 'ah_notifications'
+    verbose_name = 'Notifications'
+
+    def ready(self):
+        import authors.apps.ah_notifications.signals  # NOQA
+
+
+default_app_config = 'authors.apps.ah_notifications.NotificationsAppConfig'
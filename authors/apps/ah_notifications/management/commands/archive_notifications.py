@@ -0,0 +1,64 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+from notifications.models import Notification
+
+from authors.apps.ah_notifications.models import ArchivedNotification
+
+
+class Command(BaseCommand):
+    help = 'Removes the old deleted and read notifications from the notifications table in small batches, ' \
+           'each its own short transaction, moving them to the archive table or deleting them for good.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--deleted-days', type=int, default=30,
+                            help='Remove the deleted notifications older than this. Defaults to 30.')
+        parser.add_argument('--read-days', type=int, default=90,
+                            help='Remove the read notifications older than this. Defaults to 90.')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='The number of notifications removed at a time. Defaults to 1000.')
+        parser.add_argument('--pause', type=float, default=0.1,
+                            help='The seconds to wait between batches. Defaults to 0.1.')
+        parser.add_argument('--hard-delete', action='store_true',
+                            help='Delete the notifications instead of archiving them.')
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        sql = self.build_sql(options['hard_delete'])
+        params = [now - timedelta(days=options['deleted_days']), now - timedelta(days=options['read_days']),
+                  options['batch_size']]
+
+        removed = batches = 0
+        while True:
+            with connection.cursor() as cursor:
+                cursor.execute(sql, params)
+                count = cursor.rowcount
+            if not count:
+                break
+            removed, batches = removed + count, batches + 1
+            time.sleep(options['pause'])
+
+        self.stdout.write(self.style.SUCCESS('{} {} notification(s) in {} batch(es).'.format(
+            'Deleted' if options['hard_delete'] else 'Archived', removed, batches)))
+
+    @staticmethod
+    def build_sql(hard_delete):
+        """
+        Build the statement that removes a batch of notifications. The notifications being
+        changed by a request are skipped rather than waited for, the next run removes them.
+        """
+        table = Notification._meta.db_table
+        delete = 'WITH batch AS (' \
+                 'SELECT id FROM {0} WHERE (deleted AND timestamp < %s) OR (NOT unread AND timestamp < %s) ' \
+                 'LIMIT %s FOR UPDATE SKIP LOCKED) ' \
+                 'DELETE FROM {0} notification USING batch WHERE notification.id = batch.id'.format(table)
+        if hard_delete:
+            return delete
+
+        columns = ', '.join(ArchivedNotification.COLUMNS)
+        returning = ', '.join('notification.' + column for column in ArchivedNotification.COLUMNS)
+        return 'WITH moved AS ({} RETURNING {}) INSERT INTO {} ({}, archived_at) SELECT {}, now() FROM moved'.format(
+            delete, returning, ArchivedNotification._meta.db_table, columns, columns)
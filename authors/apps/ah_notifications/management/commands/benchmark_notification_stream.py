@@ -0,0 +1,160 @@
+import http.client
+import random
+import socket
+import threading
+import time
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from notifications.signals import notify
+from rest_framework.reverse import reverse
+
+from authors.apps.authentication.models import User
+from authors.apps.profiles.models import Profile
+
+USERNAME = 'stream-benchmark-{}'
+
+
+class StreamClient(threading.Thread):
+    """
+    An EventSource of a benchmark user, it records the times the notification events arrive at
+    """
+
+    def __init__(self, url, token, opened):
+        super().__init__(daemon=True)
+        self.url = url
+        self.token = token
+        self.opened = opened
+        self.status = self.retry_after = self.sock = None
+        self.received = []
+
+    def run(self):
+        try:
+            self.stream()
+        except (OSError, http.client.HTTPException):
+            pass
+        finally:
+            if self.status is None:
+                self.opened.release()
+
+    def stream(self):
+        connection = http.client.HTTPConnection(self.url.hostname, self.url.port or 80, timeout=None)
+        connection.connect()
+        self.sock = connection.sock
+        connection.request('GET', reverse('notifications:stream-notifications'),
+                           headers={'Authorization': 'Token ' + self.token, 'Accept': 'text/event-stream'})
+        response = connection.getresponse()
+        self.status, self.retry_after = response.status, response.getheader('Retry-After')
+        self.opened.release()
+        for line in response:
+            if line.startswith(b'event: notifications'):
+                self.received.append(time.perf_counter())
+
+    def close(self):
+        if self.sock is not None:
+            try:
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                # the server closed it already
+                pass
+
+
+class Command(BaseCommand):
+    help = 'Opens notification streams to a running server, one per benchmark user, then notifies random ' \
+           'streams and measures how many streams the server keeps open and how fast their events arrive. ' \
+           'Run it against the stream process of the Procfile, with the database of the server.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://localhost:8000',
+                            help='The server to open the streams to. Defaults to http://localhost:8000.')
+        parser.add_argument('--connections', type=int, default=500,
+                            help='The number of streams to open. Defaults to 500.')
+        parser.add_argument('--messages', type=int, default=100,
+                            help='The number of notifications sent to random streams. Defaults to 100.')
+        parser.add_argument('--timeout', type=float, default=settings.NOTIFICATIONS_STREAM['HEARTBEAT'] + 5,
+                            help='The seconds to wait for a notification to arrive. Defaults to HEARTBEAT + 5, '
+                                 'the longest a server that does not share the pub-sub of this process takes.')
+        parser.add_argument('--pid', type=int,
+                            help='A server process to report the memory the open streams take in.')
+
+    def handle(self, *args, **options):
+        url = urlsplit(options['url'])
+        users = self.create_users(options['connections'])
+        memory = self.memory(options['pid'])
+        clients = []
+        try:
+            opened = threading.Semaphore(0)
+            threading.stack_size(256 * 1024)
+            clients = [StreamClient(url, user.token, opened) for user in users]
+            for client in clients:
+                client.start()
+            for _ in clients:
+                opened.acquire()
+            memory = self.memory(options['pid']) - memory
+
+            streams = {client: user for client, user in zip(clients, users) if client.status == 200}
+            latencies = self.notify(streams, options['messages'], options['timeout'])
+            self.report(clients, latencies, memory, options)
+        finally:
+            for client in clients:
+                client.close()
+            User.objects.filter(pk__in=[user.pk for user in users]).delete()
+
+    @staticmethod
+    def create_users(count):
+        User.objects.filter(username__startswith=USERNAME.format('')).delete()
+        User.objects.bulk_create(
+            User(username=USERNAME.format(i), email=USERNAME.format(i) + '@example.com') for i in range(count))
+        users = list(User.objects.filter(username__startswith=USERNAME.format('')).order_by('pk'))
+        # the notifications are serialized with the profile of their actor
+        Profile.objects.bulk_create(Profile(user=user) for user in users)
+        return users
+
+    @staticmethod
+    def notify(streams, messages, timeout):
+        """
+        Notify the users of random streams, one at a time, and wait for their events to arrive
+        :return: the seconds each event took to arrive, the events that did not arrive are left out
+        """
+        latencies = []
+        for _ in range(messages if streams else 0):
+            client = random.choice(list(streams))
+            received = len(client.received)
+            sent = time.perf_counter()
+            notify.send(streams[client], recipient=streams[client], verb='stream_benchmark',
+                        description='A benchmark notification')
+            while len(client.received) == received and time.perf_counter() - sent < timeout:
+                time.sleep(0.001)
+            if len(client.received) > received:
+                latencies.append(client.received[received] - sent)
+        return latencies
+
+    def report(self, clients, latencies, memory, options):
+        opened = [client for client in clients if client.status == 200]
+        refused = [client for client in clients if client.status == 503]
+        self.stdout.write('Opened {} of {} notification stream(s) to {}.'.format(
+            len(opened), len(clients), options['url']))
+        self.stdout.write('  refused:     {:10d} with Retry-After {}'.format(
+            len(refused), refused[0].retry_after if refused else '-'))
+        self.stdout.write('  failed:      {:10d}'.format(len(clients) - len(opened) - len(refused)))
+        if options['pid'] and opened:
+            self.stdout.write('  memory:      {:10.1f} KiB per stream'.format(memory / len(opened)))
+        delivered, latencies = len(latencies), sorted(latencies) or [0]
+        self.stdout.write('  delivery p50: {:9.3f} ms'.format(latencies[len(latencies) // 2] * 1e3))
+        self.stdout.write('  delivery p99: {:9.3f} ms'.format(latencies[int(len(latencies) * 0.99)] * 1e3))
+        self.stdout.write(self.style.SUCCESS('  {} of {} notification(s) delivered'.format(
+            delivered, options['messages'])))
+
+    @staticmethod
+    def memory(pid):
+        """
+        :return: the resident memory of the process in KiB, 0 without a process
+        """
+        if not pid:
+            return 0
+        with open('/proc/{}/status'.format(pid)) as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+        return 0
@@ -0,0 +1,75 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count
+from notifications.models import Notification
+
+from authors.apps.ah_notifications.models import UnreadNotificationCounter
+
+# lock the next batch of counters, the notifications of their users cannot be counted or uncounted meanwhile
+LOCK_SQL = '''
+    SELECT user_id FROM {counters} WHERE user_id > %s ORDER BY user_id LIMIT %s FOR UPDATE
+'''
+
+# set the locked counters that have drifted to the actual count, counting the users without unread
+# notifications as 0
+REPAIR_SQL = '''
+    UPDATE {counters} SET count = COALESCE(actual.total, 0)
+    FROM {counters} AS current LEFT JOIN ({actual}) AS actual ON actual.recipient_id = current.user_id
+    WHERE {counters}.user_id = current.user_id AND current.user_id = ANY(%s)
+    AND {counters}.count <> COALESCE(actual.total, 0)
+'''
+
+# create the counters of the users that have unread notifications but no counter yet
+CREATE_SQL = '''
+    INSERT INTO {counters} (user_id, count)
+    SELECT actual.recipient_id, actual.total FROM ({actual}) AS actual
+    ON CONFLICT (user_id) DO NOTHING
+'''
+
+
+class Command(BaseCommand):
+    help = 'Recounts the unread notifications of every user and repairs the unread counters that have ' \
+           'drifted. Run it periodically, e.g. from a scheduler.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='The number of counters locked and repaired at a time. Defaults to 1000.')
+
+    def handle(self, *args, **options):
+        repaired = self.repair_counters(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            'Repaired the unread notification counters of {} user(s).'.format(repaired)))
+
+    def repair_counters(self, batch_size=1000):
+        """
+        Recount the counters in the database a batch at a time. The counters of a batch are locked
+        before their notifications are counted, so the notifications counted and uncounted in the
+        meantime wait for the repair instead of being overwritten by it.
+        :return: the number of counters repaired or created
+        """
+        table = UnreadNotificationCounter._meta.db_table
+        repaired, last = 0, 0
+        while True:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(LOCK_SQL.format(counters=table), [last, batch_size])
+                user_ids = [user_id for user_id, in cursor.fetchall()]
+                if not user_ids:
+                    break
+                # counted once the counters are locked, with the notifications committed before
+                actual, params = self.actual_counts(recipient_id__in=user_ids)
+                cursor.execute(REPAIR_SQL.format(counters=table, actual=actual), params + (user_ids,))
+                repaired += cursor.rowcount
+            last = user_ids[-1]
+
+        actual, params = self.actual_counts()
+        with connection.cursor() as cursor:
+            cursor.execute(CREATE_SQL.format(counters=table, actual=actual), params)
+            return repaired + cursor.rowcount
+
+    @staticmethod
+    def actual_counts(**filters):
+        """
+        :return: the query of the actual number of unread notifications of every user that has some, and its params
+        """
+        return Notification.objects.filter(unread=True, deleted=False, **filters).order_by().values(
+            'recipient_id').annotate(total=Count('pk')).values_list('recipient_id', 'total').query.sql_with_params()
@@ -0,0 +1,22 @@
+# Generated by Django 2.1.2 on 2026-10-16 23:55
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    The notifications are listed and polled by recipient in (timestamp, id) order. The
+    notification model belongs to django-notifications so its index is created here.
+    """
+
+    dependencies = [
+        ('notifications', '0006_indexes'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX notification_recipient_timestamp_idx '
+            'ON notifications_notification (recipient_id, timestamp DESC, id DESC)',
+            'DROP INDEX notification_recipient_timestamp_idx',
+        ),
+    ]
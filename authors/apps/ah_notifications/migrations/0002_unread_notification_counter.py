@@ -0,0 +1,32 @@
+# Generated by Django 2.1.2 on 2026-10-17 00:06
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def count_unread_notifications(apps, schema_editor):
+    Notification = apps.get_model('notifications', 'Notification')
+    UnreadNotificationCounter = apps.get_model('ah_notifications', 'UnreadNotificationCounter')
+    unread = Notification.objects.filter(unread=True, deleted=False).order_by().values('recipient_id').annotate(
+        total=models.Count('pk'))
+    UnreadNotificationCounter.objects.bulk_create(
+        UnreadNotificationCounter(user_id=row['recipient_id'], count=row['total']) for row in unread.iterator())
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0001_initial'),
+        ('ah_notifications', '0001_notification_recipient_timestamp_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UnreadNotificationCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='unread_notification_counter', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(count_unread_notifications, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 2.1.2 on 2026-10-17 00:09
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('ah_notifications', '0002_unread_notification_counter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationPreference',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('verb', models.CharField(max_length=255)),
+                ('delivery', models.CharField(choices=[('all', 'In-app and email'), ('in_app', 'In-app only'), ('email', 'Email only'), ('none', 'None')], default='all', max_length=10)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notification_preferences', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='notificationpreference',
+            unique_together={('user', 'verb')},
+        ),
+    ]
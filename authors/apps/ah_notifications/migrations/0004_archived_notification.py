@@ -0,0 +1,41 @@
+# Generated by Django 2.1.2 on 2026-10-17 00:12
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('ah_notifications', '0003_notification_preference'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedNotification',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('level', models.CharField(max_length=20)),
+                ('unread', models.BooleanField()),
+                ('actor_object_id', models.CharField(max_length=255)),
+                ('verb', models.CharField(max_length=255)),
+                ('description', models.TextField(blank=True, null=True)),
+                ('target_object_id', models.CharField(blank=True, max_length=255, null=True)),
+                ('action_object_object_id', models.CharField(blank=True, max_length=255, null=True)),
+                ('timestamp', models.DateTimeField()),
+                ('public', models.BooleanField()),
+                ('deleted', models.BooleanField()),
+                ('emailed', models.BooleanField()),
+                ('data', models.TextField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('action_object_content_type', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='contenttypes.ContentType')),
+                ('actor_content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='contenttypes.ContentType')),
+                ('recipient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_notifications', to=settings.AUTH_USER_MODEL)),
+                ('target_content_type', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='contenttypes.ContentType')),
+            ],
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 2.1.2 on 2026-10-17 00:40
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    The notification lists filter the recipient's notifications on deleted and unread and
+    order them by timestamp, and the `archive_notifications` command looks up the deleted
+    and read notifications by age. The indexes are built concurrently so that the table
+    stays writable, which cannot be done in a transaction.
+    """
+    atomic = False
+
+    dependencies = [
+        ('ah_notifications', '0004_archived_notification'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS notification_recipient_state_idx '
+            'ON notifications_notification (recipient_id, deleted, unread, timestamp DESC)',
+            'DROP INDEX CONCURRENTLY IF EXISTS notification_recipient_state_idx',
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS notification_retention_idx '
+            'ON notifications_notification (timestamp) WHERE deleted OR NOT unread',
+            'DROP INDEX CONCURRENTLY IF EXISTS notification_retention_idx',
+        ),
+    ]
@@ -1,3 +1,121 @@
-from django.db import models
+from collections import Counter
 
-# Create your models here.
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, models
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from authors.apps.authentication.models import User
+
+
+class UnreadNotificationCounter(models.Model):
+    """
+    The number of unread notifications of a user. It is kept up to date as notifications are
+    created, read and deleted, so that the unread badge is read without counting, and it is
+    repaired by the `reconcile_notification_counters` command.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True,
+                                related_name='unread_notification_counter')
+    count = models.IntegerField(default=0)
+
+    @classmethod
+    def increment(cls, user_ids):
+        """
+        Atomically count a new unread notification for each user id, creating the missing counters
+        :param user_ids: the recipients of the notifications, once per notification
+        """
+        counts = Counter(user_ids)
+        if not counts:
+            return
+        sql = 'INSERT INTO {0} (user_id, count) VALUES {1} ' \
+              'ON CONFLICT (user_id) DO UPDATE SET count = {0}.count + EXCLUDED.count'
+        values = ', '.join(['(%s, %s)'] * len(counts))
+        with connection.cursor() as cursor:
+            cursor.execute(sql.format(cls._meta.db_table, values),
+                           [value for count in counts.items() for value in count])
+
+    @classmethod
+    def decrement(cls, user_id, amount=1):
+        """
+        Atomically uncount notifications of the user that are no longer unread
+        """
+        if amount:
+            cls.objects.filter(user_id=user_id).update(count=Greatest(F('count') - amount, 0))
+
+    @classmethod
+    def unread_count(cls, user):
+        """
+        :return: the number of unread notifications of the user
+        """
+        return cls.objects.filter(user_id=user.pk).values_list('count', flat=True).first() or 0
+
+
+class NotificationPreference(models.Model):
+    """
+    How a user wants to be notified of a verb. Without a preference for a verb, a user is
+    notified in-app and by email, the emails only if they are subscribed.
+    """
+    ALL = 'all'
+    IN_APP = 'in_app'
+    EMAIL = 'email'
+    NONE = 'none'
+    DELIVERIES = (
+        (ALL, 'In-app and email'),
+        (IN_APP, 'In-app only'),
+        (EMAIL, 'Email only'),
+        (NONE, 'None'),
+    )
+    # the channels each delivery notifies on
+    CHANNELS = {ALL: {IN_APP, EMAIL}, IN_APP: {IN_APP}, EMAIL: {EMAIL}, NONE: set()}
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notification_preferences')
+    verb = models.CharField(max_length=255)
+    delivery = models.CharField(max_length=10, choices=DELIVERIES, default=ALL)
+
+    class Meta:
+        unique_together = (('user', 'verb'),)
+
+    @classmethod
+    def opted_out(cls, verb, channel):
+        """
+        :return: a queryset of the ids of the users that do not want the notifications of the verb on the channel
+        """
+        deliveries = [delivery for delivery, channels in cls.CHANNELS.items() if channel not in channels]
+        return cls.objects.filter(verb=verb, delivery__in=deliveries).values('user_id')
+
+
+class ArchivedNotification(models.Model):
+    """
+    A notification moved out of the notifications table by the `archive_notifications`
+    command, with the columns of the notification and the time it was archived.
+    """
+    # the id of the notification
+    id = models.IntegerField(primary_key=True)
+    level = models.CharField(max_length=20)
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_notifications')
+    unread = models.BooleanField()
+    actor_content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE, related_name='+')
+    actor_object_id = models.CharField(max_length=255)
+    verb = models.CharField(max_length=255)
+    description = models.TextField(blank=True, null=True)
+    target_content_type = models.ForeignKey(ContentType, blank=True, null=True, on_delete=models.CASCADE,
+                                            related_name='+')
+    target_object_id = models.CharField(max_length=255, blank=True, null=True)
+    action_object_content_type = models.ForeignKey(ContentType, blank=True, null=True, on_delete=models.CASCADE,
+                                                   related_name='+')
+    action_object_object_id = models.CharField(max_length=255, blank=True, null=True)
+    timestamp = models.DateTimeField()
+    public = models.BooleanField()
+    deleted = models.BooleanField()
+    emailed = models.BooleanField()
+    # the serialized JSON of the notification data
+    data = models.TextField(blank=True, null=True)
+    archived_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    # the columns copied from the notifications table
+    COLUMNS = (
+        'id', 'level', 'recipient_id', 'unread', 'actor_content_type_id', 'actor_object_id', 'verb', 'description',
+        'target_content_type_id', 'target_object_id', 'action_object_content_type_id', 'action_object_object_id',
+        'timestamp', 'public', 'deleted', 'emailed', 'data',
+    )
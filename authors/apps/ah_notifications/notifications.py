@@ -1,3 +1,19 @@
+from collections import Counter
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.utils import timezone
+from notifications.models import Notification
+from notifications.signals import notify
+
+from authors.apps.ah_notifications.models import UnreadNotificationCounter
+from authors.apps.ah_notifications.preferences import wants
+from authors.apps.ah_notifications.pubsub import publish_notifications
+
+
 class Verbs:
     """
     Have a single store for notification verbs to enhance consistency
@@ -19,3 +35,165 @@ class Verbs:
     COMMENT_LIKE = "comment_like"
 
     COMMENT_MENTION = "comment_mention"
+
+    @classmethod
+    def all(cls):
+        """
+        :return: every verb
+        """
+        return [value for name, value in vars(cls).items() if name.isupper()]
+
+
+def notify_user(actor, recipient, verb, **kwargs):
+    """
+    Notify the recipient with `notify.send`, unless they do not want in-app notifications of the verb
+    :param actor:
+    :param recipient:
+    :param verb:
+    :param kwargs: the other arguments of `notify.send`
+    :return: whether the recipient was notified
+    """
+    if not wants(recipient.pk, verb):
+        return False
+    notify.send(actor, recipient=recipient, verb=verb, **kwargs)
+    return True
+
+
+def bulk_notify(actor, recipient_ids, verb, description=None, batch_size=1000):
+    """
+    Notify many users at once. Unlike `notify.send`, which saves the notifications one
+    at a time, the notifications are inserted with `bulk_create` in batches, and the
+    recipients can be streamed e.g. from a queryset iterator. The preferences of the
+    recipients are not checked, exclude `NotificationPreference.opted_out` from them.
+    :param actor: the object the notifications are about
+    :param recipient_ids: an iterable of the ids of the users to notify
+    :param verb:
+    :param description:
+    :param batch_size: the number of notifications inserted at a time
+    :return: the number of notifications created
+    """
+    actor_content_type = ContentType.objects.get_for_model(actor)
+    timestamp = timezone.now()
+    notifications = (
+        Notification(recipient_id=recipient_id, actor_content_type=actor_content_type, actor_object_id=actor.pk,
+                     verb=verb, description=description, timestamp=timestamp)
+        for recipient_id in recipient_ids
+    )
+
+    created = 0
+    batch = list(islice(notifications, batch_size))
+    while batch:
+        # counted in the same transaction, so that a recount never sees the notifications uncounted
+        with transaction.atomic():
+            Notification.objects.bulk_create(batch)
+            # bulk_create does not send post_save
+            UnreadNotificationCounter.increment(notification.recipient_id for notification in batch)
+            publish_batch(batch)
+        created += len(batch)
+        batch = list(islice(notifications, batch_size))
+    return created
+
+
+def publish_batch(notifications):
+    recipient_ids = [notification.recipient_id for notification in notifications]
+    transaction.on_commit(lambda: publish_notifications(recipient_ids))
+
+
+def read_notification(notification):
+    """
+    Mark the notification as read, uncounting it from the unread notifications of its recipient
+    :param notification:
+    """
+    with transaction.atomic():
+        if Notification.objects.filter(pk=notification.pk, unread=True, deleted=False).update(unread=False):
+            UnreadNotificationCounter.decrement(notification.recipient_id)
+        else:
+            # read already, or deleted and not counted
+            Notification.objects.filter(pk=notification.pk).update(unread=False)
+    notification.unread = False
+
+
+def delete_notifications(notifications):
+    """
+    Soft delete the notifications, uncounting the unread ones from the unread notifications of their recipients
+    :param notifications: a queryset of notifications
+    :return: the number of notifications deleted
+    """
+    with transaction.atomic():
+        # locked so that they cannot be read, and uncounted twice, in the meantime
+        rows = list(notifications.filter(deleted=False).select_for_update().values_list('pk', 'recipient_id', 'unread'))
+        Notification.objects.filter(pk__in=[pk for pk, _, _ in rows]).update(deleted=True)
+        for recipient_id, count in Counter(recipient_id for _, recipient_id, unread in rows if unread).items():
+            UnreadNotificationCounter.decrement(recipient_id, count)
+    return len(rows)
+
+
+def mark_sent(notifications):
+    """
+    Mark the notifications a client received as sent
+    :param notifications: a list of notifications
+    :return: the number of notifications marked
+    """
+    return Notification.objects.filter(pk__in=[notification.pk for notification in notifications],
+                                       emailed=False).update(emailed=True)
+
+
+def notify_coalesced(actor, recipient, verb, target, description, digest_description, **context):
+    """
+    Notify the recipient of an event on a target, merging it into the unread notification of
+    the same verb on the same target within the coalescing window. The digest notification is
+    updated in place with the count of its events e.g. "X and 241 others liked your article", and
+    the ids of its latest ACTORS actors, so that popular targets do not grow the notifications of
+    their author with every event. Notify only the new events, e.g. a like the user did not give
+    already, so that the count is of distinct users.
+    Coalescing is configured with the NOTIFICATIONS_COALESCE setting.
+    :param actor: the latest actor, a user or an object of a user e.g. their favourite
+    :param recipient: the user to notify
+    :param verb:
+    :param target: the object the events are on e.g. the article
+    :param description: the description of a single event, formatted with the context
+    :param digest_description: the description of many events, formatted with the context and the
+    number of `others`
+    :param context: the values of the descriptions e.g. the name of the actor
+    :return: the notification, None if the recipient does not want in-app notifications of the verb
+    """
+    if not wants(recipient.pk, verb):
+        return None
+
+    config = settings.NOTIFICATIONS_COALESCE
+    if not config['ENABLED']:
+        return create_notification(actor, recipient, verb, target, description.format(**context))
+
+    since = timezone.now() - timedelta(seconds=config['WINDOW'])
+    with transaction.atomic():
+        digest = Notification.objects.select_for_update().filter(
+            recipient=recipient, verb=verb, unread=True, deleted=False, timestamp__gte=since,
+            target_content_type=ContentType.objects.get_for_model(target), target_object_id=str(target.pk),
+        ).order_by('-timestamp').first()
+        if digest is None:
+            return create_notification(actor, recipient, verb, target, description.format(**context))
+
+        data = digest.data or {}
+        count = data.get('count', 1) + 1
+        # the latest actors only, the digest does not grow with the events
+        actors = [user_id for user_id in data.get('actors', []) if user_id != actor_id(actor)]
+        digest.actor = actor
+        digest.description = digest_description.format(others=count - 1, **context)
+        digest.data = dict(data, count=count, actors=(actors + [actor_id(actor)])[-config['ACTORS']:])
+        digest.timestamp = timezone.now()
+        # the digest is new again to the clients that fetch the unsent notifications
+        digest.emailed = False
+        digest.save()
+        return digest
+
+
+def create_notification(actor, recipient, verb, target, description):
+    return Notification.objects.create(recipient=recipient, actor=actor, verb=verb, target=target,
+                                       description=description, data={'count': 1, 'actors': [actor_id(actor)]})
+
+
+def actor_id(actor):
+    """
+    :return: the id of the user behind the actor of an event
+    """
+    return getattr(actor, 'user_id', None) or actor.pk
@@ -0,0 +1,55 @@
+from rest_framework.response import Response
+
+from authors.apps.articles.pagination import KeysetPagination
+
+
+class NotificationPagination(KeysetPagination):
+    """
+    Pages through the notifications by their (timestamp, id) key, newest first. Polling
+    clients pass the `since` cursor of their last response to only get the notifications
+    that are new since then, a range scan of the recipient's notifications index.
+    `example usage`
+    http://localhost:8000/api/notifications/all/?pagination=cursor
+    http://localhost:8000/api/notifications/all/?since=eyJ2IjogWy...
+
+    Lists are only paginated when the client asks for it, otherwise they return every notification.
+    """
+    ordering = ('-timestamp', '-id')
+    fields = ['timestamp', 'id']
+    since_query_param = 'since'
+
+    @classmethod
+    def requested(cls, request):
+        return super().requested(request) or \
+            bool({cls.since_query_param, cls.page_size_query_param} & set(request.query_params))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.requested(request):
+            return None
+        return super().paginate_queryset(queryset, request, view=view)
+
+    def decode_cursor(self, request, queryset):
+        since = request.query_params.get(self.since_query_param)
+        if since is None or self.cursor_query_param in request.query_params:
+            return super().decode_cursor(request, queryset)
+        # the notifications newer than the cursor, the oldest of them first
+        return dict(self.decode(since, queryset), reverse=True)
+
+    def get_since(self):
+        """
+        :return: the cursor of the notifications newer than this page
+        """
+        if self.page:
+            return self.encode(self.page[0], reverse=True)
+        return self.request.query_params.get(self.since_query_param)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'count': len(data),
+            'links': {
+                'next': self.get_next_link(),
+                'previous': self.get_previous_link()
+            },
+            'since': self.get_since(),
+            'notifications': data
+        })
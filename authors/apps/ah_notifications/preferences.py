@@ -0,0 +1,43 @@
+import threading
+
+from authors.apps.ah_notifications.models import NotificationPreference
+
+
+class PreferencesCache(threading.local):
+    """
+    The notification preferences of the users a request notifies, read once per request.
+    It is cleared when a request starts and finishes, and when a preference changes.
+    """
+
+    def __init__(self):
+        self.preferences = {}
+
+    def get(self, user_id):
+        """
+        :return: the verbs the user has a preference for, mapped to the delivery
+        """
+        if user_id not in self.preferences:
+            self.preferences[user_id] = dict(
+                NotificationPreference.objects.filter(user_id=user_id).values_list('verb', 'delivery'))
+        return self.preferences[user_id]
+
+    def clear(self, user_id=None):
+        if user_id is None:
+            self.preferences = {}
+        else:
+            self.preferences.pop(user_id, None)
+
+
+preferences = PreferencesCache()
+
+
+def wants(user_id, verb, channel=NotificationPreference.IN_APP):
+    """
+    Whether the user wants to be notified of the verb on the channel
+    :param user_id:
+    :param verb:
+    :param channel: NotificationPreference.IN_APP or NotificationPreference.EMAIL
+    :return:
+    """
+    delivery = preferences.get(user_id).get(verb, NotificationPreference.ALL)
+    return channel in NotificationPreference.CHANNELS[delivery]
@@ -0,0 +1,104 @@
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class Subscription:
+    """
+    A subscription to the messages published on a channel. A message only wakes the
+    subscriber up, the subscriber then reads what is new from the database.
+    """
+
+    def __init__(self, pubsub, channel):
+        self.pubsub = pubsub
+        self.channel = channel
+        self.event = threading.Event()
+
+    def notify(self):
+        self.event.set()
+
+    def wait(self, timeout):
+        """
+        Wait for a message published since the last wait
+        :param timeout: the seconds to wait for at most
+        :return: whether a message was published
+        """
+        published = self.event.wait(timeout)
+        self.event.clear()
+        return published
+
+    def close(self):
+        self.pubsub.unsubscribe(self)
+
+
+class LocalPubSub:
+    """
+    A pub-sub within the process. Idle subscribers only hold an event, so a worker can keep
+    thousands of them waiting. Messages published by other processes are not received, so
+    subscribers must also check for what is new on their own every now and then.
+
+    Another backend, e.g. over Redis, only needs to provide `subscribe` and `publish`
+    and be set in the NOTIFICATIONS_STREAM['PUBSUB'] setting.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.channels = {}
+
+    def subscribe(self, channel):
+        """
+        :param channel:
+        :return: Subscription
+        """
+        subscription = Subscription(self, channel)
+        with self.lock:
+            self.channels.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            subscriptions = self.channels.get(subscription.channel, set())
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                self.channels.pop(subscription.channel, None)
+
+    def publish(self, channel):
+        """
+        Wake up the subscribers of the channel
+        :param channel:
+        :return: the number of subscribers woken up
+        """
+        with self.lock:
+            subscriptions = list(self.channels.get(channel, ()))
+        for subscription in subscriptions:
+            subscription.notify()
+        return len(subscriptions)
+
+
+@lru_cache(maxsize=None)
+def get_pubsub(backend=None):
+    """
+    Get the pub-sub backend of the process
+    :param backend: the dotted path of the backend class, defaults to the NOTIFICATIONS_STREAM['PUBSUB'] setting
+    :return:
+    """
+    return import_string(backend or settings.NOTIFICATIONS_STREAM['PUBSUB'])()
+
+
+def user_channel(user_id):
+    """
+    :return: the channel the notifications of the user are published on
+    """
+    return 'notifications:{}'.format(user_id)
+
+
+def publish_notifications(recipient_ids):
+    """
+    Wake up the streams of the recipients of new notifications
+    :param recipient_ids:
+    """
+    pubsub = get_pubsub()
+    for recipient_id in recipient_ids:
+        pubsub.publish(user_channel(recipient_id))
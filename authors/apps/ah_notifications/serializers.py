@@ -1,10 +1,16 @@
+from collections import defaultdict
+
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from notifications.models import Notification
 from rest_framework import serializers
 
+from authors.apps.ah_notifications.models import NotificationPreference
+from authors.apps.ah_notifications.notifications import Verbs
 from authors.apps.articles.models import Article, Comment
 from authors.apps.articles.serializers import CommentSerializer
 from authors.apps.authentication.models import User
-from authors.apps.profiles.models import Profile
 from authors.apps.profiles.serializers import ProfileSerializer
 
 
@@ -23,10 +29,11 @@ class ActorField(serializers.RelatedField):
             data = {"slug": value.slug}
         elif isinstance(value, Comment):
             actor_type = "comment"
-            data = CommentSerializer(value).data
+            serializer_class = CountedCommentSerializer if hasattr(value, 'likes_total') else CommentSerializer
+            data = serializer_class(value).data
         elif isinstance(value, User):
             actor_type = "user"
-            data = ProfileSerializer(Profile.objects.get(user=value)).data
+            data = ProfileSerializer(value.profile).data
 
         return {
             "type": actor_type,
@@ -37,11 +44,133 @@ class ActorField(serializers.RelatedField):
         return Notification(data)
 
 
+class CountedCommentSerializer(CommentSerializer):
+    """
+    Serializes a comment whose likes and dislikes were counted by `count_reactions`
+    """
+
+    def count_likes(self, instance):
+        return {'count': instance.likes_total, 'me': False}
+
+    def count_dislikes(self, instance):
+        return {'count': instance.dislikes_total, 'me': False}
+
+
+def count_reactions(reactions):
+    """
+    Count the reactions of each comment in a subquery, so that counting the likes
+    and the dislikes does not multiply the rows of each other.
+    :param reactions: the likes or dislikes field of the comment
+    :return: the count expression
+    """
+    through = reactions.through
+    count = through.objects.filter(comment=OuterRef('pk')).order_by().values('comment') \
+        .annotate(total=Count('*')).values('total')
+    return Coalesce(Subquery(count, output_field=IntegerField()), 0)
+
+
+class NotificationListSerializer(serializers.ListSerializer):
+    """
+    Serializes a list of notifications. The actors and targets are generic foreign keys,
+    which Django resolves one row at a time, so they are grouped by content type and each
+    type is fetched in one query, with what its representation needs.
+    """
+
+    def to_representation(self, data):
+        notifications = list(data.all() if hasattr(data, 'all') else data)
+        self.resolve(notifications, ('actor', 'target'))
+        return super().to_representation(notifications)
+
+    @staticmethod
+    def get_queryset(model):
+        """
+        :return: the queryset the objects of the model are fetched from
+        """
+        if model is User:
+            return User.objects.select_related('profile')
+        if model is Comment:
+            return Comment.objects.select_related('author__user').annotate(
+                likes_total=count_reactions(Comment.likes), dislikes_total=count_reactions(Comment.dislikes))
+        # the same manager the generic foreign key uses
+        return model._base_manager.all()
+
+    def resolve(self, notifications, fields):
+        """
+        Fetch the objects of the generic foreign keys of the notifications and cache them on the notifications
+        :param notifications:
+        :param fields: the names of the generic foreign keys
+        """
+        fields = [Notification._meta.get_field(name) for name in fields]
+        ids = defaultdict(set)
+        for _, _, (content_type_id, object_id) in self.generic_keys(notifications, fields):
+            ids[content_type_id].add(object_id)
+
+        objects = {}
+        for content_type_id, object_ids in ids.items():
+            objects.update(self.fetch(content_type_id, object_ids))
+
+        for notification, field, key in self.generic_keys(notifications, fields):
+            if key in objects:
+                field.set_cached_value(notification, objects[key])
+
+    def fetch(self, content_type_id, object_ids):
+        """
+        :return: a map of (content type id, object id) to the objects of one content type
+        """
+        model = ContentType.objects.get_for_id(content_type_id).model_class()
+        return {(content_type_id, str(obj.pk)): obj for obj in self.get_queryset(model).filter(pk__in=object_ids)}
+
+    @staticmethod
+    def generic_keys(notifications, fields):
+        """
+        :return: (notification, field, (content type id, object id)) for each generic foreign key that is set
+        """
+        for notification in notifications:
+            for field in fields:
+                content_type_id = getattr(notification, field.ct_field + '_id')
+                if content_type_id is not None:
+                    yield notification, field, (content_type_id, getattr(notification, field.fk_field))
+
+
 class NotificationSerializer(serializers.ModelSerializer):
     actor = ActorField(read_only=True)
     target = ActorField(read_only=True)
+    count = serializers.SerializerMethodField()
 
     class Meta:
         model = Notification
+        list_serializer_class = NotificationListSerializer
+
+        fields = ('id', 'actor', 'verb', 'target', 'level', 'unread', 'timestamp', 'description', 'count',)
+
+    def get_count(self, notification):
+        """
+        :return: the number of events a digest notification stands for
+        """
+        return (notification.data or {}).get('count', 1)
+
+
+class NotificationPreferencesSerializer(serializers.Serializer):
+    """
+    The notification preferences of a user, every verb mapped to how the user wants to be notified of it
+    """
+    preferences = serializers.DictField(child=serializers.ChoiceField(choices=NotificationPreference.DELIVERIES))
+
+    def validate_preferences(self, preferences):
+        unknown = sorted(set(preferences) - set(Verbs.all()))
+        if unknown:
+            raise serializers.ValidationError("Unknown notification verbs: {}".format(", ".join(unknown)))
+        return preferences
+
+    def to_representation(self, user):
+        saved = dict(user.notification_preferences.values_list('verb', 'delivery'))
+        return {'preferences': {verb: saved.get(verb, NotificationPreference.ALL) for verb in Verbs.all()}}
 
-        fields = ('id', 'actor', 'verb', 'target', 'level', 'unread', 'timestamp', 'description',)
+    def update(self, user, validated_data):
+        for verb, delivery in validated_data['preferences'].items():
+            if delivery == NotificationPreference.ALL:
+                # the default needs no row
+                NotificationPreference.objects.filter(user=user, verb=verb).delete()
+            else:
+                NotificationPreference.objects.update_or_create(user=user, verb=verb, defaults={'delivery': delivery})
+        return user
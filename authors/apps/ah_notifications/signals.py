@@ -0,0 +1,34 @@
+from django.core.signals import request_finished, request_started
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from notifications.models import Notification
+
+from authors.apps.ah_notifications.models import NotificationPreference, UnreadNotificationCounter
+from authors.apps.ah_notifications.preferences import preferences
+from authors.apps.ah_notifications.pubsub import publish_notifications
+
+
+@receiver(post_save, sender=Notification)
+def count_unread_notification(sender, instance, created, **kwargs):
+    if created and instance.unread and not instance.deleted:
+        UnreadNotificationCounter.increment([instance.recipient_id])
+
+
+@receiver(post_save, sender=Notification)
+def publish_saved_notification(sender, instance, **kwargs):
+    # created or, for a digest, updated; the streams read it once it is committed
+    recipient_ids = [instance.recipient_id]
+    transaction.on_commit(lambda: publish_notifications(recipient_ids))
+
+
+@receiver(request_started)
+@receiver(request_finished)
+def clear_preferences(sender, **kwargs):
+    preferences.clear()
+
+
+@receiver(post_save, sender=NotificationPreference)
+@receiver(post_delete, sender=NotificationPreference)
+def clear_changed_preferences(sender, instance, **kwargs):
+    preferences.clear(instance.user_id)
@@ -0,0 +1,160 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+
+from authors.apps.ah_notifications.pagination import NotificationPagination
+from authors.apps.ah_notifications.pubsub import get_pubsub, user_channel
+from authors.apps.core.exceptions import ServiceUnavailable
+
+
+class StreamSlots:
+    """
+    The number of streams the process keeps open at once, streams and long polls alike, so that
+    a worker refuses the streams over NOTIFICATIONS_STREAM['MAX_STREAMS'] instead of running out of
+    connections for the other requests
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.open = 0
+
+    def acquire(self):
+        """
+        :return: whether a slot was free, it is then held until it is released
+        """
+        with self.lock:
+            if self.open >= settings.NOTIFICATIONS_STREAM['MAX_STREAMS']:
+                return False
+            self.open += 1
+            return True
+
+    def release(self):
+        with self.lock:
+            self.open -= 1
+
+
+stream_slots = StreamSlots()
+
+
+class DatabaseSlots:
+    """
+    Bounds the streams of the process that use the database at once to
+    NOTIFICATIONS_STREAM['DATABASE_CONNECTIONS'], the others wait for their turn. The streams of
+    a gevent worker would otherwise open a connection each when they are opened or woken up together.
+    """
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.used = 0
+
+    def __enter__(self):
+        with self.condition:
+            self.condition.wait_for(lambda: self.used < settings.NOTIFICATIONS_STREAM['DATABASE_CONNECTIONS'])
+            self.used += 1
+
+    def __exit__(self, *exc_info):
+        with self.condition:
+            self.used -= 1
+            self.condition.notify()
+
+
+database_slots = DatabaseSlots()
+
+
+class NotificationStream:
+    """
+    Waits for the new unread notifications of a user. The pub-sub wakes the stream up when
+    a notification of the user is saved, but the notifications are always read from the
+    database, at least every HEARTBEAT seconds, so that notifications saved by another
+    process are delivered too, only later.
+    The stream position is a `since` cursor, the same as the notification lists return.
+    The database connection is closed while the stream waits, the stream only uses it within
+    `database`. An open stream holds one of the `stream_slots` of the process until it is closed.
+    """
+    pagination_class = NotificationPagination
+
+    def __init__(self, user, since=None):
+        """
+        :param user:
+        :param since: the cursor to stream the notifications after, defaults to the latest notification
+        :raise ServiceUnavailable: if the process has MAX_STREAMS streams open already
+        """
+        self.user = user
+        self.pagination = self.pagination_class()
+        # refused before it uses the database
+        if not stream_slots.acquire():
+            raise ServiceUnavailable(settings.NOTIFICATIONS_STREAM['RETRY_AFTER'],
+                                     'Too many notification streams are open, retry later.')
+        try:
+            with self.database():
+                self.position = self.decode(since) if since else self.latest_position()
+        except Exception:
+            stream_slots.release()
+            raise
+        self.subscription = get_pubsub().subscribe(user_channel(user.pk))
+
+    @property
+    def since(self):
+        return self.pagination.encode_position(self.position, reverse=True)
+
+    def decode(self, since):
+        return self.pagination.decode(since, self.user.notifications.all())['position']
+
+    def latest_position(self):
+        latest = self.user.notifications.order_by(*self.pagination.ordering).first()
+        return self.pagination.position(latest) if latest else ['1970-01-01T00:00:00+00:00', 0]
+
+    def fetch(self):
+        """
+        Read the notifications after the position and move the position to the newest of them
+        :return: the notifications, newest first
+        """
+        notifications = list(
+            self.user.notifications.unread().filter(self.pagination.after(self.position, descending=False))
+            .order_by(*self.pagination.reverse_ordering())[:self.pagination.max_page_size])
+        if notifications:
+            self.position = self.pagination.position(notifications[-1])
+        notifications.reverse()
+        return notifications
+
+    def wait(self, timeout):
+        """
+        Wait for new notifications
+        :param timeout: the seconds to wait for at most
+        :return: the new notifications, newest first, or an empty list on timeout
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            with self.database():
+                notifications = self.fetch()
+            remaining = deadline - time.monotonic()
+            if notifications or remaining <= 0:
+                return notifications
+            self.subscription.wait(min(remaining, settings.NOTIFICATIONS_STREAM['HEARTBEAT']))
+
+    @contextmanager
+    def database(self):
+        """
+        Use the database within one of the `database_slots` of the process, and release the connection after
+        """
+        with database_slots:
+            try:
+                yield
+            finally:
+                self.release_connection()
+
+    @staticmethod
+    def release_connection():
+        """
+        Close the database connection of the thread while it waits, it is opened again on the
+        next query, so that the open streams do not hold a connection each
+        """
+        if not connection.in_atomic_block:
+            connection.close()
+
+    def close(self):
+        self.subscription.close()
+        stream_slots.release()
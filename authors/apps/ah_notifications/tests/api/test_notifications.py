@@ -1,11 +1,22 @@
 import json
+from unittest import mock
 
+from django.conf import settings
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from notifications.signals import notify
 from rest_framework import status
 from rest_framework.reverse import reverse
 
+from authors.apps.ah_notifications.notifications import Verbs
+from authors.apps.ah_notifications.streams import stream_slots
+from authors.apps.articles.models import Article, Comment
 from authors.apps.articles.tests.api.test_articles import BaseArticlesTestCase
+from authors.apps.authentication.models import User
 from authors.apps.authentication.tests.api.test_auth import AuthenticatedTestCase
+from authors.apps.core.models import OutboxEmail
+from authors.apps.profiles.models import Profile
 
 
 class BaseNotificationsTestCase(AuthenticatedTestCase):
@@ -116,6 +127,73 @@ class AllNotificationsTestCase(BaseNotificationsTestCase):
         self.assertEqual(data['data']['count'], 0)
 
 
+# the token blacklist must not refresh between the requests that are compared
+@override_settings(TOKEN_BLACKLIST=dict(settings.TOKEN_BLACKLIST, REFRESH_INTERVAL=3600))
+class NotificationActorsTestCase(BaseNotificationsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.recipient = self.get_current_user()
+        self.article = Article.objects.create(title="This is a simple title", description="A simple description",
+                                              body="This is a simple body", author=self.recipient)
+        self.created = 0
+
+    def send_actor_notifications(self, count):
+        """
+        Send notifications from users and from comments on the article
+        :param count: the number of notifications of each kind
+        """
+        for _ in range(count):
+            self.created += 1
+            user = User.objects.create_user("reader{}".format(self.created), "reader{}@gmail.com".format(self.created),
+                                            "password")
+            comment = Comment.objects.create(article=self.article, body="A comment",
+                                             author=Profile.objects.create(user=user))
+            comment.likes.add(user, self.recipient)
+            notify.send(user, recipient=self.recipient, verb=Verbs.USER_FOLLOWING, description="A follower")
+            notify.send(comment, recipient=self.recipient, verb=Verbs.COMMENT_MENTION, target=self.article,
+                        description="A mention")
+
+    def count_queries(self):
+        """
+        :return: the number of queries to list the notifications, and the notifications
+        """
+        with CaptureQueriesContext(connection) as context:
+            _, data = self.get()
+        return len(context.captured_queries), data['data']['notifications']
+
+    def test_actors_are_fetched_in_constant_queries(self):
+        """
+        Ensure listing the notifications does not query the actors and targets of each notification
+        """
+        # the first request also loads the authenticated user
+        self.get()
+        self.send_actor_notifications(2)
+        few, _ = self.count_queries()
+        self.send_actor_notifications(5)
+        many, notifications = self.count_queries()
+
+        self.assertEqual(few, many)
+        # the recipient is also notified of each comment on their article
+        self.assertEqual(len(notifications), 21)
+
+    def test_actors_are_represented(self):
+        """
+        Ensure the batched actors and targets are represented like single ones
+        """
+        self.send_actor_notifications(1)
+        _, notifications = self.count_queries()
+        notifications = {notification['verb']: notification for notification in notifications}
+        self.assertEqual(notifications[Verbs.ARTICLE_COMMENT]['actor']['type'], "comment")
+
+        follower, mention = notifications[Verbs.USER_FOLLOWING], notifications[Verbs.COMMENT_MENTION]
+        self.assertEqual((follower['actor']['type'], follower['actor']['data']['username']), ("user", "reader1"))
+        self.assertEqual(mention['actor']['type'], "comment")
+        self.assertEqual(mention['actor']['data']['author']['username'], "reader1")
+        self.assertEqual(mention['actor']['data']['likes'], {'count': 2, 'me': False})
+        self.assertEqual(mention['target'], {"type": "article", "data": {"slug": self.article.slug}})
+
+
 class UnsentNotificationsTestCase(BaseNotificationsTestCase):
 
     def setUp(self):
@@ -155,6 +233,195 @@ class SentNotificationTestCase(BaseNotificationsTestCase):
         self.assertEqual(data['data']['count'], self.DEFAULT_NOTIFICATION_COUNT)
 
 
+class PaginatedNotificationsTestCase(BaseNotificationsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.sendManyNotifications()
+
+    def get_page(self, notification_type="all", **params):
+        """
+        Return a page of notifications
+        :return:
+        """
+        response = self.client.get(self.URLS[notification_type], params)
+        return json.loads(response.content)['data']
+
+    def test_notifications_are_paged_newest_first(self):
+        """
+        Ensure the notifications are paged by cursor, newest first
+        """
+        first = self.get_page(page_size=4)
+        self.assertEqual(first['count'], 4)
+        self.assertIsNone(first['links']['previous'])
+
+        second = json.loads(self.client.get(first['links']['next']).content)['data']
+        ids = [notification['id'] for notification in first['notifications'] + second['notifications']]
+        self.assertEqual(ids, sorted(ids, reverse=True))
+        self.assertEqual(len(set(ids)), 8)
+
+    def test_since_returns_only_new_notifications(self):
+        """
+        Ensure polling with the since cursor only returns the notifications sent since the last poll
+        """
+        since = self.get_page(page_size=4)['since']
+        self.assertEqual(self.get_page(since=since)['count'], 0)
+
+        self.sendManyNotifications(count=2)
+        page = self.get_page(since=since)
+        self.assertEqual(page['count'], 2)
+
+        # the cursor moves forward to the newest notification
+        self.assertEqual(self.get_page(since=page['since']), dict(page, count=0, notifications=[],
+                                                                  links={'next': None, 'previous': None}))
+
+    def test_only_returned_notifications_are_marked_sent(self):
+        """
+        Ensure a page only marks its own notifications as sent
+        """
+        self.get_page(page_size=4)
+
+        user = self.get_current_user()
+        self.assertEqual(user.notifications.sent().count(), 4)
+        self.assertEqual(user.notifications.unsent().count(), self.DEFAULT_NOTIFICATION_COUNT - 4)
+
+    def test_invalid_since_is_not_found(self):
+        """
+        Ensure a since cursor that cannot be decoded is rejected
+        """
+        response = self.client.get(self.URLS['all'], {'since': 'invalid'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+@override_settings(NOTIFICATIONS_STREAM={'PUBSUB': 'authors.apps.ah_notifications.pubsub.LocalPubSub',
+                                         'HEARTBEAT': 0, 'DURATION': 0, 'RETRY': 3, 'TIMEOUT': 1,
+                                         'TOKEN_TTL': 60, 'MAX_STREAMS': 10, 'RETRY_AFTER': 30,
+                                         'DATABASE_CONNECTIONS': 1})
+class NotificationStreamTestCase(BaseNotificationsTestCase):
+
+    def poll(self, **params):
+        response = self.client.get(reverse("notifications:poll-notifications"), params)
+        return json.loads(response.content)['data']
+
+    def test_poll_times_out_without_new_notifications(self):
+        """
+        Ensure a poll returns no notification once it times out, with the cursor to poll from
+        """
+        self.sendManyNotifications(count=2)
+        data = self.poll(timeout=0)
+
+        self.assertEqual(data['count'], 0)
+        self.assertIsNotNone(data['since'])
+
+    def test_poll_returns_the_notifications_since_the_cursor(self):
+        """
+        Ensure a poll returns the notifications sent after the cursor, and marks them as sent
+        """
+        self.sendManyNotifications(count=2)
+        since = self.poll(timeout=0)['since']
+        self.sendManyNotifications(count=3)
+        data = self.poll(since=since)
+
+        self.assertEqual(data['count'], 3)
+        self.assertEqual(self.poll(since=data['since'], timeout=0)['count'], 0)
+        self.assertEqual(self.get_current_user().notifications.sent().count(), 3)
+
+    def test_poll_rejects_an_invalid_timeout(self):
+        """
+        Ensure the timeout of a poll must be a number
+        """
+        response = self.client.get(reverse("notifications:poll-notifications"), {'timeout': 'soon'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(NOTIFICATIONS_STREAM={'PUBSUB': 'authors.apps.ah_notifications.pubsub.LocalPubSub',
+                                             'HEARTBEAT': 0, 'DURATION': 1, 'RETRY': 3, 'TIMEOUT': 1,
+                                             'TOKEN_TTL': 60, 'MAX_STREAMS': 10, 'RETRY_AFTER': 30,
+                                             'DATABASE_CONNECTIONS': 1})
+    def test_stream_sends_new_notifications_as_events(self):
+        """
+        Ensure the stream sends the notifications after the last event id as server-sent events
+        """
+        since = self.poll(timeout=0)['since']
+        self.sendNotification(description="A new notification")
+        response = self.client.get(reverse("notifications:stream-notifications"), HTTP_LAST_EVENT_ID=since,
+                                   HTTP_ACCEPT='text/event-stream')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+        events = iter(response.streaming_content)
+        self.assertEqual(next(events), b'retry: 3000\n\n')
+        event = next(events).decode().split('\n')
+        self.assertEqual(event[1], 'event: notifications')
+        self.assertEqual(json.loads(event[2][len('data: '):])[0]['description'], "A new notification")
+        self.assertEqual(self.poll(since=event[0][len('id: '):], timeout=0)['count'], 0)
+        # read the stream to its end, which closes the response without closing the test connection
+        list(events)
+
+    def test_streams_over_the_limit_are_refused(self):
+        """
+        Ensure the streams and polls over MAX_STREAMS are refused with a 503 telling the client when
+        to retry, and the slots are freed once the streams end
+        """
+        with mock.patch.object(stream_slots, 'open', settings.NOTIFICATIONS_STREAM['MAX_STREAMS']):
+            response = self.client.get(reverse("notifications:stream-notifications"))
+            self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+            self.assertEqual(response['Retry-After'], '30')
+            response = self.client.get(reverse("notifications:poll-notifications"), {'timeout': 0})
+            self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        response = self.client.get(reverse("notifications:stream-notifications"))
+        list(response.streaming_content)
+        self.poll(timeout=0)
+        self.assertEqual(stream_slots.open, 0)
+
+    def stream_token(self):
+        response = self.client.post(reverse("notifications:stream-token"))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return json.loads(response.content)['data']['token']
+
+    def test_stream_accepts_a_stream_token(self):
+        """
+        Ensure the stream authenticates an EventSource, which sends no Authorization header,
+        with a stream token in the query
+        """
+        token = self.stream_token()
+        self.client.credentials()
+        response = self.client.get(reverse("notifications:stream-notifications"), {'token': token})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b''.join(response.streaming_content), b'retry: 3000\n\n')
+
+    def test_stream_rejects_an_invalid_stream_token(self):
+        """
+        Ensure a stream token that was not issued does not authenticate the stream
+        """
+        self.client.credentials()
+        response = self.client.get(reverse("notifications:stream-notifications"), {'token': 'invalid'})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_stream_token_is_revoked_on_logout(self):
+        """
+        Ensure a stream token is no longer valid once its JWT is blacklisted
+        """
+        token = self.stream_token()
+        self.client.delete(reverse("authentication:logout"))
+        self.client.credentials()
+        response = self.client.get(reverse("notifications:stream-notifications"), {'token': token})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    @override_settings(NOTIFICATIONS_STREAM={'PUBSUB': 'authors.apps.ah_notifications.pubsub.LocalPubSub',
+                                             'HEARTBEAT': 0, 'DURATION': 0, 'RETRY': 3, 'TIMEOUT': 1,
+                                             'TOKEN_TTL': -1, 'MAX_STREAMS': 10, 'RETRY_AFTER': 30,
+                                             'DATABASE_CONNECTIONS': 1})
+    def test_stream_rejects_an_expired_stream_token(self):
+        """
+        Ensure a stream token is only valid for TOKEN_TTL seconds
+        """
+        token = self.stream_token()
+        self.client.credentials()
+        response = self.client.get(reverse("notifications:stream-notifications"), {'token': token})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
 class UnReadNotificationTestCase(BaseNotificationsTestCase):
     def setUp(self):
         super().setUp()
@@ -170,6 +437,35 @@ class UnReadNotificationTestCase(BaseNotificationsTestCase):
         self.assertEqual(data['data']['count'], self.DEFAULT_NOTIFICATION_COUNT)
 
 
+class UnreadNotificationsCountTestCase(BaseNotificationsTestCase):
+
+    def get_count(self):
+        response = self.client.get(reverse("notifications:unread-notifications-count"))
+        return response.status_code, json.loads(response.content)
+
+    def test_unread_count_follows_read_and_deleted_notifications(self):
+        """
+        Ensure the unread count is that of the unread notifications as they are read and deleted
+        """
+        self.sendManyNotifications()
+        status_code, data = self.get_count()
+        self.assertEqual((status_code, data['data']['count']), (status.HTTP_200_OK, self.DEFAULT_NOTIFICATION_COUNT))
+
+        notification = self.get_current_user().notifications.first()
+        self.client.put(reverse("notifications:read-notification", kwargs={'pk': notification.pk}))
+        self.assertEqual(self.get_count()[1]['data']['count'], self.DEFAULT_NOTIFICATION_COUNT - 1)
+
+        self.delete("all")
+        self.assertEqual(self.get_count()[1]['data']['count'], 0)
+
+    def test_unauthenticated_user_cannot_get_unread_count(self):
+        """
+        Ensure an unauthenticated user cannot get an unread count
+        """
+        self.logout()
+        self.assertEqual(self.get_count()[0], status.HTTP_403_FORBIDDEN)
+
+
 class ReadNotificationsTestCase(BaseNotificationsTestCase):
     def setUp(self):
         super().setUp()
@@ -268,6 +564,42 @@ class NotificationSubscriptionTestCase(AuthenticatedTestCase):
         self.assertFalse(response.data['subscription_status'])
 
 
+class NotificationPreferencesTestCase(AuthenticatedTestCase):
+
+    def put_preferences(self, preferences):
+        response = self.client.put(reverse("notifications:preferences"), data={'preferences': preferences},
+                                   format="json")
+        return response.status_code, json.loads(response.content)
+
+    def test_every_verb_defaults_to_all_deliveries(self):
+        """
+        Ensure a user without preferences is notified of every verb in-app and by email
+        """
+        response = self.client.get(reverse("notifications:preferences"))
+        preferences = json.loads(response.content)['data']['preferences']
+        self.assertEqual(preferences, dict.fromkeys(Verbs.all(), 'all'))
+
+    def test_user_can_set_their_preferences(self):
+        """
+        Ensure a user can change how they are notified of some verbs, and go back to the default
+        """
+        status_code, data = self.put_preferences({Verbs.ARTICLE_LIKE: 'none', Verbs.USER_FOLLOWING: 'in_app'})
+        self.assertEqual(status_code, status.HTTP_200_OK)
+        self.assertEqual(data['data']['preferences'][Verbs.ARTICLE_LIKE], 'none')
+
+        status_code, data = self.put_preferences({Verbs.ARTICLE_LIKE: 'all'})
+        self.assertEqual(data['data']['preferences'][Verbs.ARTICLE_LIKE], 'all')
+        self.assertEqual(data['data']['preferences'][Verbs.USER_FOLLOWING], 'in_app')
+        self.assertEqual(self.get_current_user().notification_preferences.count(), 1)
+
+    def test_unknown_verbs_and_deliveries_are_rejected(self):
+        """
+        Ensure only the known verbs and deliveries can be set
+        """
+        self.assertEqual(self.put_preferences({'unknown': 'none'})[0], status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.put_preferences({Verbs.ARTICLE_LIKE: 'sms'})[0], status.HTTP_400_BAD_REQUEST)
+
+
 class ArticleNotificationTestCase(BaseArticlesTestCase, BaseNotificationsTestCase):
 
     def test_user_gets_notification_upon_article_creation(self):
@@ -290,6 +622,44 @@ class ArticleNotificationTestCase(BaseArticlesTestCase, BaseNotificationsTestCas
         status_code, data = self.get(notification_type='unsent')
         self.assertEqual(data['data']['count'], 1)
 
+    def test_followers_are_notified_only_on_first_publish(self):
+        """
+        Ensure followers are notified once, when the article is first published, and not on later saves
+        :return:
+        """
+        self.register_and_login(self.user2)
+        self.client.post(reverse("profiles:follow", kwargs={'username': self.user['user']['username']}))
+
+        # create a draft, then publish and edit it
+        self.login(self.user)
+        slug = self.create_article()['slug']
+        self.article['article']['published'] = True
+        response = self.client.put(self.url_retrieve(slug), data=self.article, format="json")
+        slug = json.loads(response.content)['data']['article']['slug']
+        self.article['article']['title'] = "An edited title"
+        self.client.put(self.url_retrieve(slug), data=self.article, format="json")
+
+        self.login(self.user2)
+        status_code, data = self.get(notification_type='unsent')
+        self.assertEqual(data['data']['count'], 1)
+
+    def test_followers_are_notified_on_the_channels_they_prefer(self):
+        """
+        Ensure a follower who only wants emails of new articles gets the email but no notification
+        """
+        self.register_and_login(self.user2)
+        self.client.post(reverse("profiles:follow", kwargs={'username': self.user['user']['username']}))
+        self.client.put(reverse("notifications:preferences"),
+                        data={'preferences': {Verbs.ARTICLE_CREATION: 'email'}}, format="json")
+
+        self.login(self.user)
+        self.create_article(published=True)
+
+        self.login(self.user2)
+        status_code, data = self.get(notification_type='unsent')
+        self.assertEqual(data['data']['count'], 0)
+        self.assertTrue(OutboxEmail.objects.filter(to_email=self.user2['user']['email']).exists())
+
     def test_author_gets_notification_upon_article_favoriting(self):
         """
         Ensure a author gets a notification in their unread box after his article has been rated
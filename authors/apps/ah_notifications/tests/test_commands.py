@@ -0,0 +1,84 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import LiveServerTestCase, override_settings
+from django.utils import timezone
+from django.utils.six import StringIO
+from notifications.models import Notification
+from notifications.signals import notify
+
+from authors.apps.ah_notifications.models import ArchivedNotification
+from authors.apps.ah_notifications.notifications import Verbs
+from authors.apps.ah_notifications.streams import stream_slots
+from authors.apps.authentication.models import User
+from authors.apps.authentication.tests.api.test_auth import AuthenticatedTestCase
+
+
+class ArchiveNotificationsTest(AuthenticatedTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.get_current_user()
+        self.kept = [self.send(days=100), self.send(days=10, unread=False), self.send(days=10, deleted=True)]
+        self.removed = [self.send(days=100, unread=False), self.send(days=40, deleted=True)]
+
+    def send(self, days, unread=True, deleted=False):
+        """
+        Send a notification that was sent days ago
+        :return: the notification id
+        """
+        notify.send(self.user, recipient=self.user, verb=Verbs.USER_FOLLOWING, description="A follower")
+        notification = self.user.notifications.order_by('-id').first()
+        Notification.objects.filter(pk=notification.pk).update(
+            timestamp=timezone.now() - timedelta(days=days), unread=unread, deleted=deleted)
+        return notification.pk
+
+    def archive(self, *args):
+        out = StringIO()
+        call_command('archive_notifications', '--batch-size=1', '--pause=0', *args, stdout=out)
+        return out.getvalue()
+
+    def test_old_deleted_and_read_notifications_are_archived(self):
+        """
+        Ensure the old deleted and read notifications are moved to the archive in batches
+        """
+        self.assertIn('Archived 2 notification(s) in 2 batch(es).', self.archive())
+
+        self.assertEqual(sorted(Notification.objects.values_list('pk', flat=True)), sorted(self.kept))
+        archived = ArchivedNotification.objects.get(pk=self.removed[0])
+        self.assertEqual((archived.recipient, archived.verb, archived.unread), (self.user, Verbs.USER_FOLLOWING, False))
+        self.assertEqual(ArchivedNotification.objects.count(), 2)
+
+    def test_notifications_can_be_deleted_for_good(self):
+        """
+        Ensure the notifications are not archived when they are hard deleted
+        """
+        self.assertIn('Deleted 2 notification(s) in 2 batch(es).', self.archive('--hard-delete'))
+
+        self.assertEqual(Notification.objects.count(), 3)
+        self.assertFalse(ArchivedNotification.objects.exists())
+
+
+@override_settings(NOTIFICATIONS_STREAM=dict(settings.NOTIFICATIONS_STREAM, HEARTBEAT=1, DURATION=5, MAX_STREAMS=2))
+class BenchmarkNotificationStreamTest(LiveServerTestCase):
+
+    def test_benchmark_streams_from_the_server(self):
+        """
+        Ensure the benchmark opens streams to the server, some of them over its limit, and times the
+        notifications they get
+        """
+        out = StringIO()
+        call_command('benchmark_notification_stream', url=self.live_server_url, connections=3, messages=2,
+                     timeout=3, stdout=out)
+
+        self.assertIn('Opened 2 of 3 notification stream(s)', out.getvalue())
+        self.assertIn('refused:              1 with Retry-After', out.getvalue())
+        self.assertIn('2 of 2 notification(s) delivered', out.getvalue())
+        self.assertFalse(User.objects.filter(username__startswith='stream-benchmark-').exists())
+        # the server ends the streams on their next heartbeat once the benchmark disconnected
+        deadline = time.monotonic() + 5
+        while stream_slots.open and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(stream_slots.open, 0)
@@ -0,0 +1,266 @@
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.six import StringIO
+from notifications.signals import notify
+
+from authors.apps.ah_notifications.models import NotificationPreference, UnreadNotificationCounter
+from authors.apps.ah_notifications.notifications import (
+    Verbs, bulk_notify, delete_notifications, notify_user, read_notification,
+)
+from authors.apps.articles.models import Article
+from authors.apps.authentication.models import User
+from authors.apps.authentication.tests.api.test_auth import AuthenticatedTestCase
+
+
+class BulkNotifyTest(AuthenticatedTestCase):
+
+    def test_notifies_every_recipient_in_batches(self):
+        """
+        Ensure a notification is created for every recipient with one insert per batch
+        """
+        author = self.get_current_user()
+        recipients = [User.objects.create_user("reader{}".format(i), "reader{}@gmail.com".format(i), "password")
+                      for i in range(5)]
+
+        with CaptureQueriesContext(connection) as context:
+            created = bulk_notify(author, (user.pk for user in recipients), verb=Verbs.ARTICLE_CREATION,
+                                  description="A new article", batch_size=2)
+        inserts = [query for query in context.captured_queries
+                   if query['sql'].startswith('INSERT INTO "notifications_notification"')]
+
+        self.assertEqual(created, 5)
+        self.assertEqual(len(inserts), 3)
+        for user in recipients:
+            notification = user.notifications.get()
+            self.assertEqual((notification.verb, notification.actor), (Verbs.ARTICLE_CREATION, author))
+
+
+class NotifyCoalescedTest(AuthenticatedTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.author = self.get_current_user()
+        self.article = Article.objects.create(title="This is a simple title", description="A simple description",
+                                              body="This is a simple body", author=self.author)
+        self.readers = [User.objects.create_user("reader{}".format(i), "reader{}@gmail.com".format(i), "password")
+                        for i in range(3)]
+
+    def test_likes_merge_into_a_digest(self):
+        """
+        Ensure the likes of an article update a single notification in place
+        """
+        for reader in self.readers:
+            self.article.like(reader)
+
+        notification = self.author.notifications.get()
+        self.assertEqual(notification.description, "reader2 and 2 others liked your article")
+        self.assertEqual((notification.actor, notification.target), (self.readers[2], self.article))
+        self.assertEqual(notification.data['count'], 3)
+
+    def test_read_digest_is_not_merged(self):
+        """
+        Ensure a like after the digest has been read starts a new notification
+        """
+        self.article.like(self.readers[0])
+        self.author.notifications.mark_all_as_read()
+        self.article.like(self.readers[1])
+
+        self.assertEqual(self.author.notifications.count(), 2)
+        self.assertEqual(self.author.notifications.unread().get().description, "reader1 just liked your article")
+
+    def test_digest_outside_the_window_is_not_merged(self):
+        """
+        Ensure only the events within the coalescing window are merged
+        """
+        self.article.like(self.readers[0])
+        self.author.notifications.update(timestamp=timezone.now() - timedelta(days=2))
+        self.article.like(self.readers[1])
+
+        self.assertEqual(self.author.notifications.count(), 2)
+
+    def test_verbs_are_not_merged(self):
+        """
+        Ensure only the events of the same verb are merged
+        """
+        self.article.like(self.readers[0])
+        self.article.dislike(self.readers[1])
+
+        self.assertEqual(sorted(self.author.notifications.values_list('verb', flat=True)),
+                         [Verbs.ARTICLE_DISLIKE, Verbs.ARTICLE_LIKE])
+
+    def test_repeated_likes_are_not_notified(self):
+        """
+        Ensure liking an article the user already likes does not notify the author again
+        """
+        self.article.like(self.readers[0])
+        self.article.like(self.readers[0])
+
+        notification = self.author.notifications.get()
+        self.assertEqual(notification.description, "reader0 just liked your article")
+        self.assertEqual(notification.data['count'], 1)
+
+    @override_settings(NOTIFICATIONS_COALESCE={'ENABLED': True, 'WINDOW': 60, 'ACTORS': 2})
+    def test_digest_keeps_the_latest_actors(self):
+        """
+        Ensure the digest counts every new like but only keeps the ids of the latest actors
+        """
+        for reader in self.readers:
+            self.article.like(reader)
+
+        notification = self.author.notifications.get()
+        self.assertEqual(notification.data['count'], 3)
+        self.assertEqual(notification.data['actors'], [self.readers[1].pk, self.readers[2].pk])
+
+    @override_settings(NOTIFICATIONS_COALESCE={'ENABLED': False, 'WINDOW': 60})
+    def test_disabled_coalescing_notifies_every_event(self):
+        """
+        Ensure there is a notification per event when coalescing is disabled
+        """
+        for reader in self.readers:
+            self.article.like(reader)
+
+        self.assertEqual(self.author.notifications.count(), 3)
+
+
+class UnreadNotificationCounterTest(AuthenticatedTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.get_current_user()
+
+    def send(self, count):
+        for _ in range(count):
+            notify.send(self.user, recipient=self.user, verb=Verbs.USER_FOLLOWING)
+
+    def unread_count(self):
+        return UnreadNotificationCounter.unread_count(self.user)
+
+    def test_new_notifications_are_counted(self):
+        """
+        Ensure the notifications sent one at a time and in bulk are counted
+        """
+        self.send(2)
+        bulk_notify(self.user, [self.user.pk], verb=Verbs.ARTICLE_CREATION)
+        self.assertEqual(self.unread_count(), 3)
+
+    def test_read_notification_is_uncounted_once(self):
+        """
+        Ensure reading a notification again does not uncount it again
+        """
+        self.send(2)
+        notification = self.user.notifications.first()
+        read_notification(notification)
+        read_notification(notification)
+
+        self.assertEqual(self.unread_count(), 1)
+        self.assertFalse(self.user.notifications.get(pk=notification.pk).unread)
+
+    def test_deleted_notifications_are_uncounted(self):
+        """
+        Ensure only the unread notifications that are deleted are uncounted
+        """
+        self.send(3)
+        read_notification(self.user.notifications.first())
+
+        self.assertEqual(delete_notifications(self.user.notifications.all()), 3)
+        self.assertEqual(self.unread_count(), 0)
+        self.assertEqual(delete_notifications(self.user.notifications.all()), 0)
+
+    def test_reconcile_repairs_drifted_counters(self):
+        """
+        Ensure the reconciliation recounts the drifted and missing counters
+        """
+        self.send(2)
+        other = User.objects.create_user("reader", "reader@gmail.com", "password")
+        notify.send(self.user, recipient=other, verb=Verbs.USER_FOLLOWING)
+        UnreadNotificationCounter.objects.filter(user=self.user).update(count=10)
+        UnreadNotificationCounter.objects.filter(user=other).delete()
+
+        out = StringIO()
+        call_command('reconcile_notification_counters', stdout=out)
+
+        self.assertIn('Repaired the unread notification counters of 2 user(s).', out.getvalue())
+        self.assertEqual((self.unread_count(), UnreadNotificationCounter.unread_count(other)), (2, 1))
+
+    def test_reconcile_resets_counters_without_unread_notifications(self):
+        """
+        Ensure the reconciliation zeroes the counters of the users without unread notifications
+        and leaves the right counters alone
+        """
+        self.send(1)
+        read_notification(self.user.notifications.get())
+        other = User.objects.create_user("reader", "reader@gmail.com", "password")
+        notify.send(self.user, recipient=other, verb=Verbs.USER_FOLLOWING)
+        UnreadNotificationCounter.objects.filter(user=self.user).update(count=3)
+
+        out = StringIO()
+        call_command('reconcile_notification_counters', stdout=out)
+
+        self.assertIn('Repaired the unread notification counters of 1 user(s).', out.getvalue())
+        self.assertEqual((self.unread_count(), UnreadNotificationCounter.unread_count(other)), (0, 1))
+
+    def test_reconcile_repairs_the_counters_in_batches(self):
+        """
+        Ensure every batch of counters is recounted
+        """
+        readers = [User.objects.create_user("reader{}".format(i), "reader{}@gmail.com".format(i), "password")
+                   for i in range(3)]
+        for reader in readers:
+            notify.send(self.user, recipient=reader, verb=Verbs.USER_FOLLOWING)
+        UnreadNotificationCounter.objects.filter(user__in=readers).update(count=5)
+
+        out = StringIO()
+        call_command('reconcile_notification_counters', batch_size=2, stdout=out)
+
+        self.assertIn('Repaired the unread notification counters of 3 user(s).', out.getvalue())
+        self.assertEqual([UnreadNotificationCounter.unread_count(reader) for reader in readers], [1, 1, 1])
+
+
+class NotificationPreferenceTest(AuthenticatedTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.author = self.get_current_user()
+        self.article = Article.objects.create(title="This is a simple title", description="A simple description",
+                                              body="This is a simple body", author=self.author)
+        self.reader = User.objects.create_user("reader", "reader@gmail.com", "password")
+
+    def prefer(self, verb, delivery):
+        NotificationPreference.objects.create(user=self.author, verb=verb, delivery=delivery)
+
+    def test_unwanted_notifications_are_not_written(self):
+        """
+        Ensure no notification is inserted for a verb the recipient does not want in-app
+        """
+        self.prefer(Verbs.ARTICLE_LIKE, NotificationPreference.EMAIL)
+
+        with CaptureQueriesContext(connection) as context:
+            self.article.like(self.reader)
+        inserts = [query for query in context.captured_queries
+                   if query['sql'].startswith('INSERT INTO "notifications_notification"')]
+
+        self.assertEqual(inserts, [])
+        self.assertFalse(self.author.notifications.exists())
+
+    def test_other_verbs_are_still_notified(self):
+        """
+        Ensure a preference only applies to its verb
+        """
+        self.prefer(Verbs.ARTICLE_LIKE, NotificationPreference.NONE)
+        self.article.dislike(self.reader)
+
+        self.assertTrue(notify_user(self.reader, self.author, Verbs.USER_FOLLOWING))
+        self.assertEqual(self.author.notifications.count(), 2)
+
+    def test_changed_preferences_are_not_cached(self):
+        """
+        Ensure the cached preferences of a user are dropped when they change
+        """
+        self.assertTrue(notify_user(self.reader, self.author, Verbs.USER_FOLLOWING))
+        self.prefer(Verbs.USER_FOLLOWING, NotificationPreference.NONE)
+        self.assertFalse(notify_user(self.reader, self.author, Verbs.USER_FOLLOWING))
@@ -0,0 +1,73 @@
+import threading
+
+from django.test import SimpleTestCase, TransactionTestCase
+from notifications.signals import notify
+
+from authors.apps.ah_notifications.notifications import Verbs, bulk_notify
+from authors.apps.ah_notifications.pubsub import LocalPubSub, get_pubsub, user_channel
+from authors.apps.authentication.models import User
+
+
+class LocalPubSubTest(SimpleTestCase):
+
+    def setUp(self):
+        self.pubsub = LocalPubSub()
+
+    def test_publish_wakes_the_subscribers_of_the_channel(self):
+        """
+        Ensure only the subscribers of a channel are woken up by its messages
+        """
+        subscription, other = self.pubsub.subscribe('one'), self.pubsub.subscribe('two')
+
+        self.assertEqual(self.pubsub.publish('one'), 1)
+        self.assertTrue(subscription.wait(0))
+        self.assertFalse(other.wait(0))
+        # the message is consumed by the wait
+        self.assertFalse(subscription.wait(0))
+
+    def test_publish_wakes_a_waiting_subscriber(self):
+        """
+        Ensure a subscriber waiting in another thread is woken up
+        """
+        subscription = self.pubsub.subscribe('one')
+        woken = []
+        thread = threading.Thread(target=lambda: woken.append(subscription.wait(10)))
+        thread.start()
+
+        self.pubsub.publish('one')
+        thread.join(5)
+        self.assertEqual(woken, [True])
+
+    def test_closed_subscriptions_are_removed(self):
+        """
+        Ensure closing the last subscription of a channel removes the channel
+        """
+        subscription = self.pubsub.subscribe('one')
+        subscription.close()
+
+        self.assertEqual(self.pubsub.publish('one'), 0)
+        self.assertEqual(self.pubsub.channels, {})
+
+
+class PublishNotificationsTest(TransactionTestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user("reader", "reader@gmail.com", "password")
+        self.subscription = get_pubsub().subscribe(user_channel(self.user.pk))
+
+    def tearDown(self):
+        self.subscription.close()
+
+    def test_saved_notifications_are_published(self):
+        """
+        Ensure the streams of the recipient are woken up once a notification is committed
+        """
+        notify.send(self.user, recipient=self.user, verb=Verbs.USER_FOLLOWING)
+        self.assertTrue(self.subscription.wait(0))
+
+    def test_bulk_notifications_are_published(self):
+        """
+        Ensure notifications created in bulk also wake up the streams of their recipients
+        """
+        bulk_notify(self.user, [self.user.pk], verb=Verbs.ARTICLE_CREATION)
+        self.assertTrue(self.subscription.wait(0))
@@ -3,9 +3,14 @@ from django.urls import path
 from .views import (
     AllNotificationsAPIView,
     UnreadNotificationsAPIView,
+    UnreadNotificationsCountAPIView,
     ReadNotificationsAPIView,
     UnsentNotificationsAPIView,
     SentNotificationsAPIView,
+    NotificationStreamTokenAPIView,
+    NotificationStreamAPIView,
+    NotificationPollAPIView,
+    NotificationPreferencesAPIView,
     SubscribeAPIView,
     SubscriptionStatusAPIView,
     )
@@ -16,10 +21,15 @@ app_name = "notifications"
 urlpatterns = [
     path('all/', AllNotificationsAPIView.as_view(), name="notifications"),
     path('unread/', UnreadNotificationsAPIView.as_view(), name="unread-notifications"),
+    path('unread/count/', UnreadNotificationsCountAPIView.as_view(), name="unread-notifications-count"),
     path('read/', ReadNotificationsAPIView.as_view(), name="read-notifications"),
     path('read/<int:pk>/', ReadNotificationsAPIView.as_view(), name="read-notification"),
     path('unsent/', UnsentNotificationsAPIView.as_view(), name="unsent-notifications"),
     path('sent/', SentNotificationsAPIView.as_view(), name="sent-notifications"),
+    path('stream/', NotificationStreamAPIView.as_view(), name="stream-notifications"),
+    path('stream/token/', NotificationStreamTokenAPIView.as_view(), name="stream-token"),
+    path('poll/', NotificationPollAPIView.as_view(), name="poll-notifications"),
+    path('preferences/', NotificationPreferencesAPIView.as_view(), name="preferences"),
     path('subscribe/', SubscribeAPIView.as_view(), name="subscribe"),
     path('subscription-status/', SubscriptionStatusAPIView.as_view(), name="subscription-status")
 ]
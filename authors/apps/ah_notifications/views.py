@@ -1,11 +1,23 @@
+import json
+import time
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
 from notifications.models import Notification
 from rest_framework import generics, status
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
 
-from authors.apps.ah_notifications.serializers import NotificationSerializer
-from authors.apps.core.renderers import BaseJSONRenderer
+from authors.apps.ah_notifications.models import UnreadNotificationCounter
+from authors.apps.ah_notifications.notifications import delete_notifications, mark_sent, read_notification
+from authors.apps.ah_notifications.pagination import NotificationPagination
+from authors.apps.ah_notifications.serializers import NotificationPreferencesSerializer, NotificationSerializer
+from authors.apps.ah_notifications.streams import NotificationStream, database_slots
+from authors.apps.core.renderers import BaseJSONRenderer, EventStreamRenderer
 from rest_framework.views import APIView
+from authors.apps.authentication.backends import JWTAuthentication, StreamTokenAuthentication
 from authors.apps.authentication.models import User
 from authors.apps.core.mail_sender import send_email
 
@@ -14,17 +26,25 @@ class NotificationAPIView(generics.ListAPIView, generics.DestroyAPIView):
     permission_classes = (IsAuthenticated,)
     serializer_class = NotificationSerializer
     renderer_classes = (BaseJSONRenderer,)
+    pagination_class = NotificationPagination
+    # whether listing the notifications marks them as sent
+    marks_sent = False
 
     def get(self, request, *args, **kwargs):
-        notifications = self.notifications(request)
+        queryset = self.notifications(request)
+        page = self.paginate_queryset(queryset)
+        notifications = list(queryset) if page is None else page
+        if self.marks_sent:
+            # only the notifications returned, they are all the client has seen
+            mark_sent(notifications)
         serializer = self.serializer_class(notifications, many=True, context={'request': request})
 
-        return Response({"count": notifications.count(), "notifications": serializer.data})
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response({"count": len(notifications), "notifications": serializer.data})
 
     def destroy(self, request, *args, **kwargs):
-        notifications = self.notifications(request)
-        count = notifications.count()
-        notifications.mark_all_as_deleted()
+        count = delete_notifications(self.notifications(request))
 
         return Response({"message": "{} notifications deleted".format(count)})
 
@@ -36,9 +56,9 @@ class AllNotificationsAPIView(NotificationAPIView):
     """
     List all the notifications for this user
     """
+    marks_sent = True
 
     def notifications(self, request):
-        request.user.notifications.mark_as_sent()
         return request.user.notifications.active()
 
 
@@ -46,12 +66,124 @@ class UnreadNotificationsAPIView(NotificationAPIView):
     """
     List all unread notifications for this user
     """
+    marks_sent = True
 
     def notifications(self, request):
-        request.user.notifications.mark_as_sent()
         return request.user.notifications.unread()
 
 
+class UnreadNotificationsCountAPIView(APIView):
+    """
+    Get the number of unread notifications of this user, for the unread badge
+    """
+    permission_classes = (IsAuthenticated,)
+    renderer_classes = (BaseJSONRenderer,)
+
+    def get(self, request):
+        return Response({"count": UnreadNotificationCounter.unread_count(request.user)})
+
+
+class NotificationStreamTokenAPIView(APIView):
+    """
+    Issue a short-lived token to open the notification stream with, as the `token` query
+    parameter, since a browser EventSource cannot send the Authorization header
+    """
+    permission_classes = (IsAuthenticated,)
+    renderer_classes = (BaseJSONRenderer,)
+
+    def post(self, request):
+        return Response({"token": StreamTokenAuthentication.issue(request.user, request.auth),
+                         "expires_in": settings.NOTIFICATIONS_STREAM['TOKEN_TTL']}, status=status.HTTP_201_CREATED)
+
+
+class StreamAPIView(APIView):
+    """
+    A view that holds a notification stream open, authenticated within one of the `database_slots`
+    of the process like the stream uses the database, see `NotificationStream`
+    """
+
+    def initial(self, request, *args, **kwargs):
+        with database_slots:
+            try:
+                super().initial(request, *args, **kwargs)
+            finally:
+                NotificationStream.release_connection()
+
+
+class NotificationStreamAPIView(StreamAPIView):
+    """
+    Stream the new unread notifications of the user as server-sent events. The event id is
+    the since cursor, so a reconnecting EventSource resumes from the last notification it got.
+    The stream ends after DURATION seconds, for the client to reconnect. Once the process has
+    MAX_STREAMS streams open, the others are refused with a 503 and a Retry-After header.
+    Browsers authenticate with a token from the stream token endpoint in the `token` query
+    parameter, and get a new one when the stream fails to reconnect once the token expired.
+    """
+    authentication_classes = (StreamTokenAuthentication, JWTAuthentication)
+    permission_classes = (IsAuthenticated,)
+    renderer_classes = (BaseJSONRenderer, EventStreamRenderer)
+
+    def get(self, request):
+        since = request.META.get('HTTP_LAST_EVENT_ID') or request.query_params.get('since')
+        stream = NotificationStream(request.user, since)
+        response = StreamingHttpResponse(self.events(request, stream), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # do not let a proxy buffer the events
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    @staticmethod
+    def events(request, stream):
+        config = settings.NOTIFICATIONS_STREAM
+        deadline = time.monotonic() + config['DURATION']
+        try:
+            yield 'retry: {}\n\n'.format(config['RETRY'] * 1000)
+            while time.monotonic() < deadline:
+                notifications = stream.wait(config['HEARTBEAT'])
+                if not notifications:
+                    yield ': keep-alive\n\n'
+                    continue
+                with stream.database():
+                    mark_sent(notifications)
+                    data = NotificationSerializer(notifications, many=True, context={'request': request}).data
+                yield 'id: {}\nevent: notifications\ndata: {}\n\n'.format(
+                    stream.since, json.dumps(data, cls=JSONEncoder))
+        finally:
+            stream.close()
+
+
+class NotificationPollAPIView(StreamAPIView):
+    """
+    Wait for the new unread notifications of the user, for the clients that cannot use the
+    event stream. Returns as soon as there are notifications after the `since` cursor, or
+    empty after `timeout` seconds. Poll again with the returned `since`. The polls count as
+    streams towards MAX_STREAMS.
+    """
+    permission_classes = (IsAuthenticated,)
+    renderer_classes = (BaseJSONRenderer,)
+
+    def get(self, request):
+        timeout = self.get_timeout(request)
+        stream = NotificationStream(request.user, request.query_params.get('since'))
+        try:
+            notifications = stream.wait(timeout)
+        finally:
+            stream.close()
+        with stream.database():
+            mark_sent(notifications)
+            data = NotificationSerializer(notifications, many=True, context={'request': request}).data
+
+        return Response({"count": len(notifications), "since": stream.since, "notifications": data})
+
+    @staticmethod
+    def get_timeout(request):
+        maximum = settings.NOTIFICATIONS_STREAM['TIMEOUT']
+        try:
+            return min(max(float(request.query_params.get('timeout', maximum)), 0), maximum)
+        except ValueError:
+            raise ValidationError({'timeout': 'The timeout must be a number of seconds.'})
+
+
 class ReadNotificationsAPIView(NotificationAPIView, generics.UpdateAPIView):
     """
     List all the Read  notifications for this user
@@ -64,7 +196,7 @@ class ReadNotificationsAPIView(NotificationAPIView, generics.UpdateAPIView):
         except Notification.DoesNotExist:
             return Response({"error": "Notification not found"}, status.HTTP_404_NOT_FOUND)
 
-        notification.mark_as_read()
+        read_notification(notification)
         return Response({"message": "Notification has been read"})
 
     def notifications(self, request):
@@ -89,6 +221,24 @@ class SentNotificationsAPIView(NotificationAPIView):
         return request.user.notifications.active().sent()
 
 
+class NotificationPreferencesAPIView(APIView):
+    """
+    Get and set how the user wants to be notified of each verb: in-app and email, in-app only,
+    email only or not at all
+    """
+    permission_classes = (IsAuthenticated,)
+    renderer_classes = (BaseJSONRenderer,)
+
+    def get(self, request):
+        return Response(NotificationPreferencesSerializer(request.user).data)
+
+    def put(self, request):
+        serializer = NotificationPreferencesSerializer(request.user, data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data)
+
+
 class SubscribeAPIView(APIView):
     """
     Allow users to subscribe to notifications
@@ -99,7 +249,8 @@ class SubscribeAPIView(APIView):
     def post(self, request):
         user = request.user
         user.is_subscribed = True
-        user.save()
+        # only the subscription, the other fields of the authenticated user may be stale
+        user.save(update_fields=['is_subscribed', 'updated_at'])
         data = {
             'username': request.user.username
         }
@@ -120,7 +271,8 @@ class SubscribeAPIView(APIView):
     def delete(self, request):
         user = request.user
         user.is_subscribed = False
-        user.save()
+        # only the subscription, the other fields of the authenticated user may be stale
+        user.save(update_fields=['is_subscribed', 'updated_at'])
         data = {
             'username': request.user.username,
         }
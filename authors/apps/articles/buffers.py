@@ -0,0 +1,162 @@
+import atexit
+import logging
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from authors.apps.articles.models import Article, ArticleDailyStats, ArticleView
+from authors.apps.authentication.models import User
+
+logger = logging.getLogger(__name__)
+
+
+class ArticleViewBuffer:
+    """
+    Records article views without writing to the database on every read.
+    The (article, user) pairs are kept in memory, de-duplicated with the time of their
+    first read and the number of reads, and written in one conflict-ignoring insert when
+    the buffer is full, when it has been holding views for longer than the flush interval,
+    and when the process exits.
+    With buffering disabled, the default, every view is written immediately.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.started_at = None
+        self.timer = None
+
+    @property
+    def config(self):
+        return settings.ARTICLE_VIEWS_BUFFER
+
+    def record(self, article, user):
+        """
+        Record that the user has read the article
+        :param article:
+        :param user:
+        :return:
+        """
+        if not self.config['ENABLED']:
+            ArticleView.objects.get_or_create(article=article, user=user)
+            ArticleDailyStats.record(article.pk, views=1)
+            return
+
+        with self.lock:
+            if not self.pending:
+                self.started_at = time.monotonic()
+                self.schedule_flush()
+            read_at, reads = self.pending.get((article.pk, user.pk), (timezone.now(), 0))
+            self.pending[article.pk, user.pk] = (read_at, reads + 1)
+            due = len(self.pending) >= self.config['MAX_SIZE'] or \
+                time.monotonic() - self.started_at >= self.config['FLUSH_INTERVAL']
+
+        if due:
+            self.flush()
+
+    def schedule_flush(self):
+        """
+        Make sure views recorded by an idle process are written after the flush interval
+        :return:
+        """
+        self.timer = threading.Timer(self.config['FLUSH_INTERVAL'], self.flush_in_background)
+        self.timer.daemon = True
+        self.timer.start()
+
+    def flush_in_background(self):
+        try:
+            self.flush()
+        finally:
+            # the timer thread has its own connection which would otherwise be left open
+            connection.close()
+
+    def take_pending(self):
+        """
+        Empty the buffer, cancelling the scheduled flush
+        :return: the time of the first read and the number of reads of each buffered (article, user) pair
+        """
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+        return pending
+
+    def flush(self):
+        """
+        Write the buffered views, update the views counter of the articles that gained readers
+        and add the reads and new readers to the daily stats of the articles
+        :return: the number of views that were new
+        """
+        pending = self.take_pending()
+        if not pending:
+            return 0
+
+        try:
+            with transaction.atomic():
+                inserted = self.insert(pending)
+                self.count(pending, inserted)
+        except Exception:
+            logger.exception("Could not write %d buffered article view(s)", len(pending))
+            return 0
+
+        return len(inserted)
+
+    @staticmethod
+    def insert(pending):
+        """
+        Insert the (article, user) pairs, skipping the ones already recorded and the ones whose article
+        or user has been removed since the view.
+        :param pending:
+        :return: the inserted (article, user) pairs
+        """
+        values = ", ".join(["(%s, %s, %s)"] * len(pending))
+        sql = """
+            INSERT INTO {view} (article_id, user_id, created_at)
+            SELECT v.article_id, v.user_id, v.created_at FROM (VALUES {values}) AS v (article_id, user_id, created_at)
+            WHERE EXISTS (SELECT 1 FROM {article} a WHERE a.id = v.article_id)
+              AND EXISTS (SELECT 1 FROM {user} u WHERE u.id = v.user_id)
+            ON CONFLICT (article_id, user_id) DO NOTHING
+            RETURNING article_id, user_id
+        """.format(view=ArticleView._meta.db_table, article=Article._meta.db_table,
+                   user=User._meta.db_table, values=values)
+        params = [value for pair, (read_at, _) in sorted(pending.items()) for value in pair + (read_at,)]
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return {tuple(row) for row in cursor.fetchall()}
+
+    @staticmethod
+    def count(pending, inserted):
+        """
+        Add the buffered reads to the counters of the articles
+        :param pending:
+        :param inserted: the (article, user) pairs which were new
+        :return:
+        """
+        new_readers = Counter(article_id for article_id, _ in inserted)
+        for article_id, views in new_readers.items():
+            Article.objects_with_deleted.filter(pk=article_id).update_counters(views_count=views)
+
+        daily = {}
+        for pair, (read_at, reads) in pending.items():
+            key = (pair[0], timezone.localdate(read_at))
+            views, readers = daily.get(key, (0, 0))
+            daily[key] = (views + reads, readers + (pair in inserted))
+        # articles removed since they were read have no stats left to add to
+        existing = set(Article.objects_with_deleted.filter(
+            pk__in={article_id for article_id, _ in daily}).values_list('pk', flat=True))
+        # in the order the compaction locks the stats in
+        for (article_id, day), (views, readers) in sorted(daily.items()):
+            if article_id in existing:
+                ArticleDailyStats.record(article_id, day, views=views, readers=readers)
+
+
+article_views = ArticleViewBuffer()
+
+# write whatever is still buffered when the worker shuts down
+atexit.register(article_views.flush)
@@ -0,0 +1,24 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from authors.apps.articles.search_engine import search_engine
+
+
+class Command(BaseCommand):
+    help = 'Builds the search index of the published articles and saves it for the workers to load, ' \
+           'see the engine ARTICLE_SEARCH[\'BACKEND\'].'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default=settings.ARTICLE_SEARCH['INDEX_PATH'],
+                            help='The file to save the index to. Defaults to ARTICLE_SEARCH[\'INDEX_PATH\'].')
+
+    def handle(self, *args, **options):
+        if not options['path']:
+            raise CommandError('Set ARTICLE_SEARCH_INDEX_PATH or give a --path to save the index to.')
+
+        started = time.perf_counter()
+        indexed = search_engine.save(options['path'])
+        self.stdout.write(self.style.SUCCESS('Indexed {} article(s) to {} in {:.2f}s.'.format(
+            indexed, options['path'], time.perf_counter() - started)))
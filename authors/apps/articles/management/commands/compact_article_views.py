@@ -0,0 +1,63 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from authors.apps.articles.models import ArticleDailyStats, ArticleView
+
+# lock the stats of the compacted days, in the order the view buffer adds to them, so that the readers
+# it adds meanwhile wait for the compaction instead of being overwritten by it
+LOCK_SQL = '''
+    SELECT 1 FROM {stats} WHERE day >= %s ORDER BY article_id, day FOR UPDATE
+'''
+
+# set the readers of the locked days to the recount, days whose views have all been removed have none left
+REPAIR_SQL = '''
+    UPDATE {stats} SET readers = COALESCE(actual.readers, 0)
+    FROM {stats} AS current LEFT JOIN ({actual}) AS actual
+    ON actual.article_id = current.article_id AND actual.day = current.day
+    WHERE {stats}.id = current.id AND current.day >= %s
+    RETURNING actual.article_id
+'''
+
+# create the stats of the days that have views but no stats yet, the ones created meanwhile count their readers
+CREATE_SQL = '''
+    INSERT INTO {stats} (article_id, day, views, readers, likes, comments)
+    SELECT actual.article_id, actual.day, 0, actual.readers, 0, 0 FROM ({actual}) AS actual
+    ON CONFLICT (article_id, day) DO NOTHING
+'''
+
+
+class Command(BaseCommand):
+    help = 'Compacts the article views of the last days into the daily stats of the articles, recounting ' \
+           'the new readers of each article per day.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=1,
+                            help='The number of days before today to compact. Defaults to 1.')
+
+    def handle(self, *args, **options):
+        since = timezone.localdate() - timedelta(days=options['days'])
+        compacted = self.compact(since)
+        self.stdout.write(self.style.SUCCESS(
+            'Compacted the views of {} article day(s) since {}.'.format(compacted, since)))
+
+    def compact(self, since):
+        """
+        :return: the number of article days that have views
+        """
+        actual, params = ArticleView.objects.filter(created_at__date__gte=since).annotate(
+            day=TruncDate('created_at')).order_by().values('article_id', 'day').annotate(
+            readers=Count('pk')).values_list('article_id', 'day', 'readers').query.sql_with_params()
+        stats = ArticleDailyStats._meta.db_table
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(LOCK_SQL.format(stats=stats), [since])
+            # counted once the stats are locked, with the views committed before
+            cursor.execute(REPAIR_SQL.format(stats=stats, actual=actual), params + (since,))
+            compacted = sum(1 for article_id, in cursor.fetchall() if article_id is not None)
+            cursor.execute(CREATE_SQL.format(stats=stats, actual=actual), params)
+            return compacted + cursor.rowcount
@@ -0,0 +1,75 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from authors.apps.articles.models import (
+    Article, ArticleRating, ArticleRatingSummary, ArticleView, Comment, FavouriteArticle,
+)
+
+
+def related_total(model, aggregate=None):
+    """
+    Build a subquery that aggregates the rows of the model that belong to each article.
+    Counts the rows unless another aggregate is given.
+    """
+    rows = model.objects.filter(article_id=OuterRef('pk')).order_by().values('article_id')
+    rows = rows.annotate(total=aggregate or Count('pk')).values('total')
+    return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+
+class Command(BaseCommand):
+    help = 'Recounts the engagement counters and rating summaries of every article and repairs the ones ' \
+           'that have drifted.'
+
+    def handle(self, *args, **options):
+        repaired = self.repair_counters()
+        self.stdout.write(self.style.SUCCESS('Repaired the counters of {} article(s).'.format(repaired)))
+
+        repaired = self.repair_rating_summaries()
+        self.stdout.write(self.style.SUCCESS('Repaired the rating summaries of {} article(s).'.format(repaired)))
+
+    def repair_counters(self):
+        actual_counters = {
+            'actual_likes_count': related_total(Article.likes.through),
+            'actual_dislikes_count': related_total(Article.dislikes.through),
+            'actual_comments_count': related_total(Comment),
+            'actual_views_count': related_total(ArticleView),
+            'actual_favourites_count': related_total(FavouriteArticle),
+        }
+        articles = Article.objects_with_deleted.annotate(**actual_counters).values(
+            'pk', *Article.COUNTERS, *actual_counters.keys())
+
+        repaired = 0
+        for article in articles.iterator():
+            drift = {
+                counter: article['actual_' + counter]
+                for counter in Article.COUNTERS if article[counter] != article['actual_' + counter]
+            }
+            if drift:
+                Article.objects_with_deleted.filter(pk=article['pk']).update(**drift)
+                repaired += 1
+        return repaired
+
+    def repair_rating_summaries(self):
+        stars = [ArticleRatingSummary.star_field(star) for star in ArticleRatingSummary.STARS]
+
+        # the actual number of ratings of every article for each star
+        actual = defaultdict(lambda: dict.fromkeys(stars, 0))
+        ratings = ArticleRating.objects.filter(rating__in=ArticleRatingSummary.STARS).order_by().values(
+            'article_id', 'rating').annotate(total=Count('pk'))
+        for rating in ratings:
+            actual[rating['article_id']][ArticleRatingSummary.star_field(rating['rating'])] = rating['total']
+
+        repaired = 0
+        for summary in ArticleRatingSummary.objects.values('article_id', *stars).iterator():
+            star_counts = actual.pop(summary['article_id'], dict.fromkeys(stars, 0))
+            if any(summary[star] != star_counts[star] for star in stars):
+                ArticleRatingSummary.objects.filter(article_id=summary['article_id']).update(**star_counts)
+                repaired += 1
+
+        # articles that have ratings but no summary yet
+        ArticleRatingSummary.objects.bulk_create(
+            ArticleRatingSummary(article_id=article_id, **star_counts) for article_id, star_counts in actual.items())
+        return repaired + len(actual)
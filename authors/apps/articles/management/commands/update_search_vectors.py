@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from authors.apps.articles.models import Article
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the search vectors of every article, e.g. after the ARTICLE_SEARCH[\'CONFIG\'] ' \
+           'text search configuration changed.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='The number of articles updated at a time. Defaults to 1000.')
+
+    def handle(self, *args, **options):
+        article_ids = Article.objects_with_deleted.order_by('pk').values_list('pk', flat=True)
+        last, updated = 0, 0
+        while True:
+            batch = list(article_ids.filter(pk__gt=last)[:options['batch_size']])
+            if not batch:
+                break
+            updated += Article.objects_with_deleted.filter(pk__in=batch).update_search_vectors()
+            last = batch[-1]
+
+        self.stdout.write(self.style.SUCCESS('Updated the search vectors of {} article(s).'.format(updated)))
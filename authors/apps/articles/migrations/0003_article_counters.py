@@ -0,0 +1,38 @@
+# Generated by Django 2.1.2 on 2026-10-16 23:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0002_auto_20181128_0831'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='comments_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='dislikes_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='favourites_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='likes_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='views_count',
+            field=models.IntegerField(default=0),
+        ),
+    ]
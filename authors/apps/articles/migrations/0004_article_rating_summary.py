@@ -0,0 +1,31 @@
+# Generated by Django 2.1.2 on 2026-10-16 23:08
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0003_article_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArticleRatingSummary',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stars_0', models.IntegerField(default=0)),
+                ('stars_1', models.IntegerField(default=0)),
+                ('stars_2', models.IntegerField(default=0)),
+                ('stars_3', models.IntegerField(default=0)),
+                ('stars_4', models.IntegerField(default=0)),
+                ('stars_5', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='articleratingsummary',
+            name='article',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='rating_summary', to='articles.Article'),
+        ),
+    ]
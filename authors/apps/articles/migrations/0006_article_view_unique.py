@@ -0,0 +1,35 @@
+# Generated by Django 2.1.2 on 2026-10-16 23:22
+
+from django.conf import settings
+from django.db import migrations
+
+
+def remove_duplicate_views(apps, schema_editor):
+    """
+    Keep one view per reader of an article so that the unique constraint can be added
+    """
+    ArticleView = apps.get_model('articles', 'ArticleView')
+    seen = set()
+    duplicates = []
+    for view in ArticleView.objects.order_by('id').values('id', 'article_id', 'user_id').iterator():
+        key = (view['article_id'], view['user_id'])
+        if key in seen:
+            duplicates.append(view['id'])
+        seen.add(key)
+    ArticleView.objects.filter(id__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('articles', '0005_article_visibility_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_views, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='articleview',
+            unique_together={('article', 'user')},
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 2.1.2 on 2026-10-16 23:29
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0006_article_view_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArticleDailyStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('views', models.IntegerField(default=0)),
+                ('readers', models.IntegerField(default=0)),
+                ('likes', models.IntegerField(default=0)),
+                ('comments', models.IntegerField(default=0)),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='articles.Article')),
+            ],
+            options={
+                'ordering': ('day',),
+            },
+        ),
+        migrations.AddField(
+            model_name='articleview',
+            name='created_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+        migrations.AlterUniqueTogether(
+            name='articledailystats',
+            unique_together={('article', 'day')},
+        ),
+    ]
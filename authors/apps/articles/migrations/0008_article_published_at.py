@@ -0,0 +1,27 @@
+# Generated by Django 2.1.2 on 2026-10-16 23:40
+
+from django.db import migrations, models
+
+
+def date_published_articles(apps, schema_editor):
+    """
+    Articles published before this migration have already notified the followers of their author
+    """
+    Article = apps.get_model('articles', 'Article')
+    Article.objects.filter(published=True).update(published_at=models.F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0007_article_daily_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='published_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(date_published_articles, migrations.RunPython.noop),
+    ]
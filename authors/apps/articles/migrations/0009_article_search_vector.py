@@ -0,0 +1,44 @@
+# Generated by Django 2.1.2 on 2026-10-17 00:24
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+
+def compute_search_vectors(apps, schema_editor):
+    """
+    Compute the search vectors of the existing articles, the same way as `ArticleQuerySet.update_search_vectors`
+    """
+    schema_editor.execute("""
+        UPDATE articles_article AS article SET search_vector =
+            setweight(to_tsvector(%s::regconfig, article.title), 'A') ||
+            setweight(to_tsvector(%s::regconfig, author.username || ' ' || coalesce((
+                SELECT string_agg(tag.tag, ' ') FROM articles_article_tags AS article_tag
+                JOIN articles_tag AS tag ON tag.id = article_tag.tag_id WHERE article_tag.article_id = article.id
+            ), '')), 'B') ||
+            setweight(to_tsvector(%s::regconfig, article.description), 'C') ||
+            setweight(to_tsvector(%s::regconfig, article.body), 'D')
+        FROM authentication_user AS author
+        WHERE author.id = article.author_id
+    """, [settings.ARTICLE_SEARCH['CONFIG']] * 4)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0008_article_published_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='article_search_idx'),
+        ),
+        migrations.RunPython(compute_search_vectors, migrations.RunPython.noop),
+    ]
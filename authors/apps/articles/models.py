@@ -1,38 +1,51 @@
 import random
 import string
-
-from django.db import models
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db import connections, models
+from django.db.models import Exists, F, Func, OuterRef, Q, Sum, Value
+from django.db.models.functions import Cast, Coalesce
 from django.db.models.signals import pre_save
 from django.template.defaultfilters import slugify
+from django.utils import timezone
 from authors.apps.authentication.models import User
-from authors.apps.core.models import TimestampsMixin, SoftDeleteMixin
-from notifications.signals import notify
-from authors.apps.ah_notifications.notifications import Verbs
+from authors.apps.core.models import TimestampsMixin, SoftDeleteMixin, SoftDeleteManager
+from authors.apps.ah_notifications.notifications import Verbs, notify_coalesced
 
 
 class ReactionMixin(models.Model):
     """
     This mixin adds like and dislike functionality to the article model.
+    The number of likes and dislikes is kept in the likes_count and
+    dislikes_count columns so that it can be read without counting.
     """
     likes = models.ManyToManyField(User, related_name='likes', blank=True)
 
     dislikes = models.ManyToManyField(
         User, related_name='dislikes', blank=True)
 
+    likes_count = models.IntegerField(default=0)
+
+    dislikes_count = models.IntegerField(default=0)
+
     def like(self, user):
         """
         Adds a like on the article for the user. Before
         liking, it attempts to un-dislike
         in case the user disliked it.
         :param user:
-        :return:
+        :return: whether the like is new
         """
-        if user != self.author:
-            notify.send(user, verb=Verbs.ARTICLE_LIKE, recipient=self.author,
-                        description="{} just liked your article".format(user.username))
         self.un_dislike(user)
         # add like for the user
-        self.likes.add(user)
+        liked = self.add_reaction(self.likes, user, 'likes_count')
+        if liked and user != self.author:
+            notify_coalesced(user, self.author, Verbs.ARTICLE_LIKE, self, "{name} just liked your article",
+                             "{name} and {others} others liked your article", name=user.username)
+        return liked
 
     def un_like(self, user):
         """
@@ -41,7 +54,7 @@ class ReactionMixin(models.Model):
         :param user:
         :return:
         """
-        self.likes.remove(user)
+        self.remove_reaction(self.likes, user, 'likes_count')
 
     def dislike(self, user):
         """
@@ -49,13 +62,14 @@ class ReactionMixin(models.Model):
         Before disliking, it attempts to un-like
         in case the user liked it.
         :param user:
-        :return:
+        :return: whether the dislike is new
         """
-        if user != self.author:
-            notify.send(user, verb=Verbs.ARTICLE_DISLIKE, recipient=self.author,
-                        description="{} just disliked your article".format(user.username))
         self.un_like(user)
-        self.dislikes.add(user)
+        disliked = self.add_reaction(self.dislikes, user, 'dislikes_count')
+        if disliked and user != self.author:
+            notify_coalesced(user, self.author, Verbs.ARTICLE_DISLIKE, self, "{name} just disliked your article",
+                             "{name} and {others} others disliked your article", name=user.username)
+        return disliked
 
     def un_dislike(self, user):
         """
@@ -64,16 +78,157 @@ class ReactionMixin(models.Model):
         :param user:
         :return:
         """
-        self.dislikes.remove(user)
+        self.remove_reaction(self.dislikes, user, 'dislikes_count')
+
+    def add_reaction(self, reactions, user, counter):
+        """
+        Adds the user to the reactions and increments the counter only if the
+        user had not already reacted.
+        :param reactions: the likes or dislikes related manager
+        :param user:
+        :param counter: the name of the counter column
+        :return: whether the reaction is new
+        """
+        _, created = reactions.through.objects.get_or_create(
+            **{reactions.source_field_name: self, reactions.target_field_name: user})
+        if created:
+            self.update_counters(**{counter: 1})
+        return created
+
+    def remove_reaction(self, reactions, user, counter):
+        """
+        Removes the user from the reactions and decrements the counter by the
+        number of rows that were actually removed.
+        :param reactions: the likes or dislikes related manager
+        :param user:
+        :param counter: the name of the counter column
+        :return:
+        """
+        removed, _ = reactions.through.objects.filter(
+            **{reactions.source_field_name: self, reactions.target_field_name: user}).delete()
+        if removed:
+            self.update_counters(**{counter: -removed})
 
     class Meta:
         abstract = True
 
 
+class ArticleQuerySet(models.QuerySet):
+    """
+    Queryset methods shared by the article managers.
+    """
+
+    def for_listing(self, user=None):
+        """
+        Annotate and prefetch everything the ArticleSerializer reads so that a page
+        of articles is serialized with a constant number of queries, regardless of
+        the page size.
+        :param user: the requesting user, used for the `me` and `favourited` flags
+        :return:
+        """
+        queryset = self.annotate(
+            liked_by_me=self._reacted_by(Article.likes.through, user),
+            disliked_by_me=self._reacted_by(Article.dislikes.through, user),
+            favourited_by_me=self._reacted_by(FavouriteArticle, user),
+        )
+        return queryset.select_related('author__profile', 'rating_summary').prefetch_related('tags')
+
+    def visible_to(self, user=None):
+        """
+        Filter the articles a user can read: the published ones and, if they are
+        logged in, their own unpublished ones. Soft-deleted articles are never
+        visible. This is a single predicate, served by the (published, deleted_at,
+        created_at) and (author, created_at) indexes, so the result can still be
+        ordered, annotated and paginated.
+        :param user:
+        :return:
+        """
+        visible = Q(published=True)
+        if user is not None and user.is_authenticated:
+            visible |= Q(author=user)
+        return self.filter(visible, deleted_at=None)
+
+    def with_rating_average(self):
+        """
+        Annotate the average rating of each article, 0 when it has not been rated,
+        so that the articles can be ordered by it.
+        :return:
+        """
+        weighted, total = ArticleRatingSummary.rating_expressions('rating_summary__')
+        average = Cast(weighted, models.FloatField()) / Func(
+            total, 0, function='NULLIF', output_field=models.FloatField())
+        return self.annotate(rating_average=Coalesce(average, 0.0, output_field=models.FloatField()))
+
+    def rating_totals(self):
+        """
+        Aggregate the expressions needed for the average rating across the articles
+        :return: the aggregates keyed rating_weighted and rating_total
+        """
+        weighted, total = ArticleRatingSummary.rating_expressions('rating_summary__')
+        return {'rating_weighted': Sum(weighted), 'rating_total': Sum(total)}
+
+    def update_counters(self, **deltas):
+        """
+        Atomically add the deltas to the counter columns of the articles,
+        e.g. `update_counters(comments_count=1)`.
+        :param deltas: counter column names mapped to the amount to add
+        :return:
+        """
+        return self.update(**{counter: F(counter) + delta for counter, delta in deltas.items()})
+
+    def update_search_vectors(self):
+        """
+        Recompute the search vectors of the articles from their title, description, body, tags
+        and author, see `Article.search_vector`. The tags and the author are in other tables,
+        so the vectors are computed by the database in a single UPDATE.
+        :return: the number of articles updated
+        """
+        articles, params = self.order_by().values('pk').query.sql_with_params()
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(SEARCH_VECTOR_SQL.format(articles=articles),
+                           [settings.ARTICLE_SEARCH['CONFIG']] * 4 + list(params))
+            return cursor.rowcount
+
+    @staticmethod
+    def _reacted_by(model, user):
+        if user is None or not user.is_authenticated:
+            return Value(False, output_field=models.BooleanField())
+        return Exists(model.objects.filter(article_id=OuterRef('pk'), user_id=user.pk))
+
+
+# the search vector of the articles: the title weighs the most, then the tags and the
+# author, then the description and then the body
+SEARCH_VECTOR_SQL = """
+UPDATE articles_article AS article SET search_vector =
+    setweight(to_tsvector(%s::regconfig, article.title), 'A') ||
+    setweight(to_tsvector(%s::regconfig, author.username || ' ' || coalesce((
+        SELECT string_agg(tag.tag, ' ') FROM articles_article_tags AS article_tag
+        JOIN articles_tag AS tag ON tag.id = article_tag.tag_id WHERE article_tag.article_id = article.id
+    ), '')), 'B') ||
+    setweight(to_tsvector(%s::regconfig, article.description), 'C') ||
+    setweight(to_tsvector(%s::regconfig, article.body), 'D')
+FROM authentication_user AS author
+WHERE author.id = article.author_id AND article.id IN ({articles})
+"""
+
+ArticleManager = SoftDeleteManager.from_queryset(ArticleQuerySet)
+
+
 class Article(TimestampsMixin, ReactionMixin, SoftDeleteMixin):
     """
     Model for an article, extends a base model since the created and updated times are required
     """
+    objects = ArticleManager()
+    objects_with_deleted = ArticleManager(deleted=True)
+
+    class Meta(TimestampsMixin.Meta):
+        indexes = [
+            # used to list the visible articles, see `ArticleQuerySet.visible_to`
+            models.Index(fields=['published', 'deleted_at', '-created_at'], name='article_published_idx'),
+            models.Index(fields=['author', '-created_at'], name='article_author_idx'),
+            GinIndex(fields=['search_vector'], name='article_search_idx'),
+        ]
+
     slug = models.SlugField(max_length=255, unique=True, db_index=True)
     title = models.CharField(max_length=255)
     description = models.TextField()
@@ -91,6 +246,71 @@ class Article(TimestampsMixin, ReactionMixin, SoftDeleteMixin):
         related_name='articles',
     )
     published = models.BooleanField(default=False)
+    # the first time the article was published, followers are notified only then
+    published_at = models.DateTimeField(null=True, blank=True)
+
+    # engagement counters, maintained by `update_counters` on every write so that reads
+    # never have to count the related rows. `recount_article_counters` repairs any drift.
+    comments_count = models.IntegerField(default=0)
+    views_count = models.IntegerField(default=0)
+    favourites_count = models.IntegerField(default=0)
+
+    # the full-text search vector, maintained by `update_search_vectors` when the article,
+    # its tags or its author change, see the signals
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    COUNTERS = ('likes_count', 'dislikes_count', 'comments_count', 'views_count', 'favourites_count')
+
+    @property
+    def ratings(self):
+        """
+        The rating summary of the article, an empty one if it has never been rated.
+        """
+        try:
+            return self.rating_summary
+        except ArticleRatingSummary.DoesNotExist:
+            return ArticleRatingSummary(article=self)
+
+    @property
+    def average_rating(self):
+        return self.ratings.average
+
+    def update_counters(self, **deltas):
+        """
+        Atomically add the deltas to the counter columns of this article and keep
+        the in-memory values in step.
+        :param deltas: counter column names mapped to the amount to add
+        :return:
+        """
+        Article.objects_with_deleted.filter(pk=self.pk).update_counters(**deltas)
+        for counter, delta in deltas.items():
+            setattr(self, counter, getattr(self, counter) + delta)
+
+    def claim_first_publish(self):
+        """
+        Record the first time the article is published. The update is conditional so that
+        only one of several concurrent saves claims the first publish.
+        :return: whether the article has just been published for the first time
+        """
+        if not self.published or self.published_at is not None:
+            return False
+        published_at = timezone.now()
+        claimed = Article.objects_with_deleted.filter(pk=self.pk, published_at=None).update(published_at=published_at)
+        if claimed:
+            self.published_at = published_at
+        return bool(claimed)
+
+    def like(self, user):
+        """
+        Likes the article and counts a new like in the daily stats of the article.
+        The likes table is an auto-created through table which sends no post_save signal.
+        :param user:
+        :return: whether the like is new
+        """
+        liked = super().like(user)
+        if liked:
+            ArticleDailyStats.record(self.pk, likes=1)
+        return liked
 
     @staticmethod
     def pre_save(sender, instance, *args, **kwargs):
@@ -145,6 +365,76 @@ class ArticleRating(models.Model):
     rated_by = models.ForeignKey(User, on_delete=models.CASCADE)
 
 
+class ArticleRatingSummary(models.Model):
+    """
+    The number of ratings an article has received for each star. It is updated
+    incrementally whenever a rating is given, changed or removed so that the
+    average, total and breakdown of the ratings are read from a single row.
+    """
+    STARS = range(0, 6)
+
+    article = models.OneToOneField(Article, on_delete=models.CASCADE, related_name='rating_summary')
+    stars_0 = models.IntegerField(default=0)
+    stars_1 = models.IntegerField(default=0)
+    stars_2 = models.IntegerField(default=0)
+    stars_3 = models.IntegerField(default=0)
+    stars_4 = models.IntegerField(default=0)
+    stars_5 = models.IntegerField(default=0)
+
+    @staticmethod
+    def star_field(rating):
+        return 'stars_{}'.format(rating)
+
+    @classmethod
+    def record(cls, article_id, rating=None, previous_rating=None):
+        """
+        Atomically count a rating on its star and/or discount a previous rating
+        from its star. A changed rating passes both.
+        :param article_id:
+        :param rating: the star that has been given
+        :param previous_rating: the star that has been taken back
+        :return:
+        """
+        deltas = {}
+        if rating is not None:
+            deltas[cls.star_field(rating)] = 1
+        if previous_rating is not None:
+            field = cls.star_field(previous_rating)
+            deltas[field] = deltas.get(field, 0) - 1
+
+        cls.objects.get_or_create(article_id=article_id)
+        cls.objects.filter(article_id=article_id).update(
+            **{field: F(field) + delta for field, delta in deltas.items()})
+
+    @classmethod
+    def rating_expressions(cls, prefix=''):
+        """
+        Build the expressions of the sum of the stars and of the number of ratings
+        :param prefix: the lookup of the summary from the queried model e.g. 'rating_summary__'
+        :return: (weighted, total)
+        """
+        counts = [(star, Coalesce(F(prefix + cls.star_field(star)), 0)) for star in cls.STARS]
+        weighted = sum((count * star for star, count in counts), Value(0))
+        total = sum((count for _, count in counts), Value(0))
+        return weighted, total
+
+    def star_counts(self):
+        return [(star, getattr(self, self.star_field(star))) for star in self.STARS]
+
+    @property
+    def total(self):
+        return sum(count for _, count in self.star_counts())
+
+    @property
+    def average(self):
+        total = self.total
+        return sum(star * count for star, count in self.star_counts()) / total if total else 0
+
+    @property
+    def each_rating(self):
+        return Counter({star: count for star, count in self.star_counts() if count})
+
+
 # register the pre_save signal
 pre_save.connect(
     Article.pre_save,
@@ -196,6 +486,46 @@ class ArticleView(models.Model):
     """
     user = models.ForeignKey(User, related_name="article_views", on_delete=models.CASCADE)
     article = models.ForeignKey(Article, related_name="article_views", on_delete=models.CASCADE)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        unique_together = ('article', 'user')
+
+
+class ArticleDailyStats(models.Model):
+    """
+    The activity an article received in a day. The rows are updated incrementally as
+    the article is read, liked and commented on, so that the per-day series of an
+    author's articles are read without counting the raw rows.
+    views counts every read, readers counts the users who read the article for the
+    first time that day.
+    """
+    COUNTERS = ('views', 'readers', 'likes', 'comments')
+
+    article = models.ForeignKey(Article, on_delete=models.CASCADE, related_name='daily_stats')
+    day = models.DateField()
+    views = models.IntegerField(default=0)
+    readers = models.IntegerField(default=0)
+    likes = models.IntegerField(default=0)
+    comments = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('article', 'day')
+        ordering = ('day',)
+
+    @classmethod
+    def record(cls, article_id, day=None, **deltas):
+        """
+        Atomically add to the counters of the article for the day
+        :param article_id:
+        :param day: defaults to today
+        :param deltas: the amount to add to each counter e.g. views=1
+        :return:
+        """
+        day = day or timezone.localdate()
+        cls.objects.get_or_create(article_id=article_id, day=day)
+        cls.objects.filter(article_id=article_id, day=day).update(
+            **{field: F(field) + delta for field, delta in deltas.items()})
 
 
 class Violation(TimestampsMixin):
@@ -1,5 +1,14 @@
-from rest_framework.pagination import PageNumberPagination
+import binascii
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination, _positive_int
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 
 class StandardResultsSetPagination(PageNumberPagination):
@@ -36,3 +45,189 @@ class StandardResultsSetPagination(PageNumberPagination):
             'total_pages': self.page.paginator.num_pages,
             'results': data
         })
+
+
+class RequestedPagination(StandardResultsSetPagination):
+    """
+    Paginates by page numbers only when the client asks for a page with `?page=`
+    or `?page_size=`, so lists that used to return every result still do.
+    """
+    max_page_size = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not {self.page_query_param, self.page_size_query_param} & set(request.query_params):
+            return None
+        return super().paginate_queryset(queryset, request, view=view)
+
+
+class KeysetPagination(BasePagination):
+    """
+    A cursor style that pages through the results by their (created_at, id) key
+    instead of an offset, so deep pages cost the same as the first one. It does
+    not count the results.
+    `example usage`
+    http://localhost:8000/api/articles/?pagination=cursor
+    http://localhost:8000/api/articles/?pagination=cursor&cursor=eyJ2IjogWy...
+
+    Views can order by other fields, e.g. annotations, by setting `cursor_ordering`.
+    """
+    page_size = StandardResultsSetPagination.page_size
+    page_size_query_param = StandardResultsSetPagination.page_size_query_param
+    max_page_size = StandardResultsSetPagination.max_page_size
+    cursor_query_param = 'cursor'
+    ordering = ('-created_at', '-id')
+    invalid_cursor_message = 'Invalid cursor'
+
+    @classmethod
+    def requested(cls, request):
+        """
+        Clients opt into keyset pagination with `?pagination=cursor`, the links
+        to the next and previous pages carry the cursor.
+        """
+        return request.query_params.get('pagination') == 'cursor' or cls.cursor_query_param in request.query_params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = getattr(view, 'cursor_ordering', self.ordering)
+        self.fields = [field.lstrip('-') for field in self.ordering]
+        self.descending = self.ordering[0].startswith('-')
+
+        cursor = self.decode_cursor(request, queryset)
+        reverse = cursor is not None and cursor['reverse']
+
+        # reverse pages are fetched in the opposite order, then flipped back
+        queryset = queryset.order_by(*(self.ordering if not reverse else self.reverse_ordering()))
+        if cursor is not None:
+            queryset = queryset.filter(self.after(cursor['position'], self.descending != reverse))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response({
+            'links': {
+                'next': self.get_next_link(),
+                'previous': self.get_previous_link()
+            },
+            'results': data
+        })
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(request.query_params[self.page_size_query_param], strict=True,
+                                 cutoff=self.max_page_size)
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def reverse_ordering(self):
+        return [field[1:] if field.startswith('-') else '-' + field for field in self.ordering]
+
+    def after(self, position, descending):
+        """
+        Build the filter that selects the rows that come after the position
+        ordered by the key fields, e.g. `created_at < c OR (created_at = c AND id < i)`
+        """
+        lookup = 'lt' if descending else 'gt'
+        condition = Q()
+        for index, field in enumerate(self.fields):
+            equal = {name: value for name, value in zip(self.fields[:index], position[:index])}
+            condition |= Q(**equal, **{'{}__{}'.format(field, lookup): position[index]})
+        return condition
+
+    def encode_cursor(self, obj, reverse):
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param,
+                                   self.encode(obj, reverse))
+
+    def encode(self, obj, reverse):
+        """
+        :return: the cursor of the position of the object
+        """
+        return self.encode_position(self.position(obj), reverse)
+
+    def position(self, obj):
+        """
+        :return: the values of the key fields of the object
+        """
+        position = []
+        for field in self.fields:
+            value = getattr(obj, field)
+            position.append(value.isoformat() if isinstance(value, datetime) else value)
+        return position
+
+    @staticmethod
+    def encode_position(position, reverse):
+        position = [value.isoformat() if isinstance(value, datetime) else value for value in position]
+        cursor = json.dumps({'position': position, 'reverse': reverse})
+        return urlsafe_b64encode(cursor.encode('ascii')).decode('ascii')
+
+    def decode_cursor(self, request, queryset):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        return self.decode(encoded, queryset)
+
+    def key_fields(self, queryset):
+        """
+        :return: the fields of the key, the output fields of the annotations the key is ordered by
+        """
+        annotations = queryset.query.annotations
+        return [annotations[name].output_field if name in annotations else queryset.model._meta.get_field(name)
+                for name in self.fields]
+
+    def decode(self, encoded, queryset):
+        """
+        Decode a cursor, parsing its position with the fields of the key so that a tampered
+        cursor is rejected here rather than when it is queried
+        :param encoded:
+        :param queryset: the queryset that is paginated
+        :return:
+        """
+        try:
+            cursor = json.loads(urlsafe_b64decode(encoded.encode('ascii')).decode('ascii'))
+            if len(cursor['position']) != len(self.fields):
+                raise ValueError
+            position = [field.to_python(value) for field, value in zip(self.key_fields(queryset), cursor['position'])]
+            if None in position:
+                raise ValueError
+            return {'position': position, 'reverse': bool(cursor['reverse'])}
+        except (TypeError, ValueError, KeyError, binascii.Error, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+
+class OptionalKeysetPagination(StandardResultsSetPagination):
+    """
+    Paginates by page numbers unless the client opts into keyset pagination
+    with `?pagination=cursor`.
+    """
+    keyset_pagination_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.keyset_pagination_class.requested(request):
+            self.keyset = self.keyset_pagination_class()
+            return self.keyset.paginate_queryset(queryset, request, view=view)
+        return super().paginate_queryset(queryset, request, view=view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
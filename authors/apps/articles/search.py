@@ -0,0 +1,202 @@
+import bisect
+import hashlib
+import json
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQueryField, SearchRank
+from django.db.models import Case, F, FloatField, Func, Value, When
+from rest_framework.filters import SearchFilter
+
+from authors.apps.articles.search_engine import WORD, search_engine
+from authors.apps.core.cache import shared_cache
+
+
+class PrefixSearchQuery(Func):
+    """
+    The query of the articles matching every word, as a prefix of the words of the articles
+    """
+    function = 'to_tsquery'
+    output_field = SearchQueryField()
+
+    def __init__(self, words, config):
+        query = ' & '.join("'{}':*".format(word) for word in words)
+        super().__init__(Value(config), Value(query))
+
+
+class ArticleSearchFilter(SearchFilter):
+    """
+    Searches the articles with their search vectors, see `ArticleQuerySet.update_search_vectors`,
+    or with the search engine of the process with the `engine` ARTICLE_SEARCH['BACKEND'],
+    and orders them by relevance, most relevant first. A term matches the words it starts, e.g.
+    `great` matches `greatest`, and an article must match every term.
+    With the `contains` ARTICLE_SEARCH['BACKEND'] the terms are matched anywhere in the search
+    fields of the view instead, by DRF's SearchFilter.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        backend = settings.ARTICLE_SEARCH['BACKEND']
+        if backend == 'contains':
+            return super().filter_queryset(request, queryset, view)
+
+        words = self.search_words(request)
+        if not words:
+            return queryset
+        search = self.search_engine if backend == 'engine' else self.search_vectors
+        return search(queryset, words).order_by('-search_rank', '-created_at')
+
+    def search_words(self, request):
+        return [word for term in self.get_search_terms(request) for word in WORD.findall(term)]
+
+    @staticmethod
+    def search_vectors(queryset, words):
+        # the arguments of an expression must be hashable
+        query = PrefixSearchQuery(tuple(words), settings.ARTICLE_SEARCH['CONFIG'])
+        return queryset.filter(search_vector=query).annotate(search_rank=SearchRank(F('search_vector'), query))
+
+    @staticmethod
+    def search_engine(queryset, words):
+        """
+        Search the index of the process, see `ArticleSearchEngine`, for the MAX_RESULTS most relevant articles
+        """
+        results = search_engine.search(words)
+        rank = Case(*[When(pk=article_id, then=Value(score)) for article_id, score in results],
+                    default=Value(0.0), output_field=FloatField())
+        return queryset.filter(pk__in=[article_id for article_id, _ in results]).annotate(search_rank=rank)
+
+
+def snippet(text, words, size):
+    """
+    The passage of `size` words of the text that matches the most of the searched words, matched
+    the same way as the search does, with the offsets of the matches in the passage.
+    :param text:
+    :param words: the searched words
+    :param size: the number of words of the passage
+    :return: the text of the passage, with an ellipsis where the text goes on, and the [start, end]
+    offsets of the matches in it
+    """
+    tokens = list(WORD.finditer(text))
+    words = tuple(word.lower() for word in words)
+    matches = {position: {word for word in words if token.group().lower().startswith(word)}
+               for position, token in enumerate(tokens)}
+    matches = {position: matched for position, matched in matches.items() if matched}
+
+    first = best_window(sorted(matches), matches, size)
+    window = tokens[first:first + size]
+    if not window:
+        return {'text': '', 'highlights': []}
+    prefix = '... ' if first else ''
+    suffix = ' ...' if first + size < len(tokens) else ''
+    offset = len(prefix) - window[0].start()
+    highlights = [[tokens[position].start() + offset, tokens[position].end() + offset]
+                  for position in sorted(matches) if first <= position < first + size]
+    return {'text': prefix + text[window[0].start():window[-1].end()] + suffix, 'highlights': highlights}
+
+
+def best_window(positions, matches, size):
+    """
+    Find the window of `size` words with the most distinct words matched, then the most matches.
+    The windows considered start a little before each match, so that the match has some context.
+    :param positions: the positions of the matching words, in order
+    :param matches: the searched words each of them matches
+    :return: the position of the first word of the window
+    """
+    lead = size // 4
+    best, best_score = 0, (0, 0)
+    for position in positions:
+        first = max(position - lead, 0)
+        window = positions[bisect.bisect_left(positions, first):bisect.bisect_left(positions, first + size)]
+        score = (len(set().union(*(matches[matched] for matched in window))), len(window))
+        if score > best_score:
+            best, best_score = first, score
+    return best
+
+
+class SearchResultsCache:
+    """
+    The results of the searches of the articles: how many articles were found and the ids of the
+    pages that were read, by the normalized search, filters and ordering. The keys include a
+    generation that is bumped by the writes of the articles and tags, see the signals, so a write
+    invalidates every cached search at once. Only the ids are cached, the rows of a page are read
+    by their ids, for the annotations of the requesting user. The searches are only cached when
+    the cache is memcached or Redis, see `shared_cache`.
+    """
+    GENERATION_KEY = 'article-search-generation'
+    # the query parameters that do not change the articles found, the page is cached by its bounds
+    IGNORED_PARAMS = ('page', 'page_size', 'snippets', 'search')
+
+    @property
+    def cache(self):
+        """
+        :return: the cache of the searches, None if it is not a shared cache
+        """
+        return shared_cache(settings.ARTICLE_SEARCH['CACHE'])
+
+    def bump(self):
+        cache = self.cache
+        if cache is None:
+            return
+        cache.add(self.GENERATION_KEY, 0, timeout=None)
+        try:
+            cache.incr(self.GENERATION_KEY)
+        except ValueError:
+            # evicted in the meantime
+            cache.set(self.GENERATION_KEY, 1, timeout=None)
+
+    def key(self, cache, request):
+        params = {name: request.query_params.getlist(name)
+                  for name in request.query_params if name not in self.IGNORED_PARAMS}
+        params['search'] = sorted(word.lower() for word in ArticleSearchFilter().search_words(request))
+        params['backend'] = settings.ARTICLE_SEARCH['BACKEND']
+        digest = hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()
+        return 'article-search:{}:{}'.format(cache.get_or_set(self.GENERATION_KEY, 0, timeout=None), digest)
+
+    def results(self, queryset, rows, request):
+        """
+        :param queryset: the articles found
+        :param rows: the queryset the articles of a page are read from by id
+        :param request:
+        :return: the articles found, to be paginated
+        """
+        cache = self.cache
+        if cache is None:
+            return queryset
+        return CachedSearchResults(cache, self.key(cache, request), queryset, rows)
+
+
+class CachedSearchResults:
+    """
+    The articles found by a search, counted and sliced by the paginator through the cache
+    """
+
+    def __init__(self, cache, key, queryset, rows):
+        self.cache = cache
+        self.key = key
+        self.queryset = queryset
+        self.rows = rows
+
+    def count(self):
+        count = self.cache.get(self.key + ':count')
+        if count is None:
+            count = self.queryset.count()
+            self.cache.set(self.key + ':count', count, settings.ARTICLE_SEARCH['CACHE_TIMEOUT'])
+        return count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, page):
+        """
+        :param page: the slice of the articles of a page
+        :return: the articles of the page
+        """
+        key = '{}:{}:{}'.format(self.key, page.start, page.stop)
+        ids = self.cache.get(key)
+        if ids is None:
+            ids = list(self.queryset[page].values_list('pk', flat=True))
+            self.cache.set(key, ids, settings.ARTICLE_SEARCH['CACHE_TIMEOUT'])
+        articles = self.rows.in_bulk(ids)
+        # an article deleted since the ids were cached is left out
+        return [articles[article_id] for article_id in ids if article_id in articles]
+
+
+search_cache = SearchResultsCache()
@@ -0,0 +1,408 @@
+import bisect
+import heapq
+import json
+import math
+import mmap
+import os
+import re
+import sys
+import threading
+import time
+from array import array
+from collections import Counter, defaultdict
+from datetime import timedelta
+from functools import partial
+from operator import itemgetter
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from authors.apps.articles.models import Article
+
+WORD = re.compile(r'\w+')
+
+
+def tokenize(text):
+    return WORD.findall(text.lower())
+
+
+class Postings:
+    """
+    The articles a term is in, by increasing id, and the weighted frequency of the term in each.
+    The lists of an index loaded from disk are views of the file until they change.
+    """
+    __slots__ = ('ids', 'frequencies')
+
+    def __init__(self, ids=None, frequencies=None):
+        self.ids = array('I') if ids is None else ids
+        self.frequencies = array('I') if frequencies is None else frequencies
+
+    def __len__(self):
+        return len(self.ids)
+
+    def writable(self):
+        if not isinstance(self.ids, array):
+            self.ids, self.frequencies = array('I', self.ids), array('I', self.frequencies)
+
+    def add(self, article_id, frequency):
+        self.writable()
+        position = bisect.bisect_left(self.ids, article_id)
+        self.ids.insert(position, article_id)
+        self.frequencies.insert(position, frequency)
+
+    def remove(self, article_id):
+        self.writable()
+        position = bisect.bisect_left(self.ids, article_id)
+        del self.ids[position]
+        del self.frequencies[position]
+
+
+class SearchIndex:
+    """
+    An inverted index of articles scored with BM25. The fields of an article are weighted, a
+    term of the title counts as FIELDS['title'] terms of the body, the same order of relevance
+    as the search vectors of the articles.
+    """
+    FIELDS = (('title', 4), ('tags', 2), ('author', 2), ('description', 2), ('body', 1))
+    K1 = 1.2
+    B = 0.75
+
+    MAGIC = b'AHINDEX1'
+
+    def __init__(self):
+        self.postings = {}
+        # the indexed articles, by id, mapped to their weighted length and their terms
+        self.documents = {}
+        self.total_length = 0
+        # the terms of an index loaded from disk, the terms of its documents are their positions here
+        self.loaded_terms = []
+        # the sorted terms, to find the terms a word starts, dropped when the terms change
+        self.vocabulary = None
+        self.saved_at = None
+
+    def __len__(self):
+        return len(self.documents)
+
+    def add(self, article_id, fields):
+        """
+        Index an article, replacing it if it is indexed already
+        :param article_id:
+        :param fields: the text of the article keyed by the names of FIELDS
+        """
+        self.remove(article_id)
+        frequencies = Counter()
+        for name, weight in self.FIELDS:
+            for term in tokenize(fields.get(name, '')):
+                frequencies[term] += weight
+
+        for term, frequency in frequencies.items():
+            if term not in self.postings:
+                self.postings[term] = Postings()
+                self.vocabulary = None
+            self.postings[term].add(article_id, frequency)
+        length = sum(frequencies.values())
+        self.documents[article_id] = (length, tuple(frequencies))
+        self.total_length += length
+
+    def remove(self, article_id):
+        """
+        :return: whether the article was indexed
+        """
+        document = self.documents.pop(article_id, None)
+        if document is None:
+            return False
+        length, terms = document
+        for term in self.terms_of(terms):
+            postings = self.postings[term]
+            postings.remove(article_id)
+            if not postings:
+                del self.postings[term]
+                self.vocabulary = None
+        self.total_length -= length
+        return True
+
+    def terms_of(self, terms):
+        # the terms of a document loaded from disk are a view of the positions of its terms
+        return terms if isinstance(terms, tuple) else [self.loaded_terms[term] for term in terms]
+
+    def expand(self, word):
+        """
+        :return: the terms the word starts
+        """
+        if self.vocabulary is None:
+            self.vocabulary = sorted(self.postings)
+        position = bisect.bisect_left(self.vocabulary, word)
+        terms = []
+        while position < len(self.vocabulary) and self.vocabulary[position].startswith(word):
+            terms.append(self.vocabulary[position])
+            position += 1
+        return terms
+
+    def search(self, words, limit):
+        """
+        Find the articles that match every word, as the start of one of their terms
+        :param words:
+        :param limit: the maximum number of articles returned
+        :return: the ids of the most relevant articles and their scores, most relevant first
+        """
+        scores = None
+        for word in words:
+            word_scores = defaultdict(float)
+            for term in self.expand(word.lower()):
+                self.score(term, word_scores)
+            if scores is None:
+                scores = word_scores
+            else:
+                scores = {article_id: score + word_scores[article_id]
+                          for article_id, score in scores.items() if article_id in word_scores}
+        return heapq.nlargest(limit, (scores or {}).items(), key=itemgetter(1))
+
+    def score(self, term, scores):
+        """
+        Add the BM25 score of the term to the scores of the articles it is in
+        """
+        postings = self.postings[term]
+        count = len(self.documents)
+        idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+        average_length = self.total_length / count
+        for article_id, frequency in zip(postings.ids, postings.frequencies):
+            length = self.documents[article_id][0]
+            scores[article_id] += idf * frequency * (self.K1 + 1) / (
+                frequency + self.K1 * (1 - self.B + self.B * length / average_length))
+
+    def save(self, path):
+        """
+        Save the index to a file, replacing the file at once so that workers never load half of it.
+        The file is a header of the terms and articles, then their lists of 32 bit integers.
+        """
+        terms = sorted(self.postings)
+        positions = {term: position for position, term in enumerate(terms)}
+        header = {'byteorder': sys.byteorder, 'saved_at': timezone.now().isoformat(), 'terms': [], 'documents': []}
+        data = array('I')
+        for term in terms:
+            postings = self.postings[term]
+            header['terms'].append([term, len(data), len(postings)])
+            data.extend(postings.ids)
+            data.extend(postings.frequencies)
+        for article_id, (length, document_terms) in self.documents.items():
+            header['documents'].append([article_id, length, len(data), len(document_terms)])
+            data.extend(positions[term] for term in self.terms_of(document_terms))
+
+        encoded = json.dumps(header).encode()
+        encoded += b' ' * (-(len(self.MAGIC) + 8 + len(encoded)) % data.itemsize)
+        with open(path + '.tmp', 'wb') as file:
+            file.write(self.MAGIC)
+            file.write(len(encoded).to_bytes(8, 'little'))
+            file.write(encoded)
+            data.tofile(file)
+        os.replace(path + '.tmp', path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load an index saved with `save`. The file is memory-mapped, its lists are only read when
+        they are searched and copied when they change, so loading it only reads the header.
+        :raise ValueError: if the file is not an index saved on a machine of the same byte order
+        """
+        with open(path, 'rb') as file:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        start = len(cls.MAGIC) + 8
+        if buffer[:len(cls.MAGIC)] != cls.MAGIC:
+            raise ValueError('{} is not a search index'.format(path))
+        header_length = int.from_bytes(buffer[len(cls.MAGIC):start], 'little')
+        header = json.loads(buffer[start:start + header_length].decode())
+        if header['byteorder'] != sys.byteorder:
+            raise ValueError('{} was saved with another byte order'.format(path))
+        data = memoryview(buffer)[start + header_length:].cast('I')
+
+        index = cls()
+        for term, offset, count in header['terms']:
+            index.postings[term] = Postings(data[offset:offset + count], data[offset + count:offset + 2 * count])
+            index.loaded_terms.append(term)
+        for article_id, length, offset, count in header['documents']:
+            index.documents[article_id] = (length, data[offset:offset + count])
+            index.total_length += length
+        index.saved_at = parse_datetime(header['saved_at'])
+        return index
+
+
+class ArticleSearchEngine:
+    """
+    The search index of the process, over the published articles that are not deleted.
+    It is loaded from ARTICLE_SEARCH['INDEX_PATH'] if there is one, see the `build_search_index`
+    command, or else built from the database, the first time the articles are searched.
+    The articles the process saves are indexed by the signals, the ones saved by other processes
+    are picked up every REFRESH_INTERVAL seconds by their update time, which the signals also bump
+    when their tags or the username of their author change. The index is rebuilt every
+    REBUILD_INTERVAL seconds, which picks up the articles other processes deleted. A rebuild loads
+    the saved index again only if it was saved since the current index was built, or else builds
+    the index from the database. The rebuilds after the first one run in a thread, the searches
+    and updates use the current index until the new one is swapped in.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        # held while an index is built, so that there is one rebuild at a time
+        self.building = threading.Lock()
+        self.rebuilder = None
+        self.index = None
+        self.refreshed_at = self.rebuilt_at = None
+        # the wall clock time the current index was built or loaded at, to compare the saved index with
+        self.built_at = None
+        # the database time the index was last brought up to date at
+        self.synced_at = None
+        # the updates and removals made while an index is built, applied to it once it is swapped in
+        self.pending = None
+
+    @property
+    def config(self):
+        return settings.ARTICLE_SEARCH
+
+    def search(self, words, limit=None):
+        """
+        :return: the ids of the most relevant articles and their scores, most relevant first
+        """
+        now = time.monotonic()
+        if self.index is None:
+            with self.building:
+                if self.index is None:
+                    self.rebuild(now)
+        elif now - self.rebuilt_at >= self.config['REBUILD_INTERVAL']:
+            self.rebuild_in_background()
+        elif now - self.refreshed_at >= self.config['REFRESH_INTERVAL']:
+            self.refresh(now)
+        with self.lock:
+            return self.index.search(words, limit or self.config['MAX_RESULTS'])
+
+    def rebuild_in_background(self):
+        if not self.building.acquire(blocking=False):
+            # already rebuilding
+            return
+        self.rebuilder = threading.Thread(target=self.rebuild_and_release, daemon=True)
+        self.rebuilder.start()
+
+    def rebuild_and_release(self):
+        try:
+            self.rebuild(time.monotonic())
+        finally:
+            self.building.release()
+            connection.close()
+
+    def rebuild(self, now):
+        """
+        Build a new index without holding the lock and swap it in, then index the articles
+        updated while it was built
+        """
+        with self.lock:
+            self.pending = []
+        try:
+            built_at = time.time()
+            index, synced_at = self.build()
+        finally:
+            with self.lock:
+                pending, self.pending = self.pending, None
+        with self.lock:
+            self.index, self.synced_at, self.built_at = index, synced_at, built_at
+            self.refreshed_at = self.rebuilt_at = now
+        for apply in pending:
+            apply()
+        self.refresh(now)
+
+    def build(self):
+        """
+        :return: a new index, loaded from ARTICLE_SEARCH['INDEX_PATH'] if it was saved since the
+        current index was built, or else built from the database, and the database time it is up to date at
+        """
+        path = self.config['INDEX_PATH']
+        if path and os.path.exists(path) and (self.built_at is None or os.path.getmtime(path) > self.built_at):
+            index = SearchIndex.load(path)
+            return index, index.saved_at
+        return self.build_from_database()
+
+    def build_from_database(self):
+        synced_at = timezone.now()
+        index = SearchIndex()
+        for article in self.batches(Article.objects.filter(published=True).select_related(
+                'author').prefetch_related('tags')):
+            index.add(article.pk, self.fields(article))
+        return index, synced_at
+
+    def refresh(self, now):
+        # the articles saved since the last refresh, with a margin for the transactions that
+        # saved an article before the last refresh but committed it after
+        with self.lock:
+            synced_at = timezone.now()
+            since = self.synced_at - timedelta(seconds=self.config['REFRESH_MARGIN'])
+            self.update(Article.objects_with_deleted.filter(updated_at__gte=since))
+            self.synced_at, self.refreshed_at = synced_at, now
+
+    def update(self, articles):
+        """
+        Index the articles that are published and not deleted, and remove the others,
+        if the index of the process is loaded
+        :param articles: a queryset of articles
+        """
+        with self.lock:
+            if self.pending is not None:
+                self.pending.append(partial(self.update, articles))
+            if self.index is None:
+                return
+            for article in self.batches(articles.select_related('author').prefetch_related('tags')):
+                if article.published and article.deleted_at is None:
+                    self.index.add(article.pk, self.fields(article))
+                else:
+                    self.index.remove(article.pk)
+
+    @staticmethod
+    def batches(articles, size=500):
+        """
+        Read the articles a batch at a time, with their tags prefetched, which iterator() does not do
+        """
+        articles, last = articles.order_by('pk'), 0
+        while True:
+            batch = list(articles.filter(pk__gt=last)[:size])
+            yield from batch
+            if len(batch) < size:
+                return
+            last = batch[-1].pk
+
+    def remove(self, article_id):
+        """
+        Remove a deleted article, the articles that are not deleted are removed by `update`
+        """
+        with self.lock:
+            if self.pending is not None:
+                self.pending.append(partial(self.remove, article_id))
+            if self.index is not None:
+                self.index.remove(article_id)
+
+    @staticmethod
+    def fields(article):
+        return {
+            'title': article.title,
+            'tags': ' '.join(tag.tag for tag in article.tags.all()),
+            'author': article.author.username,
+            'description': article.description,
+            'body': article.body,
+        }
+
+    def save(self, path):
+        """
+        Build an index from the database and save it
+        :return: the number of articles indexed
+        """
+        index, _ = self.build_from_database()
+        index.save(path)
+        return len(index)
+
+    def clear(self):
+        """
+        Drop the index, it is loaded again on the next search
+        """
+        with self.lock:
+            self.index = self.built_at = None
+
+
+search_engine = ArticleSearchEngine()
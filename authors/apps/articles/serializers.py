@@ -1,16 +1,17 @@
+from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
 from django.utils.text import slugify
 from rest_framework import serializers
 from rest_framework.exceptions import NotFound
 from rest_framework.validators import UniqueTogetherValidator
 
-from authors.apps.profiles.models import Profile
 from authors.apps.profiles.serializers import ProfileSerializer
-from django.db import models
-from authors.apps.articles.models import Article, Tag, ArticleRating, Comment, FavouriteArticle, ArticleView, Violation
+from authors.apps.articles.models import (
+    Article, Tag, ArticleRating, ArticleRatingSummary, ArticleDailyStats, Comment, FavouriteArticle, Violation,
+)
+from authors.apps.articles.search import snippet
 from authors.apps.authentication.models import User
 from ..core import client
-from collections import Counter
 
 
 class TagField(serializers.RelatedField):
@@ -126,8 +127,7 @@ class ArticleSerializer(serializers.ModelSerializer):
         return article_uri
 
     def get_author(self, obj):
-        serializer = ProfileSerializer(
-            instance=Profile.objects.get(user=obj.author))
+        serializer = ProfileSerializer(instance=obj.author.profile)
         return serializer.data
 
     def get_read_time(self, obj):
@@ -186,19 +186,7 @@ class ArticleSerializer(serializers.ModelSerializer):
         return instance
 
     def get_average_rating(self, instance):
-        avg_rating = ArticleRating.objects.filter(article=instance).aggregate(
-            average_rating=models.Avg('rating'))['average_rating'] or 0
-        total_user_rated = ArticleRating.objects.filter(
-            article=instance).count()
-        each_rating = Counter(
-            ArticleRating.objects.filter(article=instance).values_list(
-                'rating', flat=True))
-
-        return {
-            'avg_rating': avg_rating,
-            'total_user': total_user_rated,
-            'each_rating': each_rating
-        }
+        return RatingSummarySerializer(instance.ratings).data
 
     def get_reactions(self, instance):
         request = self.context.get('request')
@@ -206,7 +194,11 @@ class ArticleSerializer(serializers.ModelSerializer):
         liked_by_me = False
         disliked_by_me = False
 
-        if request is not None and request.user.is_authenticated:
+        # articles fetched with `Article.objects.for_listing` already carry the `me` flags
+        if hasattr(instance, 'liked_by_me'):
+            liked_by_me = instance.liked_by_me
+            disliked_by_me = instance.disliked_by_me
+        elif request is not None and request.user.is_authenticated:
             user_id = request.user.id
             liked_by_me = instance.likes.all().filter(id=user_id).count() == 1
             disliked_by_me = instance.dislikes.all().filter(
@@ -214,11 +206,11 @@ class ArticleSerializer(serializers.ModelSerializer):
 
         return {
             'likes': {
-                'count': instance.likes.count(),
+                'count': instance.likes_count,
                 'me': liked_by_me
             },
             'dislikes': {
-                'count': instance.dislikes.count(),
+                'count': instance.dislikes_count,
                 'me': disliked_by_me
             }
         }
@@ -230,11 +222,23 @@ class ArticleSerializer(serializers.ModelSerializer):
             return False
         elif isinstance(self.context.get('request').user, AnonymousUser):
             return False
-        try:
-            FavouriteArticle.objects.get(user=self.context.get('request').user, article=obj.id)
-            return True
-        except FavouriteArticle.DoesNotExist:
-            return False
+        elif hasattr(obj, 'favourited_by_me'):
+            return obj.favourited_by_me
+        return FavouriteArticle.objects.filter(user=self.context.get('request').user, article=obj.id).exists()
+
+
+class ArticleSnippetSerializer(ArticleSerializer):
+    """
+    An article in the search results, with a passage of the body around the searched words
+    instead of the body, see `snippet`. The searched words are in the `search_words` context.
+    """
+    snippet = serializers.SerializerMethodField()
+
+    class Meta(ArticleSerializer.Meta):
+        fields = [field for field in ArticleSerializer.Meta.fields if field != 'body'] + ['snippet']
+
+    def get_snippet(self, instance):
+        return snippet(instance.body, self.context.get('search_words', []), settings.ARTICLE_SEARCH['SNIPPET_WORDS'])
 
 
 class TagsSerializer(serializers.ModelSerializer):
@@ -280,6 +284,14 @@ class RatingSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         rating = ArticleRating.objects.create(**validated_data)
+        ArticleRatingSummary.record(rating.article_id, rating=rating.rating)
+
+        return rating
+
+    def update(self, instance, validated_data):
+        previous_rating = instance.rating
+        rating = super().update(instance, validated_data)
+        ArticleRatingSummary.record(rating.article_id, rating=rating.rating, previous_rating=previous_rating)
 
         return rating
 
@@ -297,6 +309,22 @@ class RatingSerializer(serializers.ModelSerializer):
         return {'rating': _rating}
 
 
+class RatingSummarySerializer(serializers.ModelSerializer):
+    """
+    Represents the average, total and breakdown of the ratings of an article
+    """
+    avg_rating = serializers.FloatField(source='average')
+    total_user = serializers.IntegerField(source='total')
+    each_rating = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ArticleRatingSummary
+        fields = ['avg_rating', 'total_user', 'each_rating']
+
+    def get_each_rating(self, instance):
+        return instance.each_rating
+
+
 class CommentSerializer(serializers.ModelSerializer):
     """ serialize and deserialize comment model"""
     body = serializers.CharField(max_length=1200)  # remove
@@ -401,31 +429,31 @@ def update(request, key):
 
 
 class StatsSerializer(serializers.ModelSerializer):
-    view_count = serializers.SerializerMethodField()
-    comment_count = serializers.SerializerMethodField()
-    like_count = serializers.SerializerMethodField()
-    dislike_count = serializers.SerializerMethodField()
-    average_rating = serializers.SerializerMethodField()
+    view_count = serializers.IntegerField(source='views_count')
+    comment_count = serializers.IntegerField(source='comments_count')
+    like_count = serializers.IntegerField(source='likes_count')
+    dislike_count = serializers.IntegerField(source='dislikes_count')
+    average_rating = serializers.FloatField()
 
-    def get_comment_count(self, value):
-        return Comment.objects.filter(article=value).count()
+    class Meta:
+        model = Article
+        fields = ['slug', 'title', 'view_count', 'comment_count', 'like_count', 'dislike_count', 'average_rating']
 
-    def get_view_count(self, value):
-        return ArticleView.objects.filter(article=value).count()
 
-    def get_like_count(self, value):
-        return value.likes.count()
+class DailyStatsSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ArticleDailyStats
+        fields = ['day', 'views', 'readers', 'likes', 'comments']
 
-    def get_dislike_count(self, value):
-        return value.dislikes.count()
 
-    def get_average_rating(self, value):
-        return ArticleRating.objects.filter(article=value).aggregate(
-            average_rating=models.Avg('rating'))['average_rating'] or 0
+class StatsSeriesSerializer(StatsSerializer):
+    """
+    The stats of an article with the per-day series of its recent activity
+    """
+    daily = DailyStatsSerializer(source='recent_daily_stats', many=True)
 
-    class Meta:
-        model = Article
-        fields = ['slug', 'title', 'view_count', 'comment_count', 'like_count', 'dislike_count', 'average_rating']
+    class Meta(StatsSerializer.Meta):
+        fields = StatsSerializer.Meta.fields + ['daily']
 
 
 class ReporterField(serializers.RelatedField):
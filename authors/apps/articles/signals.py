@@ -1,43 +1,170 @@
+from django.conf import settings
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_save, post_delete, pre_delete
 from django.dispatch import receiver
-from authors.apps.ah_notifications.notifications import Verbs
-from authors.apps.core.mail_sender import send_email
-from notifications.signals import notify
+from django.utils import timezone
+from authors.apps.ah_notifications.models import NotificationPreference
+from authors.apps.ah_notifications.notifications import Verbs, bulk_notify, notify_coalesced, notify_user
+from authors.apps.core.mail_sender import build_template_email, queue_emails
 from rest_framework.reverse import reverse
 
-from authors.apps.articles.models import Article, FavouriteArticle, Comment
+from authors.apps.articles.search import search_cache
+from authors.apps.articles.search_engine import search_engine
+from authors.apps.articles.models import (
+    Article, FavouriteArticle, Comment, ArticleView, ArticleRating, ArticleRatingSummary, ArticleDailyStats, Tag,
+)
 
 
 @receiver(post_save, sender=Article)
 def send_create_article_notification_to_followers(sender, instance, created, **kwargs):
+    """
+    Notify the followers of the author when the article is published for the first time
+    """
+    if not instance.claim_first_publish():
+        return
+
     followers = instance.author.profile.followers()
+    in_app = followers.exclude(user_id__in=NotificationPreference.opted_out(Verbs.ARTICLE_CREATION,
+                                                                            NotificationPreference.IN_APP))
+    bulk_notify(instance, in_app.values_list('user_id', flat=True).iterator(), verb=Verbs.ARTICLE_CREATION,
+                description="An article by an author you follow has been created")
 
-    for follower in followers:
-        if follower.user.is_subscribed:
-            data = {
-                'username': follower.user.username,
-                'article_title': instance.title,
-                'author': instance.author.username,
-                'unsubscribe_url': 'http://localhost:8000'+reverse('notifications:subscribe')
-            }
-            send_email(
-                template='article_created.html',
-                data=data,
-                to_email=follower.user.email,
-                subject='You have a new notification',
-            )
-        notify.send(instance, verb=Verbs.ARTICLE_CREATION, recipient=follower.user,
-                    description="An article by an author you follow has been created")
+    subscribed = followers.filter(user__is_subscribed=True).exclude(
+        user_id__in=NotificationPreference.opted_out(Verbs.ARTICLE_CREATION, NotificationPreference.EMAIL))
+    subscribed = subscribed.select_related('user').iterator()
+    queue_emails(build_template_email(
+        template='article_created.html',
+        data={
+            'username': follower.user.username,
+            'article_title': instance.title,
+            'author': instance.author.username,
+            'unsubscribe_url': 'http://localhost:8000'+reverse('notifications:subscribe')
+        },
+        to_email=follower.user.email,
+        subject='You have a new notification',
+    ) for follower in subscribed)
 
 
 @receiver(post_save, sender=FavouriteArticle)
 def send_user_favorited_article_to_author(sender, instance, created, **kwargs):
-    notify.send(instance, verb=Verbs.ARTICLE_FAVORITING, recipient=instance.article.author,
-                description="{} just favorited your article".format(instance.user.email))
+    if not created:
+        return
+    notify_coalesced(instance, instance.article.author, Verbs.ARTICLE_FAVORITING, instance.article,
+                     "{name} just favorited your article", "{name} and {others} others favorited your article",
+                     name=instance.user.email)
 
 
 @receiver(post_save, sender=Comment)
 def send_user_commented_on_article_to_author(sender, instance, created, **kwargs):
-    notify.send(instance, verb=Verbs.ARTICLE_COMMENT, recipient=instance.article.author,
+    notify_user(instance, instance.article.author, Verbs.ARTICLE_COMMENT,
                 description="{} commented on \"{}\"".format(instance.author.username, instance.article.title))
+
+
+# the article counter maintained for each related model
+RELATED_COUNTERS = {
+    Comment: 'comments_count',
+    FavouriteArticle: 'favourites_count',
+    ArticleView: 'views_count',
+}
+
+
+def update_article_counters(article_id, **deltas):
+    Article.objects_with_deleted.filter(pk=article_id).update_counters(**deltas)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_save, sender=FavouriteArticle)
+@receiver(post_save, sender=ArticleView)
+def increment_article_counter(sender, instance, created, **kwargs):
+    if created:
+        update_article_counters(instance.article_id, **{RELATED_COUNTERS[sender]: 1})
+
+
+@receiver(post_delete, sender=Comment)
+@receiver(post_delete, sender=FavouriteArticle)
+@receiver(post_delete, sender=ArticleView)
+def decrement_article_counter(sender, instance, **kwargs):
+    update_article_counters(instance.article_id, **{RELATED_COUNTERS[sender]: -1})
+
+
+@receiver(post_delete, sender=ArticleRating)
+def remove_article_rating(sender, instance, **kwargs):
+    ArticleRatingSummary.record(instance.article_id, previous_rating=instance.rating)
+
+
+@receiver(post_save, sender=Comment)
+def count_daily_comment(sender, instance, created, **kwargs):
+    if created:
+        ArticleDailyStats.record(instance.article_id, comments=1)
+
+
+@receiver(post_save, sender=ArticleView)
+def count_daily_reader(sender, instance, created, **kwargs):
+    if created:
+        ArticleDailyStats.record(instance.article_id, timezone.localdate(instance.created_at), readers=1)
+
+
+def update_search(articles, touch=True):
+    """
+    Update the search vectors of the articles and the search index of the process, and invalidate
+    the cached searches
+    :param articles: a queryset of articles
+    :param touch: whether to bump the update time of the articles, so that the other processes
+    refresh them in their search index, the saved articles have theirs bumped already
+    """
+    if touch:
+        articles.update(updated_at=timezone.now())
+    articles.update_search_vectors()
+    search_engine.update(articles)
+    search_cache.bump()
+
+
+@receiver(post_save, sender=Article)
+def update_article_search_vector(sender, instance, **kwargs):
+    update_search(Article.objects_with_deleted.filter(pk=instance.pk), touch=False)
+
+
+@receiver(m2m_changed, sender=Article.tags.through)
+def update_tagged_articles_search_vectors(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Update the search vectors of the articles whose tags changed, from either side of the relation
+    """
+    if not reverse:
+        if action.startswith('post_'):
+            update_search(Article.objects_with_deleted.filter(pk=instance.pk))
+    elif action == 'pre_clear':
+        # the articles of the tag are only known before they are cleared
+        instance.cleared_article_ids = list(instance.articles.values_list('pk', flat=True))
+    elif action.startswith('post_'):
+        article_ids = instance.cleared_article_ids if pk_set is None else pk_set
+        update_search(Article.objects_with_deleted.filter(pk__in=article_ids))
+
+
+@receiver(pre_delete, sender=Tag)
+def remember_tagged_articles(sender, instance, **kwargs):
+    # deleting the tag removes it from its articles without an m2m_changed signal
+    instance.cleared_article_ids = list(instance.articles.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Tag)
+def update_untagged_articles_search_vectors(sender, instance, **kwargs):
+    update_search(Article.objects_with_deleted.filter(pk__in=instance.cleared_article_ids))
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def update_author_articles_search_vectors(sender, instance, created, update_fields=None, **kwargs):
+    """
+    The username of the author is in the search vectors of their articles, they are only updated
+    when the username changes
+    """
+    if created or (update_fields is not None and 'username' not in update_fields):
+        return
+    if instance.username_changed():
+        update_search(Article.objects_with_deleted.filter(author=instance))
+        instance.loaded_username = instance.username
+
+
+@receiver(post_delete, sender=Article)
+def remove_deleted_article_from_search(sender, instance, **kwargs):
+    search_engine.remove(instance.pk)
+    search_cache.bump()
@@ -1,7 +1,10 @@
 import json
 import random
 import string
+from base64 import urlsafe_b64encode
 
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.utils.text import slugify
 from rest_framework import status
 from rest_framework.reverse import reverse
@@ -410,6 +413,103 @@ class GetArticlesTestCase(BaseArticlesTestCase):
         self.assertIsNone(res.data['links']['previous'])
         self.assertIsNotNone(res.data['links']['next'])
 
+    def walk_cursor_pages(self, url):
+        """
+        Follow the next links of a cursor paginated list and return every page
+        :param url:
+        :return:
+        """
+        pages = []
+        while url is not None:
+            page = self.client.get(url, data=None, format="json").data
+            pages.append(page)
+            url = page['links']['next']
+        return pages
+
+    def test_user_can_query_articles_using_cursors(self):
+        """
+        Ensures a user can page through all the articles using cursors, without counting them
+        """
+        self.create_30_articles()
+        pages = self.walk_cursor_pages(self.url_list + '?pagination=cursor&page_size=10')
+        self.assertEqual(3, len(pages))
+        self.assertNotIn('count', pages[0])
+        self.assertIsNone(pages[0]['links']['previous'])
+
+        slugs = [article['slug'] for page in pages for article in page['results']]
+        self.assertEqual(30, len(set(slugs)))
+        created = [article['created_at'] for page in pages for article in page['results']]
+        self.assertEqual(created, sorted(created, reverse=True))
+
+    def test_user_can_go_back_using_cursors(self):
+        """
+        Ensures the previous cursor returns the page before the current one
+        """
+        self.create_30_articles()
+        first, second = self.walk_cursor_pages(self.url_list + '?pagination=cursor&page_size=10')[:2]
+        previous = self.client.get(second['links']['previous'], data=None, format="json").data
+        self.assertEqual(first['results'], previous['results'])
+        self.assertIsNone(previous['links']['previous'])
+
+    def test_invalid_cursor_returns_404(self):
+        """
+        Ensures a tampered cursor is rejected
+        """
+        res = self.client.get(self.url_list + '?cursor=not-a-cursor', data=None, format="json")
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cursor_with_invalid_position_returns_404(self):
+        """
+        Ensures a well formed cursor whose position is not a valid key is rejected
+        """
+        for position in (["not a date", 1], ["2018-11-28T08:31:00+00:00", "not an id"], [None, 1], [{}, 1]):
+            cursor = urlsafe_b64encode(json.dumps({'position': position, 'reverse': False}).encode()).decode()
+            res = self.client.get(self.url_list, data={'cursor': cursor}, format="json")
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def count_list_queries(self, page_size):
+        """
+        Count the queries made while listing a page of articles
+        :param page_size:
+        :return:
+        """
+        with CaptureQueriesContext(connection) as context:
+            res = self.client.get(self.url_list + '?page_size={}'.format(page_size), data=None, format="json")
+        self.assertEqual(page_size, len(res.data['results']))
+        return len(context.captured_queries)
+
+    def test_listing_articles_uses_a_constant_number_of_queries(self):
+        """
+        Ensure the number of queries made when listing articles does not grow with the page size
+        """
+        self.create_random_articles()
+        self.register_and_login(self.user2)
+        for article in self.get_all_articles()['results']:
+            self.client.post(reverse('articles:like', kwargs={'slug': article['slug']}))
+            self.client.put(reverse('articles:rate-article', kwargs={'slug': article['slug']}),
+                            data={'rating': {'rating': 4}}, format="json")
+
+        self.assertEqual(self.count_list_queries(2), self.count_list_queries(5))
+
+    def test_listed_articles_have_reactions_ratings_and_favourites(self):
+        """
+        Ensure the listed articles carry the same reactions, ratings and favourites as a single article
+        """
+        slug = self.create_article(published=True)['slug']
+        self.register_and_login(self.user2)
+        self.client.post(reverse('articles:like', kwargs={'slug': slug}))
+        self.client.post(reverse('articles:favourite_article', kwargs={'slug': slug}))
+        self.client.put(reverse('articles:rate-article', kwargs={'slug': slug}),
+                        data={'rating': {'rating': 4}}, format="json")
+
+        listed = self.get_all_articles()['results'][0]
+        single = json.loads(self.get_single_article(slug).content)['data']['article']
+        self.assertEqual(listed['reactions'], single['reactions'])
+        self.assertEqual(listed['avg_rating'], single['avg_rating'])
+        self.assertEqual(listed['author'], single['author'])
+        self.assertTrue(listed['reactions']['likes']['me'])
+        self.assertTrue(listed['favourited'])
+
 
 class UpdateArticleTestCase(BaseArticlesTestCase):
 
@@ -93,6 +93,23 @@ class TestArticleComment(BaseArticlesTestCase):
 
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
 
+    def test_thread_replies_can_be_paged_using_cursors(self):
+        """Test thread replies are listed oldest first when paged with cursors"""
+        self.register_and_login(self.user)
+        slug = self.create_article()["slug"]
+        response = self.client.post(reverse("articles:comments", kwargs={'slug': slug}), data=self.comment,
+                                    format="json")
+        url = reverse("articles:a-comment", kwargs={'slug': slug, 'pk': response.data['id']})
+        for reply in range(5):
+            self.client.post(url, data={"comment": {"body": "reply {}".format(reply)}}, format="json")
+
+        first = self.client.get(url + '?pagination=cursor&page_size=3', format="json").data
+        second = self.client.get(first['links']['next'], format="json").data
+        replies = [reply['body'] for reply in first['results'] + second['results']]
+        self.assertEqual(replies, ["reply {}".format(reply) for reply in range(5)])
+        self.assertEqual(first['comment']['id'], response.data['id'])
+        self.assertIsNone(second['links']['next'])
+
     def test_thread_comment_unavailable_article(self):
         """Test thread-commenting on non-existing-comment"""
         self.register_and_login(self.user)
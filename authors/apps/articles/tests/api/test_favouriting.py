@@ -107,3 +107,16 @@ class TestFavouriteArticle(BaseArticlesTestCase):
         response = self.client.get(reverse(
             'articles:article-favourites'), format='json')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_user_can_page_favourites_using_cursors(self):
+        """registered user gets their favourites, most recently favourited first"""
+        slugs = [self.create_article(published=True)['slug'] for _ in range(3)]
+        self.register_and_login(self.fav_user)
+        for slug in slugs:
+            self.client.post(reverse('articles:favourite_article', kwargs={'slug': slug}), format='json')
+
+        url = reverse('articles:article-favourites') + '?pagination=cursor&page_size=2'
+        first = self.client.get(url, format='json').data
+        second = self.client.get(first['links']['next'], format='json').data
+        favourites = [article['slug'] for article in first['results'] + second['results']]
+        self.assertEqual(favourites, list(reversed(slugs)))
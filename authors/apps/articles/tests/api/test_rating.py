@@ -166,3 +166,20 @@ class TestArticleRating(BaseArticlesTestCase):
         self.register_and_login(self.rating_user)
         response = self.client.get(reverse("articles:rating-article", kwargs={'slug': slug}), format="json")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_ratings_summary_follows_changed_ratings(self):
+        """
+        The average, total and breakdown of the ratings follow ratings as they are given and changed
+        """
+        slug = self.create_article()['slug']
+        self.register_and_login(self.rating_user)
+        self.client.put(reverse("articles:rate-article", kwargs={'slug': slug}), data=self.articleRating, format="json")
+        self.client.put(reverse("articles:rate-article", kwargs={'slug': slug}),
+                        data={"rating": {"rating": 5}}, format="json")
+        self.register_and_login(self.user2)
+        self.client.put(reverse("articles:rate-article", kwargs={'slug': slug}), data=self.articleRating, format="json")
+
+        response = self.client.get(reverse("articles:rating-article", kwargs={'slug': slug}), format="json")
+        self.assertEqual(response.data['avg_rating'], 4)
+        self.assertEqual(response.data['total_user'], 2)
+        self.assertEqual(response.data['each_rating'], {3: 1, 5: 1})
@@ -1,12 +1,19 @@
 import json
 
+from django.conf import settings
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 
 from authors.apps.articles.tests.api.test_articles import BaseArticlesTestCase
 from authors.apps.core.test_helpers import set_test_client, login, logout
 
 
+# the views are counted as the articles are read
+@override_settings(ARTICLE_VIEWS_BUFFER=dict(settings.ARTICLE_VIEWS_BUFFER, ENABLED=False))
 class BaseReadStatsTestCase(BaseArticlesTestCase):
     def setUp(self):
         super().setUp()
@@ -175,3 +182,106 @@ class ReadStatsTestCase(BaseReadStatsTestCase):
         response = self.article_stats()
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertStatsEqual(response.data, rating=3)
+
+    def test_daily_series_of_articles(self):
+        # other users read, like and comment on the article
+        login()
+        self.view_article(self.slug)
+        self.view_article(self.slug)
+        self.like_article(self.slug)
+        login()
+        self.view_article(self.slug)
+        self.comment_on_article(self.slug)
+        # owner gets the stats of the last week
+        login(self.owner)
+        response = self.client.get(reverse('articles:stats'), {'days': 7})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        stats = json.loads(json.dumps(response.data))
+        self.assertEqual(stats[0]['view_count'], 2)
+        self.assertEqual(stats[0]['daily'], [{
+            'day': str(timezone.localdate()),
+            'views': 3,
+            'readers': 2,
+            'likes': 1,
+            'comments': 1,
+        }])
+
+    def test_daily_series_rejects_invalid_days(self):
+        login(self.owner)
+        response = self.client.get(reverse('articles:stats'), {'days': 'week'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        # a unicode digit that int() does not parse
+        response = self.client.get(reverse('articles:stats'), {'days': '\u00b2'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ArticleStatsListingTestCase(BaseReadStatsTestCase):
+    def setUp(self):
+        super().setUp()
+        login(self.owner)
+        self.other = self.create_another_article()
+        logout()
+
+    def create_another_article(self):
+        return self.create_article({
+            "article": {
+                "title": "Another article",
+                "description": "Another description",
+                "body": "Another body",
+            }
+        }, published=True)
+
+    def stats_of(self, response):
+        stats = json.loads(json.dumps(response.data))
+        return stats['results'] if 'results' in stats else stats
+
+    def test_stats_are_read_with_a_constant_number_of_queries(self):
+        login(self.owner)
+        with CaptureQueriesContext(connection) as few:
+            self.article_stats()
+        for _ in range(3):
+            self.create_another_article()
+        with CaptureQueriesContext(connection) as many:
+            response = self.article_stats()
+        self.assertEqual(len(response.data), 5)
+        self.assertEqual(len(few.captured_queries), len(many.captured_queries))
+
+    def test_stats_can_be_ordered_by_any_metric(self):
+        login()
+        self.view_article(self.slug)
+        self.rate_article(self.other['slug'], 4)
+        login(self.owner)
+
+        response = self.client.get(reverse('articles:stats'), {'ordering': '-view_count'})
+        self.assertEqual([stats['slug'] for stats in self.stats_of(response)], [self.slug, self.other['slug']])
+        response = self.client.get(reverse('articles:stats'), {'ordering': '-average_rating'})
+        self.assertEqual([stats['slug'] for stats in self.stats_of(response)], [self.other['slug'], self.slug])
+
+    def test_stats_cannot_be_ordered_by_unknown_fields(self):
+        login(self.owner)
+        response = self.client.get(reverse('articles:stats'), {'ordering': 'body'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_paginated_stats_include_totals(self):
+        login()
+        self.view_article(self.slug)
+        self.like_article(self.slug)
+        self.rate_article(self.slug, 2)
+        self.rate_article(self.other['slug'], 5)
+        login()
+        self.view_article(self.other['slug'])
+        self.rate_article(self.other['slug'], 5)
+        login(self.owner)
+
+        response = self.client.get(reverse('articles:stats'), {'page_size': 1, 'ordering': 'title'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(response.data['totals'], {
+            'articles': 2,
+            'view_count': 2,
+            'comment_count': 0,
+            'like_count': 1,
+            'dislike_count': 0,
+            'average_rating': 4.0,
+        })
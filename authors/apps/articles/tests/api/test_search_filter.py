@@ -1,8 +1,19 @@
 import json
+from unittest import mock
 
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.module_loading import import_string
 from rest_framework.reverse import reverse
 
+from authors.apps.articles.models import Article, Tag
+from authors.apps.articles.search import SearchResultsCache, search_cache, snippet
 from authors.apps.articles.tests.api.test_articles import BaseArticlesTestCase
+from authors.apps.authentication.tests.api.test_auth import AuthenticatedTestCase
+from authors.apps.core.cache import shared_cache
 
 true = True
 false = False
@@ -86,3 +97,240 @@ class TestFavouriteArticle(BaseArticlesTestCase):
         response = self.create_articles()
         response = self.client.get(reverse("articles:search-filter"), data={"search": 'more'})
         self.assertIn(b"never", response.content)
+
+
+class FullTextSearchTest(AuthenticatedTestCase):
+    """Searching the articles by relevance with their search vectors"""
+
+    def create_article(self, title, description="A description", body="A body", tags=()):
+        article = Article.objects.create(title=title, description=description, body=body, published=True,
+                                         author=self.get_current_user())
+        for tag in tags:
+            article.tags.add(Tag.objects.get_or_create(tag=tag, slug=tag)[0])
+        return article
+
+    def search(self, **params):
+        response = self.client.get(reverse("articles:search-filter"), data=params)
+        return [article['title'] for article in response.data['results']]
+
+    def test_results_are_ranked_by_relevance(self):
+        """
+        Ensure an article matching in its title comes before one matching in its body
+        """
+        self.create_article("Cooking for beginners", body="Dragons are not on the menu")
+        self.create_article("Dragons of the north", body="A body")
+
+        self.assertEqual(self.search(search="dragons"), ["Dragons of the north", "Cooking for beginners"])
+
+    def test_terms_match_word_prefixes(self):
+        """
+        Ensure a term matches the words it starts and every term must match
+        """
+        self.create_article("The greatest dragon")
+        self.create_article("The greatest cook")
+
+        self.assertEqual(self.search(search="great drag"), ["The greatest dragon"])
+
+    def test_tags_and_author_are_searched_without_duplicates(self):
+        """
+        Ensure the tags and the author of the articles are searched, and each article is returned once
+        """
+        self.create_article("An article", tags=["python", "pythonic"])
+
+        self.assertEqual(self.search(search="python"), ["An article"])
+        self.assertEqual(self.search(search="beverly"), ["An article"])
+
+    def test_search_vectors_follow_tag_changes(self):
+        """
+        Ensure adding, removing and deleting tags updates the search vectors
+        """
+        article = self.create_article("An article", tags=["python"])
+        django = Tag.objects.create(tag="django", slug="django")
+        django.articles.add(article)
+        self.assertEqual(self.search(search="django"), ["An article"])
+
+        article.tags.remove(django)
+        self.assertEqual(self.search(search="django"), [])
+
+        Tag.objects.get(slug="python").delete()
+        self.assertEqual(self.search(search="python"), [])
+
+    def test_search_vectors_follow_username_changes(self):
+        """
+        Ensure the search vectors of the articles of an author follow the username of the author
+        """
+        self.create_article("An article")
+        user = self.get_current_user()
+        user.username = "renamed"
+        user.save()
+
+        self.assertEqual(self.search(search="beverly"), [])
+        self.assertEqual(self.search(search="renamed"), ["An article"])
+
+    def test_saving_an_author_keeps_the_search_vectors(self):
+        """
+        Ensure saving an author without changing their username does not update the search vectors
+        """
+        self.create_article("An article")
+        user = self.get_current_user()
+        user.is_subscribed = False
+        with CaptureQueriesContext(connection) as context:
+            user.save()
+        self.assertFalse(any('search_vector' in query['sql'] for query in context.captured_queries))
+
+        user.username = "renamed"
+        user.save()
+        with CaptureQueriesContext(connection) as context:
+            user.save()
+        self.assertFalse(any('search_vector' in query['sql'] for query in context.captured_queries))
+
+    def test_search_works_with_filters(self):
+        """
+        Ensure the search can be combined with the filters and the ordering
+        """
+        self.create_article("Dragons", tags=["fantasy"])
+        self.create_article("Dragon stories", tags=["fantasy"])
+        self.create_article("Dragon recipes", tags=["food"])
+
+        self.assertEqual(set(self.search(search="dragon", tag="fantasy")), {"Dragons", "Dragon stories"})
+        self.assertEqual(self.search(search="dragon", ordering="title"),
+                         ["Dragon recipes", "Dragon stories", "Dragons"])
+
+    @override_settings(ARTICLE_SEARCH=dict(settings.ARTICLE_SEARCH, BACKEND='contains'))
+    def test_contains_backend_matches_within_words(self):
+        """
+        Ensure the contains backend matches the terms anywhere in the fields
+        """
+        self.create_article("The greatest dragon")
+
+        self.assertEqual(self.search(search="eatest"), ["The greatest dragon"])
+        self.assertEqual(self.search(search="dragon"), ["The greatest dragon"])
+
+
+class SnippetTest(SimpleTestCase):
+
+    def highlighted(self, result):
+        return [result['text'][start:end] for start, end in result['highlights']]
+
+    def test_passage_with_the_most_searched_words_is_chosen(self):
+        """
+        Ensure the passage matching the most distinct words is returned, with the offsets of the matches
+        """
+        text = "Dragons live in caves. " + "Filler words here. " * 20 + "Dragons breathe fire at knights."
+        result = snippet(text, ["dragon", "fire"], 8)
+
+        self.assertTrue(result['text'].startswith("... "))
+        self.assertIn("Dragons breathe fire", result['text'])
+        self.assertEqual(self.highlighted(result), ["Dragons", "fire"])
+
+    def test_text_without_matches_starts_the_passage(self):
+        """
+        Ensure the start of the text is returned when no word matches it
+        """
+        result = snippet("One two three four five", ["dragon"], 3)
+        self.assertEqual(result, {'text': "One two three ...", 'highlights': []})
+        self.assertEqual(snippet("", ["dragon"], 3), {'text': '', 'highlights': []})
+
+
+class SearchSnippetsTest(AuthenticatedTestCase):
+
+    def test_snippets_replace_the_bodies(self):
+        """
+        Ensure the search returns a highlighted passage instead of a long body, a much smaller response
+        """
+        body = " ".join(["Lorem ipsum dolor sit amet, consectetur adipiscing elit."] * 300 + ["The dragon sleeps."])
+        Article.objects.create(title="A long article", description="A description", body=body, published=True,
+                               author=self.get_current_user())
+        url = reverse("articles:search-filter")
+
+        full = self.client.get(url, data={"search": "dragon"})
+        snippets = self.client.get(url, data={"search": "dragon", "snippets": "true"})
+        article = snippets.data['results'][0]
+
+        self.assertNotIn('body', article)
+        text, (start, end) = article['snippet']['text'], article['snippet']['highlights'][0]
+        self.assertEqual(text[start:end], "dragon")
+        self.assertLess(len(snippets.content) * 10, len(full.content))
+
+
+class SearchResultsCacheTest(AuthenticatedTestCase):
+
+    def setUp(self):
+        super().setUp()
+        # the local memory cache of the tests stands in for memcached, the tests run in one process
+        patcher = mock.patch('authors.apps.articles.search.shared_cache', caches.__getitem__)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        search_cache.cache.clear()
+        self.article = Article.objects.create(title="Dragons", description="A description", body="A body",
+                                              published=True, author=self.get_current_user())
+
+    def search(self, **params):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse("articles:search-filter"), data=params)
+        return [article['title'] for article in response.data['results']], context.captured_queries
+
+    def test_repeated_searches_only_read_the_page(self):
+        """
+        Ensure a repeated search reads the articles of the page by id, without searching or counting again
+        """
+        first, searched = self.search(search="Dragons", ordering="title")
+        again, cached = self.search(search="dragons", ordering="title")
+
+        self.assertEqual(first, again)
+        self.assertTrue(any('COUNT(' in query['sql'] for query in searched))
+        self.assertFalse(any('COUNT(' in query['sql'] or 'to_tsquery' in query['sql'] for query in cached))
+        self.assertLess(len(cached), len(searched))
+
+    def test_writes_invalidate_the_cached_searches(self):
+        """
+        Ensure the searches see the articles and tags written since they were cached
+        """
+        self.search(search="dragons")
+        article = Article.objects.create(title="More dragons", description="A description", body="A body",
+                                         published=True, author=self.get_current_user())
+        self.assertEqual(set(self.search(search="dragons")[0]), {"Dragons", "More dragons"})
+
+        self.search(search="fantasy")
+        article.tags.add(Tag.objects.create(tag="fantasy", slug="fantasy"))
+        self.assertEqual(self.search(search="fantasy")[0], ["More dragons"])
+
+        article.delete(hard=True)
+        self.assertEqual(self.search(search="dragons")[0], ["Dragons"])
+
+    def test_pages_are_cached_apart(self):
+        """
+        Ensure every page of a search is cached by its bounds
+        """
+        Article.objects.create(title="Dragons again", description="A description", body="A body",
+                               published=True, author=self.get_current_user())
+        first = self.search(search="dragons", ordering="title", page_size=1)[0]
+        second = self.search(search="dragons", ordering="title", page_size=1, page=2)[0]
+
+        self.assertEqual(first + second, ["Dragons", "Dragons again"])
+        self.assertEqual(self.search(search="dragons", ordering="title", page_size=1, page=2)[0], second)
+
+    def test_writes_through_another_cache_instance_invalidate_the_cached_searches(self):
+        """
+        Ensure a write bumping the generation through another instance of the shared cache, as another
+        process does, invalidates the searches cached through this one
+        """
+        self.search(search="dragons")
+        config = settings.CACHES[settings.ARTICLE_SEARCH['CACHE']]
+        other = import_string(config['BACKEND'])(config.get('LOCATION', ''), config)
+        self.assertIsNot(other, search_cache.cache)
+
+        with mock.patch.object(SearchResultsCache, 'cache', other):
+            Article.objects.create(title="More dragons", description="A description", body="A body",
+                                   published=True, author=self.get_current_user())
+        self.assertEqual(set(self.search(search="dragons")[0]), {"Dragons", "More dragons"})
+
+    def test_searches_are_not_cached_without_a_shared_cache(self):
+        """
+        Ensure the searches are not cached when the cache is not memcached or Redis, the writes of the
+        other processes would not invalidate them
+        """
+        with mock.patch('authors.apps.articles.search.shared_cache', shared_cache):
+            self.search(search="dragons")
+            _, queries = self.search(search="dragons")
+            self.assertTrue(any('to_tsquery' in query['sql'] for query in queries))
@@ -0,0 +1,85 @@
+from django.test import override_settings
+
+from authors.apps.articles.buffers import ArticleViewBuffer
+from authors.apps.articles.models import Article, ArticleView
+from authors.apps.authentication.models import User
+from authors.apps.authentication.tests.api.test_auth import AuthenticatedTestCase
+
+BUFFERED = {'ENABLED': True, 'MAX_SIZE': 3, 'FLUSH_INTERVAL': 60}
+
+
+@override_settings(ARTICLE_VIEWS_BUFFER=BUFFERED)
+class ArticleViewBufferTest(AuthenticatedTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.buffer = ArticleViewBuffer()
+        self.article = Article.objects.create(title="This is a simple title", description="A simple description",
+                                              body="This is a simple body", author=self.get_current_user())
+        self.readers = [User.objects.create_user("reader{}".format(i), "reader{}@gmail.com".format(i), "password")
+                        for i in range(3)]
+
+    def tearDown(self):
+        self.buffer.flush()
+        super().tearDown()
+
+    def views_count(self):
+        self.article.refresh_from_db()
+        return self.article.views_count
+
+    def test_views_are_written_on_flush(self):
+        """
+        Ensure buffered views are only written when the buffer is flushed, once per reader
+        """
+        self.buffer.record(self.article, self.readers[0])
+        self.buffer.record(self.article, self.readers[0])
+        self.buffer.record(self.article, self.readers[1])
+        self.assertFalse(ArticleView.objects.exists())
+
+        self.assertEqual(self.buffer.flush(), 2)
+        self.assertEqual(ArticleView.objects.filter(article=self.article).count(), 2)
+        self.assertEqual(self.views_count(), 2)
+        daily = self.article.daily_stats.get()
+        self.assertEqual((daily.views, daily.readers), (3, 2))
+
+    def test_flushes_when_full(self):
+        """
+        Ensure the buffer writes the views as soon as it holds the maximum number of views
+        """
+        for reader in self.readers:
+            self.buffer.record(self.article, reader)
+        self.assertEqual(ArticleView.objects.filter(article=self.article).count(), 3)
+        self.assertEqual(self.buffer.flush(), 0)
+
+    def test_ignores_views_already_recorded(self):
+        """
+        Ensure a reader is only counted once even when the view was recorded before the flush
+        """
+        ArticleView.objects.create(article=self.article, user=self.readers[0])
+        self.buffer.record(self.article, self.readers[0])
+        self.buffer.record(self.article, self.readers[1])
+
+        self.assertEqual(self.buffer.flush(), 1)
+        self.assertEqual(self.views_count(), 2)
+
+    def test_skips_views_of_removed_articles(self):
+        """
+        Ensure views of an article deleted before the flush are dropped without failing the others
+        """
+        other = Article.objects.create(title="Another title", description="A simple description",
+                                       body="This is a simple body", author=self.get_current_user())
+        self.buffer.record(other, self.readers[0])
+        self.buffer.record(self.article, self.readers[0])
+        other.delete(hard=True)
+
+        self.assertEqual(self.buffer.flush(), 1)
+        self.assertEqual(self.views_count(), 1)
+
+    @override_settings(ARTICLE_VIEWS_BUFFER=dict(BUFFERED, ENABLED=False))
+    def test_records_immediately_when_disabled(self):
+        """
+        Ensure views are written straight away when buffering is disabled
+        """
+        self.buffer.record(self.article, self.readers[0])
+        self.assertEqual(self.views_count(), 1)
+        self.assertEqual(self.buffer.flush(), 0)
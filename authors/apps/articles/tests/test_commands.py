@@ -0,0 +1,105 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.utils import timezone
+
+from authors.apps.articles.models import Article, ArticleDailyStats, ArticleRating, ArticleView, Comment
+from authors.apps.authentication.models import User
+from authors.apps.authentication.tests.api.test_auth import AuthenticatedTestCase
+
+
+class RecountArticleCountersTest(AuthenticatedTestCase):
+
+    def create_article(self):
+        return Article.objects.create(title="This is a simple title", description="This is a simple description",
+                                      body="This is a simple body", author=self.get_current_user())
+
+    def recount(self):
+        out = StringIO()
+        call_command('recount_article_counters', stdout=out)
+        return out.getvalue()
+
+    def test_counters_are_maintained_on_write(self):
+        """
+        Ensure the counters follow the related rows as they are created and deleted
+        """
+        user = self.get_current_user()
+        article = self.create_article()
+        article.like(user)
+        article.like(user)
+        comment = Comment.objects.create(article=article, body="Nice", author=user.profile)
+        ArticleView.objects.create(article=article, user=user)
+        article.refresh_from_db()
+        self.assertEqual((article.likes_count, article.comments_count, article.views_count), (1, 1, 1))
+
+        article.dislike(user)
+        comment.delete()
+        article.refresh_from_db()
+        self.assertEqual((article.likes_count, article.dislikes_count, article.comments_count), (0, 1, 0))
+
+    def test_repairs_drifted_counters(self):
+        """
+        Ensure the command recounts the counters that no longer match the related rows
+        """
+        user = self.get_current_user()
+        article = self.create_article()
+        article.likes.add(user)
+        ArticleRating.objects.create(article=article, rated_by=user, rating=4)
+        Article.objects.filter(pk=article.pk).update(comments_count=7)
+
+        output = self.recount()
+        self.assertIn('Repaired the counters of 1 article(s).', output)
+        self.assertIn('Repaired the rating summaries of 1 article(s).', output)
+        article = Article.objects.get(pk=article.pk)
+        self.assertEqual(article.likes_count, 1)
+        self.assertEqual(article.comments_count, 0)
+        self.assertEqual((article.ratings.total, article.ratings.each_rating), (1, {4: 1}))
+
+        output = self.recount()
+        self.assertIn('Repaired the counters of 0 article(s).', output)
+        self.assertIn('Repaired the rating summaries of 0 article(s).', output)
+
+
+class CompactArticleViewsTest(AuthenticatedTestCase):
+
+    def test_compacts_views_into_daily_readers(self):
+        """
+        Ensure the readers of each day are recounted from the views within the compacted days
+        """
+        article = Article.objects.create(title="This is a simple title", description="This is a simple description",
+                                         body="This is a simple body", author=self.get_current_user())
+        today = timezone.localdate()
+        yesterday = timezone.now() - timedelta(days=1)
+        readers = [User.objects.create_user("reader{}".format(i), "reader{}@gmail.com".format(i), "password")
+                   for i in range(3)]
+        ArticleView.objects.create(article=article, user=readers[0], created_at=yesterday)
+        ArticleView.objects.create(article=article, user=readers[1])
+        ArticleView.objects.create(article=article, user=readers[2], created_at=yesterday - timedelta(days=5))
+        ArticleDailyStats.objects.filter(article=article, day=today).update(readers=5, views=9)
+
+        out = StringIO()
+        call_command('compact_article_views', days=1, stdout=out)
+        self.assertIn('Compacted the views of 2 article day(s)', out.getvalue())
+
+        daily = {stats.day: (stats.views, stats.readers) for stats in article.daily_stats.all()}
+        self.assertEqual(daily[today], (9, 1))
+        self.assertEqual(daily[timezone.localdate(yesterday)], (0, 1))
+        self.assertEqual(daily[timezone.localdate(yesterday - timedelta(days=5))], (0, 1))
+
+
+class UpdateSearchVectorsTest(AuthenticatedTestCase):
+
+    def test_search_vectors_are_recomputed(self):
+        """
+        Ensure the command recomputes the search vectors of every article, the deleted ones included
+        """
+        article = Article.objects.create(title="Dragons", description="A description", body="A body",
+                                         author=self.get_current_user())
+        article.delete()
+        Article.objects_with_deleted.update(search_vector=None)
+
+        out = StringIO()
+        call_command('update_search_vectors', batch_size=1, stdout=out)
+        self.assertIn('Updated the search vectors of 1 article(s).', out.getvalue())
+        self.assertFalse(Article.objects_with_deleted.filter(search_vector=None).exists())
@@ -1,5 +1,7 @@
 from unittest import TestCase
 
+from django.contrib.auth.models import AnonymousUser
+
 from authors.apps.articles.models import Article, Tag
 from authors.apps.authentication.tests.api.test_auth import AuthenticatedTestCase
 
@@ -46,6 +48,23 @@ class ArticleModelTest(AuthenticatedTestCase):
         with self.assertRaises(Article.DoesNotExist):
             Article.objects.get(slug=article.slug)
 
+    def test_visible_to_includes_published_and_own_articles(self):
+        """
+        Ensure users see published articles and their own drafts, but never soft-deleted articles
+        :return:
+        """
+        draft = self.create_article()
+        published = self.create_article()
+        published.published = True
+        published.save()
+        deleted = self.create_article()
+        deleted.published = True
+        deleted.delete()
+
+        self.assertEqual(set(Article.objects.visible_to(self.get_current_user())), {draft, published})
+        self.assertEqual(set(Article.objects.visible_to(AnonymousUser())), {published})
+        self.assertEqual(set(Article.objects_with_deleted.visible_to(None)), {published})
+
 
 class TagModelTest(TestCase):
 
@@ -0,0 +1,227 @@
+import os
+import tempfile
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
+from rest_framework.reverse import reverse
+
+from authors.apps.articles.models import Article, Tag
+from authors.apps.articles.search_engine import SearchIndex, search_engine
+from authors.apps.authentication.tests.api.test_auth import AuthenticatedTestCase
+
+
+class SearchIndexTest(SimpleTestCase):
+
+    def setUp(self):
+        self.index = SearchIndex()
+        self.index.add(1, {'title': 'Dragons of the north', 'body': 'Cold and windy'})
+        self.index.add(2, {'title': 'Cooking', 'body': 'Dragons are not on the menu, cooking is'})
+        self.index.add(3, {'title': 'Gardening', 'tags': 'plants', 'body': 'Nothing about them'})
+
+    def ids(self, *words):
+        return [article_id for article_id, _ in self.index.search(words, 10)]
+
+    def test_articles_are_ranked_with_bm25(self):
+        """
+        Ensure the articles are ranked by the weighted frequency of the words
+        """
+        self.assertEqual(self.ids('dragons'), [1, 2])
+        self.assertEqual(self.ids('cooking'), [2])
+
+    def test_words_match_prefixes_of_every_word(self):
+        """
+        Ensure a word matches the terms it starts and an article must match every word
+        """
+        self.assertEqual(self.ids('drag', 'cold'), [1])
+        self.assertEqual(self.ids('plant'), [3])
+        self.assertEqual(self.ids('drag', 'plant'), [])
+
+    def test_articles_are_replaced_and_removed(self):
+        """
+        Ensure indexing an article again replaces its terms and removing it drops them
+        """
+        self.index.add(1, {'title': 'Winter'})
+        self.assertEqual(self.ids('dragons'), [2])
+        self.assertTrue(self.index.remove(2))
+        self.assertEqual(self.ids('dragons'), [])
+        self.assertNotIn('menu', self.index.postings)
+        self.assertFalse(self.index.remove(2))
+
+    def test_saved_index_is_loaded_memory_mapped(self):
+        """
+        Ensure a saved index searches the same once loaded, and can still be updated
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'index')
+            self.index.save(path)
+            loaded = SearchIndex.load(path)
+
+            self.assertIsInstance(loaded.postings['dragons'].ids, memoryview)
+            self.assertEqual(loaded.search(['dragons'], 10), self.index.search(['dragons'], 10))
+            loaded.remove(1)
+            loaded.add(4, {'title': 'Dragons again'})
+            self.assertEqual([article_id for article_id, _ in loaded.search(['dragons'], 10)], [4, 2])
+            self.assertNotIn('cold', loaded.postings)
+
+
+@override_settings(ARTICLE_SEARCH=dict(settings.ARTICLE_SEARCH, BACKEND='engine', INDEX_PATH=''))
+class ArticleSearchEngineTest(AuthenticatedTestCase):
+
+    def setUp(self):
+        super().setUp()
+        search_engine.clear()
+
+    def tearDown(self):
+        search_engine.clear()
+        super().tearDown()
+
+    def create_article(self, title, published=True, tags=()):
+        article = Article.objects.create(title=title, description="A description", body="A body",
+                                         published=published, author=self.get_current_user())
+        for tag in tags:
+            article.tags.add(Tag.objects.get_or_create(tag=tag, slug=tag)[0])
+        return article
+
+    def search(self, **params):
+        response = self.client.get(reverse("articles:search-filter"), data=params)
+        return [article['title'] for article in response.data['results']]
+
+    def test_published_articles_are_searched_by_relevance(self):
+        """
+        Ensure the view searches the published articles with the engine, most relevant first
+        """
+        self.create_article("Cooking dragons", tags=["dragons"])
+        self.create_article("Dragons")
+        self.create_article("Dragons draft", published=False)
+
+        self.assertEqual(self.search(search="dragons"), ["Cooking dragons", "Dragons"])
+
+    def test_index_follows_the_articles(self):
+        """
+        Ensure the index follows publishing, tagging, soft deleting, restoring and deleting the articles
+        """
+        article = self.create_article("A draft", published=False)
+        self.assertEqual(self.search(search="draft"), [])
+
+        article.published = True
+        article.save()
+        article.tags.add(Tag.objects.create(tag="fantasy", slug="fantasy"))
+        self.assertEqual(self.search(search="fantasy"), ["A draft"])
+
+        article.delete()
+        self.assertEqual(search_engine.search(["draft"]), [])
+        article.restore()
+        self.assertEqual(self.search(search="draft"), ["A draft"])
+
+        article.delete(hard=True)
+        self.assertEqual(search_engine.search(["draft"]), [])
+
+    def test_articles_saved_by_other_processes_are_picked_up(self):
+        """
+        Ensure the index picks up the articles updated since it was last refreshed
+        """
+        self.search(search="dragons")
+        article = self.create_article("Dragons")
+        search_engine.index.remove(article.pk)
+        search_engine.refreshed_at -= settings.ARTICLE_SEARCH['REFRESH_INTERVAL']
+
+        self.assertEqual(self.search(search="dragons"), ["Dragons"])
+
+    def test_index_is_built_and_loaded_from_disk(self):
+        """
+        Ensure the command saves the index and a worker loads it, with the articles saved since
+        """
+        self.create_article("Dragons")
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'index')
+            out = StringIO()
+            call_command('build_search_index', path=path, stdout=out)
+            self.assertIn('Indexed 1 article(s)', out.getvalue())
+
+            search_engine.clear()
+            self.create_article("More dragons")
+            with override_settings(ARTICLE_SEARCH=dict(settings.ARTICLE_SEARCH, INDEX_PATH=path)):
+                self.assertEqual(len(search_engine.search(["dragons"])), 2)
+            self.assertIsNotNone(search_engine.index.saved_at)
+
+    def test_index_is_reloaded_from_disk_in_the_background(self):
+        """
+        Ensure a rebuild runs in a thread, while the searches use the current index, and reloads the
+        saved index only if it was saved since the current index was built
+        """
+        article = self.create_article("Dragons")
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'index')
+            call_command('build_search_index', path=path, stdout=StringIO())
+
+            with override_settings(ARTICLE_SEARCH=dict(settings.ARTICLE_SEARCH, INDEX_PATH=path)):
+                search_engine.search(["dragons"])
+
+                # a stale index is built from the database instead
+                search_engine.rebuild(time.monotonic())
+                self.assertNotIsInstance(search_engine.index.postings['dragons'].ids, memoryview)
+
+                call_command('build_search_index', path=path, stdout=StringIO())
+                os.utime(path, (search_engine.built_at + 1, search_engine.built_at + 1))
+                current = search_engine.index
+                current.remove(article.pk)
+                search_engine.rebuilt_at -= settings.ARTICLE_SEARCH['REBUILD_INTERVAL']
+
+                search_engine.search(["dragons"])
+                search_engine.rebuilder.join()
+                self.assertIsNot(search_engine.index, current)
+                self.assertEqual([article_id for article_id, _ in search_engine.search(["dragons"])], [article.pk])
+                self.assertIsInstance(search_engine.index.postings['dragons'].ids, memoryview)
+
+    def test_updates_made_during_a_rebuild_are_kept(self):
+        """
+        Ensure the articles updated while an index is built are indexed again once it is swapped in
+        """
+        article = self.create_article("Dragons")
+        # an update time the refresh after the rebuild does not pick up
+        Article.objects.filter(pk=article.pk).update(updated_at=timezone.now() - timedelta(days=1))
+        built = search_engine.build()
+
+        def build():
+            article.tags.add(Tag.objects.create(tag="fantasy", slug="fantasy"))
+            return built
+
+        with mock.patch.object(search_engine, 'build', build):
+            search_engine.rebuild(time.monotonic())
+        self.assertEqual(self.search(search="fantasy"), ["Dragons"])
+
+    def test_removals_made_during_a_rebuild_are_kept(self):
+        """
+        Ensure the articles deleted while an index is built are removed once it is swapped in
+        """
+        article = self.create_article("Dragons")
+        built = search_engine.build()
+
+        def build():
+            article.delete(hard=True)
+            return built
+
+        with mock.patch.object(search_engine, 'build', build):
+            search_engine.rebuild(time.monotonic())
+        self.assertEqual(search_engine.search(["dragons"]), [])
+
+    def test_tag_changes_of_other_processes_are_picked_up(self):
+        """
+        Ensure changing the tags of an article bumps its update time, so that the other processes
+        refresh it in their index
+        """
+        article = self.create_article("Dragons")
+        Article.objects.filter(pk=article.pk).update(updated_at=timezone.now() - timedelta(days=1))
+        search_engine.search(["dragons"])
+        # as if the tag was added by another process
+        with mock.patch.object(search_engine, 'index', None):
+            article.tags.add(Tag.objects.create(tag="fantasy", slug="fantasy"))
+        search_engine.refreshed_at -= settings.ARTICLE_SEARCH['REFRESH_INTERVAL']
+
+        self.assertEqual(self.search(search="fantasy"), ["Dragons"])
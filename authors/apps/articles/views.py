@@ -1,5 +1,8 @@
 from django.contrib.auth.models import AnonymousUser
-from django.db.models import Count
+from datetime import timedelta
+
+from django.db.models import Count, F, Prefetch, Sum
+from django.utils import timezone
 from django.utils.text import slugify
 from rest_framework import status, viewsets, generics
 from rest_framework import mixins
@@ -9,17 +12,19 @@ from rest_framework.response import Response
 from rest_framework.generics import (
     RetrieveUpdateDestroyAPIView, CreateAPIView, ListAPIView, ListCreateAPIView, UpdateAPIView,
 )
-from django.db import models
-from collections import Counter
 from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
 from django_filters import rest_framework as filters
-from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.filters import OrderingFilter
 
-from authors.apps.articles.models import Article, Tag, ArticleRating, Comment, ArticleView, Violation, FavouriteArticle
+from authors.apps.articles.buffers import article_views
+from authors.apps.articles.models import (
+    Article, Tag, ArticleRating, ArticleDailyStats, Comment, Violation, FavouriteArticle,
+)
 from authors.apps.articles.serializers import (
     ArticleSerializer, TagSerializer, RatingSerializer, FavouriteSerializer, update, CommentSerializer,
     UpdateCommentSerializer, TagsSerializer, StatsSerializer, ViolationSerializer, ViolationListSerializer,
+    RatingSummarySerializer, StatsSeriesSerializer, ArticleSnippetSerializer,
 )
 from authors.apps.authentication.models import User
 from authors.apps.authentication.serializers import UserSerializer
@@ -27,11 +32,11 @@ from authors.apps.core.renderers import BaseJSONRenderer
 from authors.apps.articles.permissions import IsArticleOwnerOrReadOnly, IsNotArticleOwner
 from authors.apps.profiles.models import Profile
 from authors.apps.profiles.serializers import ProfileSerializer
-from .pagination import StandardResultsSetPagination
-from notifications.signals import notify
-from authors.apps.ah_notifications.notifications import Verbs
+from .search import ArticleSearchFilter, search_cache
+from .pagination import StandardResultsSetPagination, OptionalKeysetPagination, RequestedPagination
+from authors.apps.ah_notifications.notifications import Verbs, notify_coalesced, notify_user
 from authors.apps.core.mail_sender import send_email
-from rest_framework.exceptions import NotFound
+from rest_framework.exceptions import NotFound, ValidationError
 
 
 class ArticleAPIView(mixins.CreateModelMixin, mixins.UpdateModelMixin,
@@ -49,10 +54,10 @@ class ArticleAPIView(mixins.CreateModelMixin, mixins.UpdateModelMixin,
     queryset = Article.objects.all()
     renderer_names = ('article', 'articles')
     serializer_class = ArticleSerializer
-    pagination_class = StandardResultsSetPagination
+    pagination_class = OptionalKeysetPagination
 
     @staticmethod
-    def retrieve_owner_or_published(slug, user):
+    def retrieve_owner_or_published(slug, user, queryset=None):
         """
         Retrieve the article for a user,
         If the user is logged in:
@@ -62,18 +67,12 @@ class ArticleAPIView(mixins.CreateModelMixin, mixins.UpdateModelMixin,
             1. Return the article only if it is published
         :param slug:
         :param user:
+        :param queryset: the articles to retrieve from, e.g. annotated for serialization
         :return:
         """
-        article = Article.objects.filter(slug=slug)
-        if user and not isinstance(user, AnonymousUser):
-            mine = Article.objects.filter(slug=slug, author=user)
-            article = article.filter(published=True)
-
-            article = article.union(mine).first()
-        else:
-            # ensure the article is published
-            article = article.filter(published=True).first()
-        return article
+        if queryset is None:
+            queryset = Article.objects.all()
+        return queryset.visible_to(user).filter(slug=slug).first()
 
     def create(self, request, *args, **kwargs):
         """
@@ -139,14 +138,14 @@ class ArticleAPIView(mixins.CreateModelMixin, mixins.UpdateModelMixin,
         """
         slug = kwargs['slug']
 
-        article = self.retrieve_owner_or_published(slug, request.user)
+        article = self.retrieve_owner_or_published(slug, request.user, Article.objects.for_listing(request.user))
 
         if article is None:
             return Response({
                 'errors': 'Article does not exist'
             }, status.HTTP_404_NOT_FOUND)
         if request.user and not isinstance(request.user, AnonymousUser) and article.author != request.user:
-            ArticleView.objects.get_or_create(article=article, user=request.user)
+            article_views.record(article, request.user)
         serializer = self.serializer_class(
             article, context={'request': request})
 
@@ -161,13 +160,8 @@ class ArticleAPIView(mixins.CreateModelMixin, mixins.UpdateModelMixin,
         :return:
         """
 
-        articles = Article.objects.filter(published=True)
-
         # if the user is logged in, display both published and unpublished articles
-        if request.user and not isinstance(request.user, AnonymousUser):
-            mine = Article.objects.filter(author=request.user)
-
-            articles = articles.union(mine)
+        articles = Article.objects.for_listing(request.user).visible_to(request.user)
 
         # paginates a queryset(articles) if required
         page = self.paginate_queryset(articles)
@@ -369,17 +363,35 @@ class SearchFilterListAPIView(ListAPIView):
     permission_classes = (AllowAny,)
     renderer_classes = (BaseJSONRenderer,)
     renderer_names = ("article", "articles",)
-    queryset = Article.objects.all()
     pagination_class = StandardResultsSetPagination
 
-    filter_backends = (DjangoFilterBackend, SearchFilter, OrderingFilter)
+    filter_backends = (DjangoFilterBackend, ArticleSearchFilter, OrderingFilter)
     # filter fields are used to filter the articles using the tags, author's username and title
     filterset_class = ArticleFilter
-    # search fields search all articles' parameters for the searched character
+    # search the articles by relevance, see ArticleSearchFilter, the search fields are searched
+    # for the searched character with the contains search backend
     search_fields = ('tags__tag', 'author__username', 'title', 'body', 'description')
     # ordering fields are used to render search outputs in a particular order e.g asending or descending order
     ordering_fields = ('author__username', 'title')
 
+    def get_queryset(self):
+        return Article.objects.for_listing(self.request.user)
+
+    def filter_queryset(self, queryset):
+        # the ids of the articles found are cached, the articles of the page are read by id
+        return search_cache.results(super().filter_queryset(queryset), queryset, self.request)
+
+    def get_serializer_class(self):
+        # `snippets=true` returns a passage of the body around the searched words instead of the body
+        if self.request.query_params.get('snippets') == 'true':
+            return ArticleSnippetSerializer
+        return super().get_serializer_class()
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['search_words'] = ArticleSearchFilter().search_words(self.request)
+        return context
+
 
 class LikeAPIView(LikeDislikeMixin):
     """
@@ -484,11 +496,15 @@ class RatingAPIView(CreateAPIView, RetrieveUpdateDestroyAPIView):
                 serializer = self.serializer_class(rating, data=serializer_data, partial=True)
                 serializer.is_valid(raise_exception=True)
 
-                notify.send(rating_user, verb=Verbs.ARTICLE_RATING, recipient=rating_author,
-                            description="{} has rated your article {}/5".format(rating_user, rating))
-
                 serializer.save(rated_by=request.user, article=article)
 
+                # only a new rating, a user changing their rating is counted once
+                if rating is None:
+                    notify_coalesced(rating_user, rating_author, Verbs.ARTICLE_RATING, article,
+                                     "{name} has rated your article {rating}/5",
+                                     "{name} and {others} others have rated your article",
+                                     name=rating_user, rating=serializer.validated_data['rating'])
+
                 data = serializer.data
                 data['Message'] = "You have successfully rated this article"
                 return Response(data, status=status.HTTP_201_CREATED)
@@ -504,25 +520,12 @@ class RatingsAPIView(RetrieveAPIView):
 
     def retrieve(self, request, *args, **kwargs):
         try:
-            article = Article.objects.get(slug=kwargs['slug'])
+            article = Article.objects.select_related('rating_summary').get(slug=kwargs['slug'])
         except Article.DoesNotExist:
             data = {"errors": "This article does not exist!"}
             return Response(data, status=status.HTTP_404_NOT_FOUND)
 
-        avg_rating = ArticleRating.objects.filter(article=article).aggregate(
-            average_rating=models.Avg('rating'))['average_rating'] or 0
-        total_user_rated = ArticleRating.objects.filter(
-            article=article).count()
-
-        each_rating = Counter(
-            ArticleRating.objects.filter(article=article).values_list(
-                'rating', flat=True))
-
-        return Response({
-            'avg_rating': avg_rating,
-            'total_user': total_user_rated,
-            'each_rating': each_rating
-        }, status=status.HTTP_200_OK)
+        return Response(RatingSummarySerializer(article.ratings).data, status=status.HTTP_200_OK)
 
 
 class CommentUsersAPIView(ListAPIView):
@@ -547,7 +550,7 @@ class CommentAPIView(ListCreateAPIView):
     serializer_class = CommentSerializer
     permission_classes = (IsAuthenticatedOrReadOnly,)
     renderer_classes = (BaseJSONRenderer,)
-    pagination_class = StandardResultsSetPagination
+    pagination_class = OptionalKeysetPagination
     renderer_names = ('comment', 'comments')
     """This class get commit for specific article and create comment"""
 
@@ -584,7 +587,9 @@ class CommentCreateUpdateDestroy(CreateAPIView, RetrieveUpdateDestroyAPIView):
     permission_classes = (IsAuthenticatedOrReadOnly,)
     renderer_classes = (BaseJSONRenderer,)
     renderer_names = ['comment', 'comments']
-    pagination_class = StandardResultsSetPagination
+    pagination_class = OptionalKeysetPagination
+    # replies are listed in the order they were made
+    cursor_ordering = ('created_at', 'id')
     lookup_url_kwarg = "pk"
 
     def retrieve(self, request, *args, **kwargs):
@@ -647,8 +652,7 @@ class CommentCreateUpdateDestroy(CreateAPIView, RetrieveUpdateDestroyAPIView):
         mentions = request.data.get('mentions', [])
 
         for mention in mentions:
-            notify.send(request.user, verb=Verbs.COMMENT_MENTION,
-                        recipient=User.objects.get(username=mention),
+            notify_user(request.user, User.objects.get(username=mention), Verbs.COMMENT_MENTION,
                         target=article,
                         description="{} mentioned you in a comment".format(request.user.username))
 
@@ -706,15 +710,15 @@ class FavouritesAPIView(ListAPIView):
     permission_classes = (IsAuthenticated,)
     renderer_classes = (BaseJSONRenderer,)
     serializer_class = ArticleSerializer
-    pagination_class = StandardResultsSetPagination
+    pagination_class = OptionalKeysetPagination
     renderer_names = ['article', 'articles']
+    # favourites are listed from the most recently favourited
+    cursor_ordering = ('-favourited_at', '-id')
 
     def get_queryset(self):
-        articles = []
-        results = FavouriteArticle.objects.filter(user=self.request.user).select_related('article')
-        for result in results:
-            articles.append(result.article)
-        return articles
+        user = self.request.user
+        favourites = Article.objects.for_listing(user).filter(favourites__user=user)
+        return favourites.annotate(favourited_at=F('favourites__created_at')).order_by(*self.cursor_ordering)
 
 
 class FavouriteArticleApiView(APIView):
@@ -796,12 +800,12 @@ class LikeComments(UpdateAPIView):
             return Response({'Success, You no longer like this comment'},
                             status.HTTP_200_OK)
 
-        # notify the author
-        notify.send(request.user, recipient=comment.author.user, verb=Verbs.COMMENT_LIKE,
-                    description="{} liked your comment".format(request.user.username))
-
         # This add the user to likes lists
         comment.likes.add(user.id)
+
+        # notify the author of the new like
+        notify_coalesced(request.user, comment.author.user, Verbs.COMMENT_LIKE, comment, "{name} liked your comment",
+                         "{name} and {others} others liked your comment", name=request.user.username)
         message = {"Success": "You liked this comment"}
         return Response(message, status.HTTP_200_OK)
 
@@ -845,15 +849,98 @@ class DislikeComments(UpdateAPIView):
 
 
 class ArticleStatsView(ListAPIView):
-    """"""
+    """
+    The stats of the articles of the current user, read from the counters of the articles
+    in a single query. With ?days=N every article also has the per-day series of the last
+    N days, read from the daily stats.
+    The articles can be ordered by any metric e.g. ?ordering=-view_count, and are paginated
+    when a page is requested, in which case the totals across all the articles are included.
+    """
     permission_classes = (IsAuthenticated,)
     serializer_class = StatsSerializer
     renderer_classes = (BaseJSONRenderer,)
     renderer_names = ('stat', 'stats')
+    pagination_class = RequestedPagination
+    max_days = 366
+
+    # the orderings that can be requested mapped to the columns they order by
+    ordering_fields = {
+        'view_count': 'views_count',
+        'comment_count': 'comments_count',
+        'like_count': 'likes_count',
+        'dislike_count': 'dislikes_count',
+        'average_rating': 'rating_average',
+        'title': 'title',
+        'created_at': 'created_at',
+    }
+
+    def get_ordering(self):
+        """
+        Get the ordering requested with ?ordering=<field> or ?ordering=-<field>
+        :return: None when no ordering is requested
+        """
+        ordering = self.request.query_params.get('ordering')
+        if not ordering:
+            return None
+        field = self.ordering_fields.get(ordering.lstrip('-'))
+        if field is None:
+            raise ValidationError({'ordering': 'Articles can be ordered by {}.'.format(
+                ', '.join(self.ordering_fields))})
+        return '-' + field if ordering.startswith('-') else field
+
+    def get_days(self):
+        """
+        Get the number of days of the per-day series
+        :return: None when the series is not requested
+        """
+        days = self.request.query_params.get('days')
+        if days is None:
+            return None
+        try:
+            days = int(days)
+        except ValueError:
+            days = 0
+        if not 0 < days <= self.max_days:
+            raise ValidationError({'days': 'Days should be a number between 1 and {}.'.format(self.max_days)})
+        return days
 
-    def get_queryset(self):
+    def get_serializer_class(self):
+        return StatsSerializer if self.get_days() is None else StatsSeriesSerializer
+
+    def get_articles(self):
         return Article.objects.filter(author=self.request.user)
 
+    def get_queryset(self):
+        queryset = self.get_articles().select_related('rating_summary')
+        ordering = self.get_ordering()
+        if ordering is not None:
+            queryset = queryset.with_rating_average().order_by(ordering, '-id')
+        days = self.get_days()
+        if days is not None:
+            since = timezone.localdate() - timedelta(days=days - 1)
+            queryset = queryset.prefetch_related(Prefetch(
+                'daily_stats', ArticleDailyStats.objects.filter(day__gte=since), to_attr='recent_daily_stats'))
+        return queryset
+
+    def get_totals(self):
+        """
+        Aggregate the stats across all the articles of the user in one query
+        :return:
+        """
+        articles = self.get_articles()
+        totals = articles.aggregate(
+            articles=Count('id'), view_count=Sum('views_count'), comment_count=Sum('comments_count'),
+            like_count=Sum('likes_count'), dislike_count=Sum('dislikes_count'), **articles.rating_totals())
+        weighted, total = totals.pop('rating_weighted'), totals.pop('rating_total')
+        totals = {key: value or 0 for key, value in totals.items()}
+        totals['average_rating'] = weighted / total if total else 0.0
+        return totals
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        response.data['totals'] = self.get_totals()
+        return response
+
 
 class ViolationTypesAPIView(APIView):
     renderer_classes = (BaseJSONRenderer,)
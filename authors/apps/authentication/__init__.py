@@ -0,0 +1,13 @@
+from django.apps import AppConfig
+
+
+class AuthenticationAppConfig(AppConfig):
+    name = 'authors.apps.authentication'
+    label = 'authentication'
+    verbose_name = 'Authentication'
+
+    def ready(self):
+        import authors.apps.authentication.signals  # NOQA
+
+
+default_app_config = 'authors.apps.authentication.AuthenticationAppConfig'
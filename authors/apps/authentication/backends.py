@@ -1,10 +1,11 @@
-import jwt
-
 from django.conf import settings
-
+from django.core import signing
 from rest_framework import authentication, exceptions
 
-from .models import User, BlacklistedToken
+from .blacklist import token_blacklist
+from .models import BlacklistedToken, User
+from .token_cache import token_cache
+from .user_cache import user_cache
 
 class JWTAuthentication(authentication.BaseAuthentication): # NOQA
     """ JWTAuthenticattion implement authentication
@@ -37,10 +38,11 @@ class JWTAuthentication(authentication.BaseAuthentication): # NOQA
         successful, return the user and token. If not, throw an error.
         """
 
-        if BlacklistedToken.objects.filter(token=token).first():
+        token_hash = BlacklistedToken.hash_token(token)
+        if token_blacklist.contains(token_hash):
                 raise exceptions.AuthenticationFailed('Token is blacklisted')
         try:
-            payload = jwt.decode(token, settings.SECRET_KEY)
+            payload = token_cache.decode(token, token_hash)
         except Exception as e:
             if e.__class__.__name__ == 'DecodeError':
                 raise exceptions.AuthenticationFailed('Cannot decode token')
@@ -50,10 +52,56 @@ class JWTAuthentication(authentication.BaseAuthentication): # NOQA
                 raise exceptions.AuthenticationFailed(str(e))
 
         try:
-            user = User.objects.get(pk=payload['id'])
+            user = user_cache.get(payload['id'])
         except User.DoesNotExist:
             raise exceptions.AuthenticationFailed('No user Found')
         if not user.is_active:
             raise exceptions.AuthenticationFailed('User has been deactivated')
 
         return user, token
+
+
+class StreamTokenAuthentication(authentication.BaseAuthentication):
+    """
+    Authenticates the requests of a browser EventSource, which cannot send the Authorization
+    header, with a short-lived token in the `token` query parameter. The token is issued to a
+    request authenticated with a JWT and is only valid for NOTIFICATIONS_STREAM['TOKEN_TTL']
+    seconds and while that JWT is not blacklisted.
+    """
+    salt = 'authors.stream-token'
+
+    @classmethod
+    def issue(cls, user, token):
+        """
+        :param user:
+        :param token: the JWT of the request the stream token is issued to
+        :return: the stream token
+        """
+        return signing.dumps({'id': user.pk, 'auth': BlacklistedToken.hash_token(token)}, salt=cls.salt)
+
+    def authenticate(self, request):
+        token = request.query_params.get('token')
+        if not token:
+            return None
+        payload = self.decode(token)
+        if token_blacklist.contains(payload['auth']):
+            raise exceptions.AuthenticationFailed('Token is blacklisted')
+        return self.get_user(payload['id']), token
+
+    def decode(self, token):
+        try:
+            return signing.loads(token, salt=self.salt, max_age=settings.NOTIFICATIONS_STREAM['TOKEN_TTL'])
+        except signing.SignatureExpired:
+            raise exceptions.AuthenticationFailed('Token has expired')
+        except signing.BadSignature:
+            raise exceptions.AuthenticationFailed('Cannot decode token')
+
+    @staticmethod
+    def get_user(user_id):
+        try:
+            user = user_cache.get(user_id)
+        except User.DoesNotExist:
+            raise exceptions.AuthenticationFailed('No user Found')
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed('User has been deactivated')
+        return user
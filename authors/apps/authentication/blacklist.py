@@ -0,0 +1,120 @@
+import math
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import BlacklistedToken
+from .token_cache import token_cache
+
+
+class BloomFilter:
+    """
+    A set of strings that can tell for sure that a string was not added, and may be wrong
+    about strings that were, at the error rate it is sized for.
+    """
+
+    def __init__(self, capacity, error_rate):
+        """
+        :param capacity: the number of strings it is sized for
+        :param error_rate: the chance of a string that was not added being reported as added
+        """
+        self.size = max(int(-capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self.hashes = max(int(round(self.size / capacity * math.log(2))), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def positions(self, digest):
+        """
+        The bits of a hex digest, derived from its two halves by double hashing
+        """
+        first, second = int(digest[:16], 16), int(digest[16:32], 16) | 1
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, digest):
+        for position in self.positions(digest):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, digest):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self.positions(digest))
+
+
+class TokenBlacklist:
+    """
+    The blacklisted tokens of the process, in a Bloom filter of their hashes so that the tokens
+    that are not blacklisted, the tokens of almost every request, are checked without a query.
+    The filter is refreshed incrementally with the tokens blacklisted by other processes every
+    REFRESH_INTERVAL seconds, and rebuilt every REBUILD_INTERVAL seconds without the expired tokens.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.bloom = None
+        self.refreshed_at = self.rebuilt_at = None
+
+    @property
+    def config(self):
+        return settings.TOKEN_BLACKLIST
+
+    def blacklist(self, token):
+        """
+        Blacklist the token
+        :return: whether the token was not blacklisted already
+        """
+        token_hash = BlacklistedToken.hash_token(token)
+        _, created = BlacklistedToken.objects.get_or_create(
+            token_hash=token_hash, defaults={'expires_at': BlacklistedToken.token_expiry(token)})
+        with self.lock:
+            if self.bloom is not None:
+                self.bloom.add(token_hash)
+        token_cache.discard(token_hash)
+        return created
+
+    def is_blacklisted(self, token):
+        return self.contains(BlacklistedToken.hash_token(token))
+
+    def contains(self, token_hash):
+        """
+        :return: whether the token with the hash is blacklisted
+        """
+        return self.might_contain(token_hash) and BlacklistedToken.objects.filter(token_hash=token_hash).exists()
+
+    def might_contain(self, token_hash):
+        """
+        :return: False if the token hash is surely not blacklisted
+        """
+        now = time.monotonic()
+        with self.lock:
+            if self.bloom is None or now - self.rebuilt_at >= self.config['REBUILD_INTERVAL']:
+                self.rebuild(now)
+            elif now - self.refreshed_at >= self.config['REFRESH_INTERVAL']:
+                self.refresh(now)
+            return token_hash in self.bloom
+
+    def rebuild(self, now):
+        self.bloom = BloomFilter(self.config['CAPACITY'], self.config['ERROR_RATE'])
+        self.load(BlacklistedToken.objects.filter(Q(expires_at=None) | Q(expires_at__gt=timezone.now())))
+        self.refreshed_at = self.rebuilt_at = now
+
+    def refresh(self, now):
+        # the tokens saved since the last refresh, with a margin for the transactions that
+        # saved a token before the last refresh but committed it after
+        since = timezone.now() - timedelta(seconds=now - self.refreshed_at + self.config['REFRESH_MARGIN'])
+        self.load(BlacklistedToken.objects.filter(timestamp__gte=since))
+        self.refreshed_at = now
+
+    def load(self, tokens):
+        for token_hash in tokens.values_list('token_hash', flat=True).iterator():
+            self.bloom.add(token_hash)
+
+    def clear(self):
+        """
+        Drop the filter, it is rebuilt on the next check
+        """
+        with self.lock:
+            self.bloom = None
+
+
+token_blacklist = TokenBlacklist()
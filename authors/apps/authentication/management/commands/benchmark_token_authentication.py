@@ -0,0 +1,46 @@
+import time
+from datetime import datetime, timedelta
+
+import jwt
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from authors.apps.authentication.models import BlacklistedToken
+from authors.apps.authentication.token_cache import TokenCache
+
+
+class Command(BaseCommand):
+    help = 'Measures the cost per request of verifying the tokens of the requests, with jwt.decode on every ' \
+           'request and with the payloads of the verified tokens cached.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=100000,
+                            help='The number of requests to authenticate. Defaults to 100000.')
+        parser.add_argument('--tokens', type=int, default=100,
+                            help='The number of distinct tokens the requests use in turn. Defaults to 100.')
+
+    def handle(self, *args, **options):
+        expiry = datetime.utcnow() + timedelta(hours=1)
+        tokens = [jwt.encode({'id': i, 'email': 'user{}@example.com'.format(i), 'iat': datetime.utcnow(),
+                              'exp': expiry}, settings.SECRET_KEY, algorithm='HS256').decode()
+                  for i in range(options['tokens'])]
+        requests = [tokens[i % len(tokens)] for i in range(options['requests'])]
+
+        decoding = self.measure(requests, lambda token: jwt.decode(token, settings.SECRET_KEY))
+        cache = TokenCache()
+        caching = self.measure(requests, lambda token: cache.decode(token, BlacklistedToken.hash_token(token)))
+
+        self.stdout.write('Authenticated {} request(s) with {} token(s).'.format(len(requests), len(tokens)))
+        self.stdout.write('  jwt.decode:   {:8.2f} us per request'.format(decoding))
+        self.stdout.write('  token cache:  {:8.2f} us per request, hashing included'.format(caching))
+        self.stdout.write(self.style.SUCCESS('  {:.1f}x faster'.format(decoding / caching if caching else 0)))
+
+    @staticmethod
+    def measure(requests, decode):
+        """
+        :return: the average microseconds spent decoding the token of a request
+        """
+        started = time.perf_counter()
+        for token in requests:
+            decode(token)
+        return (time.perf_counter() - started) / len(requests) * 1e6 if requests else 0
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from authors.apps.authentication.blacklist import token_blacklist
+from authors.apps.authentication.models import BlacklistedToken
+
+
+class Command(BaseCommand):
+    help = 'Deletes the blacklisted tokens that have expired, they are rejected for their expiry anyway.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='The number of tokens deleted at a time. Defaults to 1000.')
+
+    def handle(self, *args, **options):
+        expired = BlacklistedToken.objects.filter(expires_at__lt=timezone.now())
+        pruned = 0
+        while True:
+            batch = list(expired.values_list('pk', flat=True)[:options['batch_size']])
+            if not batch:
+                break
+            pruned += BlacklistedToken.objects.filter(pk__in=batch).delete()[0]
+
+        token_blacklist.clear()
+        self.stdout.write(self.style.SUCCESS('Pruned {} expired blacklisted token(s).'.format(pruned)))
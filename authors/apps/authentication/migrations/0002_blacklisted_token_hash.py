@@ -0,0 +1,64 @@
+# Generated by Django 2.1.2 on 2026-10-17 01:05
+
+import hashlib
+from datetime import datetime
+
+import jwt
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def hash_blacklisted_tokens(apps, schema_editor):
+    """
+    Replace the blacklisted tokens with their hashes, dropping the duplicates
+    """
+    BlacklistedToken = apps.get_model('authentication', 'BlacklistedToken')
+    seen = set()
+    for blacklisted in BlacklistedToken.objects.order_by('pk').iterator():
+        token_hash = hashlib.sha256(blacklisted.token.encode()).hexdigest()
+        if token_hash in seen:
+            blacklisted.delete()
+            continue
+        seen.add(token_hash)
+        try:
+            expiry = jwt.decode(blacklisted.token, verify=False).get('exp')
+        except jwt.InvalidTokenError:
+            expiry = None
+        blacklisted.token_hash = token_hash
+        blacklisted.expires_at = datetime.fromtimestamp(expiry, tz=timezone.utc) if expiry else None
+        blacklisted.save(update_fields=['token_hash', 'expires_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blacklistedtoken',
+            name='token_hash',
+            field=models.CharField(max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='blacklistedtoken',
+            name='expires_at',
+            field=models.DateTimeField(db_index=True, null=True),
+        ),
+        migrations.RunPython(hash_blacklisted_tokens, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='blacklistedtoken',
+            name='token',
+        ),
+        migrations.AlterField(
+            model_name='blacklistedtoken',
+            name='token_hash',
+            field=models.CharField(max_length=64, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='blacklistedtoken',
+            name='timestamp',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
@@ -1,11 +1,13 @@
 from django.contrib.auth.models import (
     AbstractBaseUser, BaseUserManager, PermissionsMixin
 )
+import hashlib
 import jwt
 import os
 from datetime import datetime, timedelta
 from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
 
 class UserManager(BaseUserManager):
@@ -100,6 +102,22 @@ class User(AbstractBaseUser, PermissionsMixin):
     # objects of this type.
     objects = UserManager()
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Keep the username the user was loaded with, to tell whether saving the user changes it
+        """
+        user = super().from_db(db, field_names, values)
+        # None if the username was deferred, it is unknown then
+        user.loaded_username = user.__dict__.get('username')
+        return user
+
+    def username_changed(self):
+        """
+        :return: whether the username is not the one the user was loaded or last saved with
+        """
+        return getattr(self, 'loaded_username', None) != self.username
+
     def __str__(self):
         """
         Returns a string representation of this `User`.
@@ -145,7 +163,28 @@ class User(AbstractBaseUser, PermissionsMixin):
 
 
 class BlacklistedToken(models.Model):
-    """this class stores blacklisted token"""
+    """
+    this class stores blacklisted token. Only the SHA-256 hash of the token is
+    stored, with the time the token expires at, after which it can be pruned.
+    Blacklist and check the tokens with `token_blacklist`, which rarely needs a query.
+    """
+
+    token_hash = models.CharField(max_length=64, unique=True)
+    # when the token expires, None if it does not
+    expires_at = models.DateTimeField(null=True, db_index=True)
+    timestamp = models.DateTimeField(auto_now=True, db_index=True)
 
-    token = models.CharField(max_length=500)
-    timestamp = models.DateTimeField(auto_now=True)
+    @staticmethod
+    def hash_token(token):
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    @staticmethod
+    def token_expiry(token):
+        """
+        :return: the expiry of the token, None if it has none or cannot be read
+        """
+        try:
+            expiry = jwt.decode(token, verify=False).get('exp')
+        except jwt.InvalidTokenError:
+            return None
+        return datetime.fromtimestamp(expiry, tz=timezone.utc) if expiry else None
@@ -4,7 +4,8 @@ from django.contrib.auth import authenticate
 from django.contrib.auth.tokens import default_token_generator
 from rest_framework import serializers
 
-from .models import User, BlacklistedToken
+from .blacklist import token_blacklist
+from .models import User
 from authors.apps.profiles.models import Profile
 
 email_expression = re.compile(
@@ -243,8 +244,12 @@ class UserSerializer(serializers.ModelSerializer):
 
         # Finally, after everything has been updated, we must explicitly save
         # the model. It's worth pointing out that `.set_password()` does not
-        # save the model.
-        instance.save()
+        # save the model. Only the updated fields are saved, the instance is the
+        # authenticated user, whose other fields may be stale.
+        update_fields = list(validated_data) + ['updated_at']
+        if password is not None:
+            update_fields.append('password')
+        instance.save(update_fields=update_fields)
 
         return instance
 
@@ -300,11 +305,10 @@ class SocialSignUpSerializer(serializers.Serializer):
     access_token = serializers.CharField(max_length=255, required=True)
 
 
-class LogoutSerializer(serializers.ModelSerializer):
+class LogoutSerializer(serializers.Serializer):
     """Performs logout serializer"""
     token = serializers.CharField(max_length=500)
 
-
-    class Meta:
-        model = BlacklistedToken
-        fields = "__all__"
+    def create(self, validated_data):
+        token_blacklist.blacklist(validated_data['token'])
+        return validated_data
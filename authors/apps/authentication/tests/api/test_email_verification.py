@@ -1,3 +1,6 @@
+from io import StringIO
+
+from django.core.management import call_command
 from django.utils.encoding import force_bytes
 from django.utils.http import urlsafe_base64_encode
 from rest_framework import status
@@ -26,6 +29,9 @@ class TestEmailVerification(AuthenticationTestCase):
         return response
 
     def test_sends_email(self):
+        # the email is queued by the request and delivered by the worker
+        self.assertEqual(len(mail.outbox), 0)
+        call_command('send_queued_emails', stdout=StringIO())
         self.assertEqual(len(mail.outbox), 1)
         self.assertEqual(mail.outbox[0].subject, "Activate your Binary Jungle account.")
 
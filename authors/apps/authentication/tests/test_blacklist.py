@@ -0,0 +1,96 @@
+import uuid
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.six import StringIO
+from rest_framework import status
+from rest_framework.reverse import reverse
+
+from authors.apps.authentication.blacklist import BloomFilter, token_blacklist
+from authors.apps.authentication.models import BlacklistedToken
+from authors.apps.authentication.tests.api.test_auth import AuthenticatedTestCase
+
+
+class BloomFilterTest(SimpleTestCase):
+
+    def test_added_digests_are_contained(self):
+        """
+        Ensure the filter never misses a digest that was added, and rarely reports one that was not
+        """
+        bloom = BloomFilter(1000, 0.01)
+        added = [BlacklistedToken.hash_token(str(uuid.uuid4())) for _ in range(1000)]
+        for digest in added:
+            bloom.add(digest)
+
+        self.assertTrue(all(digest in bloom for digest in added))
+        false_positives = sum(BlacklistedToken.hash_token(str(uuid.uuid4())) in bloom for _ in range(1000))
+        self.assertLess(false_positives, 50)
+
+
+class TokenBlacklistTest(AuthenticatedTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.token = self.get_current_user().token
+        token_blacklist.clear()
+
+    def test_tokens_that_are_not_blacklisted_are_checked_without_queries(self):
+        """
+        Ensure the filter answers that a token is not blacklisted without a query once it is built
+        """
+        token_blacklist.blacklist(self.get_current_user().token + "other")
+        self.assertFalse(token_blacklist.is_blacklisted(self.token))
+
+        with CaptureQueriesContext(connection) as context:
+            self.assertFalse(token_blacklist.is_blacklisted(self.token))
+        self.assertEqual(len(context.captured_queries), 0)
+
+    def test_blacklisted_tokens_are_stored_hashed_with_their_expiry(self):
+        """
+        Ensure only the hash of a blacklisted token is stored, with the expiry of the token
+        """
+        self.assertTrue(token_blacklist.blacklist(self.token))
+        self.assertFalse(token_blacklist.blacklist(self.token))
+
+        blacklisted = BlacklistedToken.objects.get()
+        self.assertEqual(blacklisted.token_hash, BlacklistedToken.hash_token(self.token))
+        self.assertGreater(blacklisted.expires_at, timezone.now())
+        self.assertTrue(token_blacklist.is_blacklisted(self.token))
+
+    def test_tokens_blacklisted_by_other_processes_are_picked_up(self):
+        """
+        Ensure the filter refreshes with the tokens blacklisted since it was built
+        """
+        self.assertFalse(token_blacklist.is_blacklisted(self.token))
+        BlacklistedToken.objects.create(token_hash=BlacklistedToken.hash_token(self.token))
+        token_blacklist.refreshed_at -= token_blacklist.config['REFRESH_INTERVAL']
+
+        self.assertTrue(token_blacklist.is_blacklisted(self.token))
+
+    def test_logged_out_token_is_rejected(self):
+        """
+        Ensure a token cannot be used once its user has logged out with it
+        """
+        response = self.client.delete(reverse("authentication:logout"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.get(reverse("authentication:user-retrieve-update"))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_prune_deletes_expired_tokens(self):
+        """
+        Ensure only the blacklisted tokens that have expired are pruned
+        """
+        token_blacklist.blacklist(self.token)
+        BlacklistedToken.objects.create(token_hash="expired", expires_at=timezone.now() - timedelta(minutes=1))
+
+        out = StringIO()
+        call_command('prune_blacklisted_tokens', stdout=out)
+
+        self.assertIn('Pruned 1 expired blacklisted token(s).', out.getvalue())
+        self.assertEqual(list(BlacklistedToken.objects.values_list('token_hash', flat=True)),
+                         [BlacklistedToken.hash_token(self.token)])
@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta
+from unittest import mock
+
+import jwt
+from django.conf import settings
+from django.test import SimpleTestCase, override_settings
+from rest_framework import status
+from rest_framework.reverse import reverse
+
+from authors.apps.authentication.blacklist import token_blacklist
+from authors.apps.authentication.models import BlacklistedToken
+from authors.apps.authentication.tests.api.test_auth import AuthenticatedTestCase
+from authors.apps.authentication.token_cache import TokenCache, token_cache
+
+
+def make_token(user_id=1, expiry=timedelta(hours=1)):
+    return jwt.encode({'id': user_id, 'exp': datetime.utcnow() + expiry}, settings.SECRET_KEY,
+                      algorithm='HS256').decode()
+
+
+class TokenCacheTest(SimpleTestCase):
+
+    def setUp(self):
+        self.cache = TokenCache()
+
+    def decode(self, token):
+        return self.cache.decode(token, BlacklistedToken.hash_token(token))
+
+    def test_verified_tokens_are_not_verified_again(self):
+        """
+        Ensure a token is only verified the first time it is used
+        """
+        token = make_token()
+        self.assertEqual(self.decode(token)['id'], 1)
+        with mock.patch('jwt.decode') as decode:
+            self.assertEqual(self.decode(token)['id'], 1)
+        decode.assert_not_called()
+
+    def test_expired_tokens_are_evicted(self):
+        """
+        Ensure a cached token is rejected once it expires
+        """
+        token = make_token(expiry=timedelta(seconds=-10))
+        token_hash = BlacklistedToken.hash_token(token)
+        self.cache.store(token_hash, jwt.decode(token, verify=False))
+
+        with self.assertRaises(jwt.ExpiredSignatureError):
+            self.decode(token)
+        self.assertNotIn(token_hash, self.cache.payloads)
+
+    def test_invalid_tokens_are_not_cached(self):
+        """
+        Ensure a token that fails verification is not cached
+        """
+        with self.assertRaises(jwt.DecodeError):
+            self.decode(make_token() + "tampered")
+        self.assertEqual(len(self.cache.payloads), 0)
+
+    @override_settings(TOKEN_CACHE={'MAX_SIZE': 2})
+    def test_least_recently_used_tokens_are_evicted(self):
+        """
+        Ensure the cache holds at most MAX_SIZE tokens, dropping the least recently used
+        """
+        first, second, third = make_token(1), make_token(2), make_token(3)
+        self.decode(first)
+        self.decode(second)
+        self.decode(first)
+        self.decode(third)
+
+        self.assertEqual(set(self.cache.payloads),
+                         {BlacklistedToken.hash_token(first), BlacklistedToken.hash_token(third)})
+
+
+class BlacklistedTokenCacheTest(AuthenticatedTestCase):
+
+    def test_blacklisted_tokens_are_flushed(self):
+        """
+        Ensure blacklisting a token drops it from the cache and the token is rejected
+        """
+        token = self.get_current_user().token
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + token)
+        response = self.client.get(reverse("authentication:user-retrieve-update"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        token_hash = BlacklistedToken.hash_token(token)
+        self.assertIn(token_hash, token_cache.payloads)
+
+        token_blacklist.blacklist(token)
+        self.assertNotIn(token_hash, token_cache.payloads)
+        response = self.client.get(reverse("authentication:user-retrieve-update"))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
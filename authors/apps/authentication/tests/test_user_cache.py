@@ -0,0 +1,112 @@
+from unittest import mock
+
+from django.core.cache import caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.reverse import reverse
+
+from authors.apps.authentication.models import User
+from authors.apps.authentication.tests.api.test_auth import AuthenticatedTestCase
+from authors.apps.core.cache import shared_cache
+from authors.apps.authentication.user_cache import user_cache
+
+
+class AuthenticatedUserCacheTest(AuthenticatedTestCase):
+
+    def setUp(self):
+        super().setUp()
+        user_cache.clear()
+        # the local memory cache of the tests stands in for memcached, the tests run in one process
+        patcher = mock.patch('authors.apps.authentication.user_cache.shared_cache', caches.__getitem__)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get_user(self):
+        return self.client.get(reverse("authentication:user-retrieve-update"))
+
+    def test_authenticated_requests_do_not_query_the_user(self):
+        """
+        Ensure the user and their profile are not queried again once they are cached
+        """
+        self.get_user()
+        with CaptureQueriesContext(connection) as context:
+            response = self.get_user()
+            cached = user_cache.get(self.get_current_user().pk)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # only get_current_user queries
+        self.assertEqual(len(context.captured_queries), 1)
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(cached.profile.user_id, cached.pk)
+        self.assertEqual(len(context.captured_queries), 0)
+
+    def test_saved_users_are_reloaded(self):
+        """
+        Ensure a change to the user is seen by the next request
+        """
+        self.get_user()
+        user = self.get_current_user()
+        user.is_active = False
+        user.save()
+
+        response = self.get_user()
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_saved_profiles_are_reloaded(self):
+        """
+        Ensure a change to the profile is seen by the next request
+        """
+        user = self.get_current_user()
+        user_cache.get(user.pk)
+        user.profile.bio = "A new bio"
+        user.profile.save()
+
+        self.assertEqual(user_cache.get(user.pk).profile.bio, "A new bio")
+
+    def test_cached_users_are_copies(self):
+        """
+        Ensure a request changing its user does not change the cached user
+        """
+        user = user_cache.get(self.get_current_user().pk)
+        user.username = "changed"
+
+        self.assertNotEqual(user_cache.get(user.pk).username, "changed")
+
+    def test_logout_invalidates_the_cached_user(self):
+        """
+        Ensure logging out drops the cached user
+        """
+        user = self.get_current_user()
+        self.get_user()
+        self.client.delete(reverse("authentication:logout"))
+
+        with CaptureQueriesContext(connection) as context:
+            user_cache.get(user.pk)
+        self.assertEqual(len(context.captured_queries), 1)
+
+    def test_users_are_not_cached_without_a_shared_cache(self):
+        """
+        Ensure the users are read from the database when the cache is not memcached or Redis,
+        the version stamps would not be shared by the processes
+        """
+        with mock.patch('authors.apps.authentication.user_cache.shared_cache', shared_cache):
+            user = self.get_current_user()
+            user_cache.get(user.pk)
+            User.objects.filter(pk=user.pk).update(username="changed")
+
+            with CaptureQueriesContext(connection) as context:
+                self.assertEqual(user_cache.get(user.pk).username, "changed")
+            self.assertEqual(len(context.captured_queries), 1)
+
+    def test_subscribing_does_not_overwrite_the_user(self):
+        """
+        Ensure subscribing with a cached user only saves the subscription
+        """
+        self.get_user()
+        user = self.get_current_user()
+        # a change the cached user does not have, not bumping its version
+        User.objects.filter(pk=user.pk).update(is_verified=False)
+        self.client.delete(reverse("notifications:subscribe"))
+
+        user.refresh_from_db()
+        self.assertEqual((user.is_subscribed, user.is_verified), (False, False))
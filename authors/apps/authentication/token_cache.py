@@ -0,0 +1,60 @@
+import threading
+import time
+from collections import OrderedDict
+
+import jwt
+from django.conf import settings
+
+
+class TokenCache:
+    """
+    The payloads of the tokens the process has verified, by the hash of the token, so that a
+    token that is used again is not verified again. An entry is evicted when its token expires,
+    the least recently used when MAX_SIZE tokens are cached, and when its token is blacklisted.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.payloads = OrderedDict()
+
+    @property
+    def config(self):
+        return settings.TOKEN_CACHE
+
+    def decode(self, token, token_hash):
+        """
+        Verify and decode the token
+        :param token:
+        :param token_hash: the hash of the token, as BlacklistedToken.hash_token
+        :return: the payload of the token
+        :raise jwt.InvalidTokenError:
+        """
+        with self.lock:
+            entry = self.payloads.get(token_hash)
+            if entry is not None:
+                if entry[0] > time.time():
+                    self.payloads.move_to_end(token_hash)
+                    return dict(entry[1])
+                del self.payloads[token_hash]
+
+        payload = jwt.decode(token, settings.SECRET_KEY)
+        if 'exp' in payload:
+            self.store(token_hash, payload)
+        return payload
+
+    def store(self, token_hash, payload):
+        with self.lock:
+            self.payloads[token_hash] = (payload['exp'], dict(payload))
+            while len(self.payloads) > self.config['MAX_SIZE']:
+                self.payloads.popitem(last=False)
+
+    def discard(self, token_hash):
+        with self.lock:
+            self.payloads.pop(token_hash, None)
+
+    def clear(self):
+        with self.lock:
+            self.payloads.clear()
+
+
+token_cache = TokenCache()
@@ -0,0 +1,93 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from authors.apps.core.cache import shared_cache
+
+from .models import User
+
+
+class AuthenticatedUserCache:
+    """
+    The users of the authenticated requests, with their profile, kept by the process for
+    TTL seconds so that authenticating a request does not query them.
+    Each user has a version stamp in the Django cache that is bumped whenever the user or
+    their profile is saved, and on logout. A cached user is only used while its version is
+    current, so a change is seen by every process at once. The users are only cached when the
+    cache is memcached or Redis, see `shared_cache`.
+    The users are stored pickled, so that each request gets its own copy.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.users = OrderedDict()
+
+    @property
+    def config(self):
+        return settings.AUTH_USER_CACHE
+
+    @property
+    def versions(self):
+        """
+        :return: the cache of the version stamps, None if it is not a shared cache
+        """
+        return shared_cache(self.config['CACHE'])
+
+    @staticmethod
+    def version_key(user_id):
+        return 'auth-user-version:{}'.format(user_id)
+
+    def get(self, user_id):
+        """
+        Get the user with their profile
+        :param user_id:
+        :return: User
+        :raise User.DoesNotExist:
+        """
+        versions = self.versions
+        if versions is None:
+            return User.objects.select_related('profile').get(pk=user_id)
+
+        version = versions.get(self.version_key(user_id), 0)
+        with self.lock:
+            entry = self.users.get(user_id)
+        if entry is not None and entry[0] > time.monotonic() and entry[1] == version:
+            return pickle.loads(entry[2])
+
+        user = User.objects.select_related('profile').get(pk=user_id)
+        self.store(user_id, version, user)
+        return user
+
+    def store(self, user_id, version, user):
+        entry = (time.monotonic() + self.config['TTL'], version, pickle.dumps(user))
+        with self.lock:
+            self.users.pop(user_id, None)
+            self.users[user_id] = entry
+            while len(self.users) > self.config['MAX_SIZE']:
+                self.users.popitem(last=False)
+
+    def bump(self, user_id):
+        """
+        Invalidate the cached copies of the user in every process that shares the cache
+        """
+        versions = self.versions
+        if versions is not None:
+            key = self.version_key(user_id)
+            versions.add(key, 0, timeout=None)
+            try:
+                versions.incr(key)
+            except ValueError:
+                # evicted in the meantime
+                versions.set(key, 1, timeout=None)
+        with self.lock:
+            self.users.pop(user_id, None)
+
+    def clear(self):
+        with self.lock:
+            self.users.clear()
+
+
+user_cache = AuthenticatedUserCache()
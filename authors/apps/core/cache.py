@@ -0,0 +1,16 @@
+from django.core.cache import caches
+from django.core.cache.backends.memcached import BaseMemcachedCache
+
+
+def shared_cache(alias):
+    """
+    Get a cache that every process sees the changes of, for the version stamps of the data the
+    processes keep themselves. Only memcached and Redis are, the database cache would cost as
+    many queries as it saves.
+    :param alias: the name of the cache in CACHES
+    :return: the cache, None if it is not a memcached or Redis cache
+    """
+    cache = caches[alias]
+    if isinstance(cache, BaseMemcachedCache) or 'redis' in type(cache).__module__:
+        return cache
+    return None
@@ -0,0 +1,58 @@
+import re
+from functools import lru_cache
+from uuid import uuid4
+
+from django.template.loader import render_to_string
+from django.utils.html import conditional_escape, strip_tags
+
+
+class EmailTemplate:
+    """
+    An email template compiled for a set of variables. The template is rendered, its css
+    inlined and its plain text version stripped once, with a marker in place of each
+    variable, so that rendering the email for a recipient only joins strings.
+    The variables of an email template must only be output, not used in tags or filters.
+    """
+    # unique to the process so that it cannot clash with the content of a template
+    MARKER = 'email-variable-{}-'.format(uuid4().hex)
+    VARIABLE = re.compile('{0}(\\w+){0}'.format(re.escape(MARKER)))
+
+    def __init__(self, name, variables):
+        self.name = name
+        html = render_to_string(name, {variable: self.MARKER + variable + self.MARKER for variable in variables})
+        # the parts alternate between literal content and variable names
+        self.html_parts = self.VARIABLE.split(html)
+        self.text_parts = self.VARIABLE.split(strip_tags(html))
+
+    @staticmethod
+    def fill(parts, data, convert):
+        return ''.join(part if i % 2 == 0 else convert(data[part]) for i, part in enumerate(parts))
+
+    def render(self, data):
+        """
+        Render the email for the values of the variables
+        :param data: the value of every variable the template was compiled for
+        :return: (html, text)
+        """
+        return self.fill(self.html_parts, data, conditional_escape), self.fill(self.text_parts, data, str)
+
+
+@lru_cache(maxsize=None)
+def get_email_template(name, variables):
+    """
+    Get the email template compiled for the variables, compiling it on first use only.
+    :param name: the template name
+    :param variables: a sorted tuple of the variable names
+    :return: EmailTemplate
+    """
+    return EmailTemplate(name, variables)
+
+
+def render_email(name, data):
+    """
+    Render an email template with its html and plain text versions
+    :param name: the template name
+    :param data: a dictionary of the variables of the template
+    :return: (html, text)
+    """
+    return get_email_template(name, tuple(sorted(data))).render(data)
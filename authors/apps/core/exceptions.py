@@ -38,3 +38,16 @@ def _handle_generic_error(exc, context, response):
 class ProfileDoesNotExist(APIException):
     status_code = 400
     default_detail = 'The requested profile was not found.'
+
+
+class ServiceUnavailable(APIException):
+    """
+    The server is too busy to serve the request, the response tells the client to retry after `wait` seconds
+    """
+    status_code = 503
+    default_detail = 'The service is busy, retry later.'
+    default_code = 'service_unavailable'
+
+    def __init__(self, wait, detail=None):
+        super().__init__(detail)
+        self.wait = wait
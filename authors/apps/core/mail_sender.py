@@ -1,32 +1,95 @@
 import os
-from django.template.loader import render_to_string
+from itertools import islice
+
 from django.core.mail import EmailMultiAlternatives
 from django.utils.html import strip_tags
 
+from authors.apps.core.email_templates import render_email
+from authors.apps.core.models import OutboxEmail
+
+
+def build_email(subject, html_content, to_email, from_email=None, text_content=None):
+    """
+    Build an outbox email from its html content. Unless it is given, the plain text version
+    is the html without the tags, so people can see the pure text at least.
+    :param subject:
+    :param html_content:
+    :param to_email:
+    :param from_email: defaults to the EMAIL_HOST_SENDER
+    :param text_content:
+    :return: the unsaved OutboxEmail
+    """
+    if text_content is None:
+        text_content = strip_tags(html_content)
+    return OutboxEmail(subject=subject, body=text_content, html=html_content, to_email=to_email,
+                       from_email=from_email or os.getenv("EMAIL_HOST_SENDER"))
+
+
+def build_template_email(**kwargs):
+    """
+    Build an outbox email by rendering a template. Takes the same arguments as send_email.
+    The template is compiled once per process, see `EmailTemplate`.
+    :param kwargs:
+    :return: the unsaved OutboxEmail
+    """
+    # render with dynamic value
+    html_content, text_content = render_email(kwargs['template'], kwargs['data'])
+    return build_email(kwargs['subject'], html_content, kwargs['to_email'], text_content=text_content)
+
+
+def queue_email(subject, html_content, to_email, from_email=None):
+    """
+    Queue an email for the `send_queued_emails` worker to deliver
+    :return: the queued OutboxEmail
+    """
+    email = build_email(subject, html_content, to_email, from_email=from_email)
+    email.save()
+    return email
+
+
+def queue_emails(emails, batch_size=500):
+    """
+    Queue many emails with one insert per batch
+    :param emails: an iterable of unsaved OutboxEmail
+    :param batch_size:
+    :return: the number of emails queued
+    """
+    emails = iter(emails)
+    queued = 0
+    batch = list(islice(emails, batch_size))
+    while batch:
+        OutboxEmail.objects.bulk_create(batch)
+        queued += len(batch)
+        batch = list(islice(emails, batch_size))
+    return queued
+
+
+def email_message(email, connection=None):
+    """
+    Create the message to deliver for an outbox email, with the html version attached
+    :param email: the OutboxEmail
+    :param connection: the mail connection the message is sent with
+    :return: EmailMultiAlternatives
+    """
+    message = EmailMultiAlternatives(email.subject, email.body, email.from_email, [email.to_email],
+                                     connection=connection)
+    if email.html:
+        message.attach_alternative(email.html, "text/html")
+    return message
+
 
 def send_email(**kwargs):
     """
-    This function sends an email based on the arguments provided. Arguments
+    This function queues an email based on the arguments provided. Arguments
     include template, data, subject and to_email. template is the full
     path of the email template. data is a dictionary containing all
     the variables required by the template.
+    The email is delivered by the `send_queued_emails` worker.
     :param kwargs:
     :return:
     """
+    build_template_email(**kwargs).save()
 
-    from_email = os.getenv("EMAIL_HOST_SENDER")
-
-    # render with dynamic value
-    html_content = render_to_string(kwargs['template'], kwargs['data'])
-
-    # Strip the html tag. So people can see the pure text at least.
-    text_content = strip_tags(html_content)
-
-    # create the email, and attach the HTML version as well.
-    msg = EmailMultiAlternatives(kwargs['subject'], text_content, from_email, [kwargs['to_email']])
-    msg.attach_alternative(html_content, "text/html")
-    msg.send()
-
-    response = {"message": "email sent"}
+    response = {"message": "email queued"}
 
-    return response
\ No newline at end of file
+    return response
@@ -0,0 +1,53 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.template.loader import render_to_string
+from django.utils.html import strip_tags
+
+from authors.apps.core.email_templates import get_email_template, render_email
+
+
+class Command(BaseCommand):
+    help = 'Measures the cost of rendering an email for each recipient of a fan-out, with the compiled email ' \
+           'templates and with a full template render per recipient.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipients', type=int, default=2000,
+                            help='The number of recipients to render the email for. Defaults to 2000.')
+        parser.add_argument('--full-renders', type=int, default=50,
+                            help='The number of recipients the full render is measured on, it is slow. '
+                                 'Defaults to 50.')
+        parser.add_argument('--template', default='article_created.html',
+                            help='The email template to render. Defaults to article_created.html.')
+
+    def handle(self, *args, **options):
+        recipients = options['recipients']
+        template = options['template']
+        data = [{
+            'username': 'reader{}'.format(i),
+            'article_title': 'How to train your dragon',
+            'author': 'beverly',
+            'unsubscribe_url': 'http://localhost:8000/api/notifications/subscribe/',
+        } for i in range(recipients)]
+
+        get_email_template.cache_clear()
+        compile_cost = self.measure(lambda values: render_email(template, values), data[:1])
+        compiled = self.measure(lambda values: render_email(template, values), data)
+        full = self.measure(lambda values: strip_tags(render_to_string(template, values)),
+                            data[:options['full_renders']])
+
+        self.stdout.write('Rendered {} for {} recipient(s).'.format(template, recipients))
+        self.stdout.write('  full render:      {:12.1f} us/message'.format(full))
+        self.stdout.write('  compiled render:  {:12.1f} us/message'.format(compiled))
+        self.stdout.write('  compiling:        {:12.1f} us, once per process'.format(compile_cost))
+        self.stdout.write(self.style.SUCCESS('  {:.0f}x faster per message'.format(full / compiled if compiled else 0)))
+
+    @staticmethod
+    def measure(render, data):
+        """
+        :return: the average microseconds spent rendering the email of a recipient
+        """
+        started = time.perf_counter()
+        for values in data:
+            render(values)
+        return (time.perf_counter() - started) / len(data) * 1e6
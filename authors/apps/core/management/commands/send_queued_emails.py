@@ -0,0 +1,88 @@
+import time
+from datetime import timedelta
+
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+
+from authors.apps.core.mail_sender import email_message
+from authors.apps.core.models import OutboxEmail
+
+
+class Command(BaseCommand):
+    help = 'Delivers the queued emails in batches over a single mail connection, retrying failed deliveries ' \
+           'with an exponential backoff.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help='The number of emails claimed and sent at a time. Defaults to 100.')
+        parser.add_argument('--max-attempts', type=int, default=5,
+                            help='The number of deliveries attempted before an email is failed. Defaults to 5.')
+        parser.add_argument('--retry-delay', type=int, default=60,
+                            help='The seconds before the first retry, doubled on every retry. Defaults to 60.')
+        parser.add_argument('--lease', type=int, default=300,
+                            help='The seconds a batch is claimed for before another worker may send it. '
+                                 'Defaults to 300.')
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep polling the outbox instead of exiting once it is empty.')
+        parser.add_argument('--interval', type=float, default=5,
+                            help='The seconds to wait between polls of an empty outbox. Defaults to 5.')
+
+    def handle(self, *args, **options):
+        self.options = options
+        started = time.monotonic()
+        sent = failed = 0
+
+        while True:
+            emails = OutboxEmail.claim(options['batch_size'], timedelta(seconds=options['lease']))
+            if emails:
+                batch_sent = self.deliver(emails)
+                sent, failed = sent + batch_sent, failed + len(emails) - batch_sent
+                continue
+
+            # the outbox is empty
+            self.report(sent, failed, time.monotonic() - started)
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+    def deliver(self, emails):
+        """
+        Send the emails over one connection, retrying the ones that could not be sent
+        :param emails:
+        :return: the number of emails sent
+        """
+        sent, remaining = [], list(emails)
+        try:
+            with get_connection() as connection:
+                while remaining:
+                    email = remaining.pop(0)
+                    if self.send(connection, email):
+                        sent.append(email)
+        except Exception as error:
+            # the connection could not be opened
+            self.retry(error, *remaining)
+        OutboxEmail.mark_sent(sent)
+        return len(sent)
+
+    def send(self, connection, email):
+        """
+        Send one email, a failure only affects this email
+        :return: whether the email was sent
+        """
+        try:
+            if connection.send_messages([email_message(email, connection)]):
+                return True
+            error = 'The email was not accepted.'
+        except Exception as exception:
+            error = exception
+        self.retry(error, email)
+        return False
+
+    def retry(self, error, *emails):
+        for email in emails:
+            email.retry(error, self.options['max_attempts'], timedelta(seconds=self.options['retry_delay']))
+
+    def report(self, sent, failed, elapsed):
+        rate = sent / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            'Sent {} email(s) with {} failure(s) in {:.2f}s ({:.1f} emails/s).'.format(sent, failed, elapsed, rate)))
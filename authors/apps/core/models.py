@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.utils import timezone
 
 
@@ -28,7 +29,7 @@ class SoftDeleteManager(models.Manager):
         super().__init__(*args, **kwargs)
 
     def __base_queryset(self):
-        return super().get_queryset().filter(deleted_at=None)
+        return super().get_queryset()
 
     def get_queryset(self):
         query_set = self.__base_queryset()
@@ -67,3 +68,84 @@ class SoftDeleteMixin(models.Model):
         """
         self.deleted_at = None
         self.save()
+
+
+class OutboxEmail(TimestampsMixin):
+    """
+    An email waiting to be delivered. Request handlers queue emails here instead of
+    talking to the mail server, and the `send_queued_emails` worker delivers them in
+    batches, retrying failed deliveries with an exponential backoff.
+    """
+    pending = 'pending'
+    sent = 'sent'
+    failed = 'failed'
+
+    STATUSES = (
+        (pending, 'Pending'),
+        (sent, 'Sent'),
+        (failed, 'Failed'),
+    )
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html = models.TextField(blank=True, default='')
+    from_email = models.CharField(max_length=255, blank=True, null=True)
+    to_email = models.EmailField()
+
+    status = models.CharField(max_length=10, choices=STATUSES, default=pending)
+    attempts = models.IntegerField(default=0)
+    # when the email can next be claimed by a worker, pushed back while a worker is sending it
+    # and after every failed attempt
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default='')
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta(TimestampsMixin.Meta):
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_email_due_idx'),
+        ]
+
+    def __str__(self):
+        return '{} to {}'.format(self.subject, self.to_email)
+
+    @classmethod
+    def claim(cls, batch_size, lease):
+        """
+        Claim a batch of the emails that are due. The rows are locked while they are claimed and
+        the ones locked by other workers are skipped, so that concurrent workers never send
+        the same email. A claimed email is not due again until the lease has expired, which
+        returns the emails of a worker that died while sending them to the outbox.
+        :param batch_size: the maximum number of emails claimed
+        :param lease: the timedelta the worker has to deliver the emails
+        :return: the claimed emails
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            emails = list(cls.objects.select_for_update(skip_locked=True).filter(
+                status=cls.pending, next_attempt_at__lte=now).order_by('next_attempt_at', 'id')[:batch_size])
+            cls.objects.filter(pk__in=[email.pk for email in emails]).update(
+                next_attempt_at=now + lease, attempts=F('attempts') + 1)
+        for email in emails:
+            email.attempts += 1
+        return emails
+
+    @classmethod
+    def mark_sent(cls, emails):
+        return cls.objects.filter(pk__in=[email.pk for email in emails]).update(
+            status=cls.sent, sent_at=timezone.now(), last_error='')
+
+    def retry(self, error, max_attempts, retry_delay):
+        """
+        Record a failed delivery. The email is retried after a delay which doubles on every
+        attempt, and given up on after the maximum number of attempts.
+        :param error: the reason the delivery failed
+        :param max_attempts:
+        :param retry_delay: the timedelta before the first retry
+        :return:
+        """
+        self.last_error = str(error)
+        if self.attempts >= max_attempts:
+            self.status = self.failed
+        else:
+            self.next_attempt_at = timezone.now() + retry_delay * 2 ** (self.attempts - 1)
+        self.save(update_fields=['status', 'next_attempt_at', 'last_error', 'updated_at'])
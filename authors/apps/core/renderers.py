@@ -111,3 +111,12 @@ class RatingJSONRenderer(JSONRenderer):
         return json.dumps({
             'rating': data
         })
+
+
+class EventStreamRenderer(BaseJSONRenderer):
+    """
+    Lets an EventSource, which only accepts text/event-stream, reach a view that streams server-sent
+    events. The view writes the events itself, only its errors are rendered, as JSON.
+    """
+    media_type = 'text/event-stream'
+    format = 'event-stream'
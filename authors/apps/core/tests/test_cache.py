@@ -0,0 +1,29 @@
+from django.core.cache.backends.memcached import BaseMemcachedCache
+from django.test import SimpleTestCase, override_settings
+
+from authors.apps.core.cache import shared_cache
+
+
+class MemcachedCache(BaseMemcachedCache):
+    """
+    A memcached cache that is never connected to
+    """
+
+    def __init__(self, server, params):
+        super().__init__(server, params, library=None, value_not_found_exception=ValueError)
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'database': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'cache_table'},
+    'memcached': {'BACKEND': 'authors.apps.core.tests.test_cache.MemcachedCache', 'LOCATION': '127.0.0.1:11211'},
+})
+class SharedCacheTest(SimpleTestCase):
+
+    def test_only_memcached_and_redis_are_shared(self):
+        """
+        Ensure the local memory and database caches are not used for the version stamps
+        """
+        self.assertIsNone(shared_cache('default'))
+        self.assertIsNone(shared_cache('database'))
+        self.assertIsInstance(shared_cache('memcached'), MemcachedCache)
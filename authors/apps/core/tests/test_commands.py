@@ -0,0 +1,91 @@
+from datetime import timedelta
+from io import StringIO
+from smtplib import SMTPException
+
+from django.core import mail
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from authors.apps.core.mail_sender import queue_email, send_email
+from authors.apps.core.models import OutboxEmail
+
+
+class FailingEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise SMTPException('The mail server is down')
+
+
+class SendQueuedEmailsTest(TestCase):
+
+    def send_queued_emails(self, **options):
+        out = StringIO()
+        call_command('send_queued_emails', stdout=out, **options)
+        return out.getvalue()
+
+    def test_emails_are_queued_instead_of_sent(self):
+        """
+        Ensure request handlers only queue the email
+        """
+        send_email(template='email_subscribe.html', data={'username': 'beverly'}, to_email='beverly@gmail.com',
+                   subject='Email subscription activated')
+        self.assertEqual(len(mail.outbox), 0)
+        email = OutboxEmail.objects.get()
+        self.assertEqual((email.status, email.to_email), (OutboxEmail.pending, 'beverly@gmail.com'))
+        self.assertIn('beverly', email.body)
+        self.assertNotIn('<', email.body)
+
+    def test_sends_queued_emails_in_batches(self):
+        """
+        Ensure every due email is sent with its html version, and reported
+        """
+        for i in range(5):
+            queue_email('Hello', '<p>Hello reader {}</p>'.format(i), 'reader{}@gmail.com'.format(i))
+        later = queue_email('Hello', '<p>Hello later</p>', 'later@gmail.com')
+        OutboxEmail.objects.filter(pk=later.pk).update(next_attempt_at=timezone.now() + timedelta(hours=1))
+
+        output = self.send_queued_emails(batch_size=2)
+        self.assertIn('Sent 5 email(s) with 0 failure(s)', output)
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox),
+                         ['reader{}@gmail.com'.format(i) for i in range(5)])
+        self.assertEqual(mail.outbox[0].alternatives[0][1], 'text/html')
+        self.assertEqual(OutboxEmail.objects.filter(status=OutboxEmail.sent).count(), 5)
+        self.assertEqual(OutboxEmail.objects.get(pk=later.pk).status, OutboxEmail.pending)
+
+        # nothing is left to send
+        self.assertIn('Sent 0 email(s)', self.send_queued_emails())
+        self.assertEqual(len(mail.outbox), 5)
+
+    @override_settings(EMAIL_BACKEND='authors.apps.core.tests.test_commands.FailingEmailBackend')
+    def test_failed_emails_are_retried_with_backoff(self):
+        """
+        Ensure a failed email is retried later, with a delay that doubles, until it is given up on
+        """
+        email = queue_email('Hello', '<p>Hello</p>', 'reader@gmail.com')
+
+        output = self.send_queued_emails(retry_delay=60, max_attempts=3)
+        self.assertIn('Sent 0 email(s) with 1 failure(s)', output)
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts, email.last_error),
+                         (OutboxEmail.pending, 1, 'The mail server is down'))
+        self.assertAlmostEqual((email.next_attempt_at - timezone.now()).total_seconds(), 60, delta=5)
+
+        # the second attempt waits twice as long
+        OutboxEmail.objects.filter(pk=email.pk).update(next_attempt_at=timezone.now())
+        self.send_queued_emails(retry_delay=60, max_attempts=3)
+        email.refresh_from_db()
+        self.assertAlmostEqual((email.next_attempt_at - timezone.now()).total_seconds(), 120, delta=5)
+
+        OutboxEmail.objects.filter(pk=email.pk).update(next_attempt_at=timezone.now())
+        self.send_queued_emails(retry_delay=60, max_attempts=3)
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), (OutboxEmail.failed, 3))
+
+    def test_claimed_emails_are_not_claimed_again(self):
+        """
+        Ensure an email claimed by a worker is not claimed by another until its lease expires
+        """
+        queue_email('Hello', '<p>Hello</p>', 'reader@gmail.com')
+        self.assertEqual(len(OutboxEmail.claim(10, timedelta(minutes=5))), 1)
+        self.assertEqual(OutboxEmail.claim(10, timedelta(minutes=5)), [])
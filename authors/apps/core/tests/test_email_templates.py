@@ -0,0 +1,43 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.template.loader import render_to_string
+from django.test import SimpleTestCase
+
+from authors.apps.core.email_templates import get_email_template, render_email
+
+
+class EmailTemplateTest(SimpleTestCase):
+
+    def setUp(self):
+        self.data = {
+            'username': 'beverly',
+            'article_title': 'Tom & Jerry <3',
+            'author': 'gitaumoses4',
+            'unsubscribe_url': 'http://localhost:8000/api/notifications/subscribe/?a=1&b=2',
+        }
+
+    def test_renders_like_the_template(self):
+        """
+        Ensure the compiled template renders the same html as the template, escaping the values
+        """
+        html, text = render_email('article_created.html', self.data)
+        self.assertEqual(html, render_to_string('article_created.html', self.data))
+        self.assertIn('Tom &amp; Jerry &lt;3', html)
+        self.assertIn('Tom & Jerry <3', text)
+        self.assertNotIn('<p>', text)
+
+    def test_compiles_a_template_once(self):
+        """
+        Ensure rendering the email for other recipients reuses the compiled template
+        """
+        get_email_template.cache_clear()
+        for username in ('beverly', 'emily', 'chomba'):
+            html, _ = render_email('article_created.html', dict(self.data, username=username))
+            self.assertIn('>{}</b>'.format(username), html)
+        self.assertEqual(get_email_template.cache_info().misses, 1)
+
+    def test_benchmark(self):
+        out = StringIO()
+        call_command('benchmark_email_rendering', recipients=20, full_renders=2, stdout=out)
+        self.assertIn('Rendered article_created.html for 20 recipient(s).', out.getvalue())
@@ -4,8 +4,7 @@ from authors.apps.core.models import TimestampsMixin
 from authors.settings import AUTH_USER_MODEL
 from cloudinary.models import CloudinaryField
 
-from notifications.signals import notify
-from authors.apps.ah_notifications.notifications import Verbs
+from authors.apps.ah_notifications.notifications import Verbs, notify_user
 
 
 class FollowMixin(models.Model):
@@ -22,7 +21,7 @@ class FollowMixin(models.Model):
         Follow a profile.
         :param profile: Profile
         """
-        notify.send(self, verb=Verbs.USER_FOLLOWING, recipient=profile.user, 
+        notify_user(self, profile.user, Verbs.USER_FOLLOWING,
                     description="{} has just followed you!".format(self.username))
         return self.follows.add(profile)
 
@@ -52,7 +52,9 @@ class ProfileGetView(APIView):
         """Allows authenticated users to update only their profiles."""
         data = request.data
 
-        serializer = self.serializer_class(instance=request.user.profile, data=data, partial=True)
+        # the profile of the authenticated user may be stale, update the current one
+        profile = Profile.objects.get(user_id=request.user.pk)
+        serializer = self.serializer_class(instance=profile, data=data, partial=True)
         serializer.is_valid()
         serializer.save()
         return Response(serializer.data, status=status.HTTP_200_OK)
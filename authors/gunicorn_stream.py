@@ -0,0 +1,19 @@
+"""
+The gunicorn configuration of the stream process of the Procfile, which serves the notification
+streams and long polls. Each open stream is a greenlet of a gevent worker, which waits on the
+pub-sub without holding a thread, and the worker refuses the streams over
+NOTIFICATIONS_STREAM['MAX_STREAMS'] with a 503.
+"""
+import os
+
+from psycogreen.gevent import patch_psycopg
+
+worker_class = 'gevent'
+workers = int(os.getenv('STREAM_CONCURRENCY', 2))
+# the connections a worker accepts at once, above MAX_STREAMS so that it can still refuse the other streams
+worker_connections = int(os.getenv('STREAM_WORKER_CONNECTIONS', 1000))
+
+
+def post_fork(server, worker):
+    # make the database queries wait in the gevent loop instead of blocking the other streams of the worker
+    patch_psycopg()
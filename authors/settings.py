@@ -231,4 +231,85 @@ CLOUDINARY = {
     'secure': True
 }
 
+# The blacklisted tokens are checked against a per-process Bloom filter, sized for CAPACITY tokens.
+# It picks up the tokens blacklisted by other processes every REFRESH_INTERVAL seconds.
+TOKEN_BLACKLIST = {
+    'CAPACITY': int(os.getenv('TOKEN_BLACKLIST_CAPACITY', 100000)),
+    'ERROR_RATE': 0.001,
+    'REFRESH_INTERVAL': int(os.getenv('TOKEN_BLACKLIST_REFRESH_INTERVAL', 1)),
+    'REFRESH_MARGIN': 60,
+    'REBUILD_INTERVAL': 60 * 60,
+}
+
+# The `search` of the articles. The fulltext BACKEND searches the search vectors of the articles with
+# the CONFIG text search configuration, the contains BACKEND matches the terms anywhere in the fields.
+# The engine BACKEND searches an index kept by each process, loaded from INDEX_PATH if it has been built
+# there with `build_search_index`, which picks up the articles saved by other processes every
+# REFRESH_INTERVAL seconds and is rebuilt every REBUILD_INTERVAL seconds, from INDEX_PATH if it has been
+# built again since or else from the database.
+ARTICLE_SEARCH = {
+    'BACKEND': os.getenv('ARTICLE_SEARCH_BACKEND', 'fulltext'),
+    'CONFIG': os.getenv('ARTICLE_SEARCH_CONFIG', 'simple'),
+    'INDEX_PATH': os.getenv('ARTICLE_SEARCH_INDEX_PATH', ''),
+    'MAX_RESULTS': int(os.getenv('ARTICLE_SEARCH_MAX_RESULTS', 1000)),
+    'REFRESH_INTERVAL': int(os.getenv('ARTICLE_SEARCH_REFRESH_INTERVAL', 5)),
+    'REFRESH_MARGIN': 60,
+    'REBUILD_INTERVAL': 60 * 60,
+    # the number of words of the passages returned instead of the bodies with `snippets=true`
+    'SNIPPET_WORDS': int(os.getenv('ARTICLE_SEARCH_SNIPPET_WORDS', 30)),
+    # the ids of the articles found by the searches are cached in the CACHE cache for CACHE_TIMEOUT seconds,
+    # if it is a memcached or Redis cache configured in CACHES
+    'CACHE': os.getenv('ARTICLE_SEARCH_CACHE', 'default'),
+    'CACHE_TIMEOUT': int(os.getenv('ARTICLE_SEARCH_CACHE_TIMEOUT', 300)),
+}
+
+# The payloads of the last MAX_SIZE tokens verified are kept by each process until the tokens expire
+TOKEN_CACHE = {
+    'MAX_SIZE': int(os.getenv('TOKEN_CACHE_SIZE', 10000)),
+}
+
+# The authenticated users are kept by each process for TTL seconds. Their version stamps are in
+# the CACHE cache, which must be a memcached or Redis cache configured in CACHES, the users are
+# not cached otherwise.
+AUTH_USER_CACHE = {
+    'CACHE': os.getenv('AUTH_USER_CACHE', 'default'),
+    'TTL': int(os.getenv('AUTH_USER_CACHE_TTL', 30)),
+    'MAX_SIZE': int(os.getenv('AUTH_USER_CACHE_SIZE', 10000)),
+}
+
 DJANGO_NOTIFICATIONS_CONFIG = {'SOFT_DELETE': True}
+
+# Events of the same verb on the same target within the window, in seconds, merge into one digest notification
+NOTIFICATIONS_COALESCE = {
+    'ENABLED': os.getenv('NOTIFICATIONS_COALESCE', 'True') == 'True',
+    'WINDOW': int(os.getenv('NOTIFICATIONS_COALESCE_WINDOW', 24 * 60 * 60)),
+    # the number of latest actors a digest keeps the ids of
+    'ACTORS': int(os.getenv('NOTIFICATIONS_COALESCE_ACTORS', 5)),
+}
+
+# New notifications are pushed to the event stream and long-poll clients, the times are in seconds.
+# The Procfile serves them from the stream process, whose gevent workers hold an open stream in a greenlet.
+NOTIFICATIONS_STREAM = {
+    'PUBSUB': os.getenv('NOTIFICATIONS_PUBSUB', 'authors.apps.ah_notifications.pubsub.LocalPubSub'),
+    # the longest a stream waits before reading the database for notifications saved by other processes
+    'HEARTBEAT': int(os.getenv('NOTIFICATIONS_STREAM_HEARTBEAT', 15)),
+    'DURATION': int(os.getenv('NOTIFICATIONS_STREAM_DURATION', 300)),
+    'RETRY': int(os.getenv('NOTIFICATIONS_STREAM_RETRY', 3)),
+    'TIMEOUT': int(os.getenv('NOTIFICATIONS_POLL_TIMEOUT', 25)),
+    # the seconds a stream token is valid for, an EventSource passes it as the `token` query parameter
+    'TOKEN_TTL': int(os.getenv('NOTIFICATIONS_STREAM_TOKEN_TTL', 60)),
+    # the streams and polls a process keeps open at once, the others are refused with a 503 telling
+    # the client to retry after RETRY_AFTER seconds
+    'MAX_STREAMS': int(os.getenv('NOTIFICATIONS_STREAM_MAX_STREAMS', 500)),
+    'RETRY_AFTER': int(os.getenv('NOTIFICATIONS_STREAM_RETRY_AFTER', 30)),
+    # the streams of a process that use the database at once, the others wait for their turn
+    'DATABASE_CONNECTIONS': int(os.getenv('NOTIFICATIONS_STREAM_DATABASE_CONNECTIONS', 20)),
+}
+
+# Article views are buffered in memory and written in bulk when ARTICLE_VIEWS_BUFFER=True, see
+# .env_example. They are recorded synchronously by default, as the tests expect.
+ARTICLE_VIEWS_BUFFER = {
+    'ENABLED': os.getenv('ARTICLE_VIEWS_BUFFER', 'False') == 'True',
+    'MAX_SIZE': int(os.getenv('ARTICLE_VIEWS_BUFFER_SIZE', 500)),
+    'FLUSH_INTERVAL': int(os.getenv('ARTICLE_VIEWS_FLUSH_INTERVAL', 10)),
+}